@@ -0,0 +1,189 @@
+# ==============================================================
+# ALMACÉN COLUMNAR (PARQUET PARTICIONADO POR AÑO / MES)
+# ==============================================================
+#
+# Estructura en disco:
+#
+#   <directorio>/anio=2025/mes=03/datos.parquet
+#   <directorio>/_manifiesto.json
+#
+# El manifiesto guarda el origen de los datos (versión del almacén de
+# envíos + catálogo) y un hash por partición, de modo que al actualizar
+# solo se reescriben los meses que cambiaron. Opcionalmente guarda también
+# una huella de los datos de origen de cada mes (`fuentes`): quien escribe
+# puede compararla para reconstruir solo los meses con envíos nuevos,
+# editados o borrados.
+
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+ARCHIVO_MANIFIESTO = "_manifiesto.json"
+ARCHIVO_PARTICION = "datos.parquet"
+
+# Un lock reentrante por directorio (ver bloqueo)
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def bloqueo(directorio):
+    """
+    Lock del directorio. escribir y leer lo toman; quien tenga que comprobar,
+    reconstruir y leer como un solo paso lo sostiene alrededor de todo (es
+    reentrante), así nadie reemplaza o borra particiones mientras otro las lee.
+    """
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(directorio), threading.RLock())
+
+
+def _ruta_particion(directorio, anio, mes):
+    return os.path.join(directorio, f"anio={anio}", f"mes={mes:02d}", ARCHIVO_PARTICION)
+
+
+def _escribir_atomico(ruta, escribir):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f"{ruta}.tmp"
+    escribir(tmp)
+    os.replace(tmp, ruta)
+
+
+def leer_manifiesto(directorio):
+    try:
+        with open(os.path.join(directorio, ARCHIVO_MANIFIESTO), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"origen": None, "particiones": {}, "fuentes": {}}
+
+
+def origen(directorio):
+    """Identificador de los datos con que se generó la tabla (None si no existe)."""
+    return leer_manifiesto(directorio).get("origen")
+
+
+def fuentes(directorio):
+    """{"AAAA-MM": huella de origen} guardadas con la última escritura."""
+    return leer_manifiesto(directorio).get("fuentes", {})
+
+
+def escribir(df, directorio, origen, col_fecha="fecha_dt", meses=None, fuentes=None):
+    """
+    Persiste `df` particionado por año/mes de `col_fecha`.
+
+    Solo se reescriben las particiones cuyo contenido cambió y se eliminan
+    las que ya no tienen filas. Con `meses` (claves "AAAA-MM") `df` trae
+    solo esos meses: se reemplazan ellos y el resto queda como estaba.
+    `fuentes` reemplaza las huellas de origen del manifiesto.
+    """
+    with bloqueo(directorio):
+        manifiesto = leer_manifiesto(directorio)
+        previo = manifiesto.get("particiones", {})
+        if meses is None:
+            nuevas = {}
+        else:
+            meses = set(meses)
+            nuevas = {k: h for k, h in previo.items() if k not in meses}
+
+        fechas = df[col_fecha]
+        grupos = df.groupby([fechas.dt.year.rename("anio"), fechas.dt.month.rename("mes")], sort=True)
+
+        for (anio, mes), parte in grupos:
+            clave = f"{anio}-{mes:02d}"
+            parte = parte.reset_index(drop=True)
+            h = str(int(pd.util.hash_pandas_object(parte, index=False).sum()))
+            nuevas[clave] = h
+
+            ruta = _ruta_particion(directorio, anio, mes)
+            if previo.get(clave) == h and os.path.exists(ruta):
+                continue
+
+            tabla = pa.Table.from_pandas(parte, preserve_index=False)
+            _escribir_atomico(ruta, lambda tmp: pq.write_table(tabla, tmp, compression="zstd"))
+
+        for clave in set(previo) - set(nuevas):
+            anio, mes = map(int, clave.split("-"))
+            try:
+                os.remove(_ruta_particion(directorio, anio, mes))
+            except OSError:
+                pass
+
+        def _volcar(tmp):
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({
+                    "origen": origen,
+                    "particiones": nuevas,
+                    "fuentes": manifiesto.get("fuentes", {}) if fuentes is None else fuentes,
+                }, f)
+
+        _escribir_atomico(os.path.join(directorio, ARCHIVO_MANIFIESTO), _volcar)
+
+
+def meses_disponibles(directorio):
+    """Lista ordenada de (año, mes) con datos."""
+    claves = leer_manifiesto(directorio).get("particiones", {})
+    return sorted(tuple(map(int, c.split("-"))) for c in claves)
+
+
+def anios_disponibles(directorio):
+    return sorted({a for a, _ in meses_disponibles(directorio)})
+
+
+def _vacia(directorio, columnas=None):
+    """
+    DataFrame sin filas con el esquema (columnas y tipos) de las particiones;
+    si no hay ninguna, solo con los nombres de `columnas`.
+    """
+    for a, m in meses_disponibles(directorio):
+        ruta = _ruta_particion(directorio, a, m)
+        if os.path.exists(ruta):
+            vacia = pq.read_schema(ruta).empty_table()
+            return (vacia.select(columnas) if columnas is not None else vacia).to_pandas()
+    return pd.DataFrame(columns=columnas or [])
+
+
+def leer(directorio, desde=None, hasta=None, columnas=None, col_fecha="fecha_dt"):
+    """
+    Lee solo las particiones que cubren [desde, hasta] (fechas inclusive)
+    y solo las `columnas` pedidas. Sin límites se lee la tabla completa.
+    """
+    desde = pd.Timestamp(desde) if desde is not None else None
+    hasta = pd.Timestamp(hasta) if hasta is not None else None
+
+    k_desde = (desde.year, desde.month) if desde is not None else (0, 0)
+    k_hasta = (hasta.year, hasta.month) if hasta is not None else (9999, 12)
+
+    if columnas is not None and col_fecha not in columnas:
+        columnas_leidas = list(columnas) + [col_fecha]
+    else:
+        columnas_leidas = columnas
+
+    with bloqueo(directorio):
+        rutas = [
+            _ruta_particion(directorio, a, m)
+            for a, m in meses_disponibles(directorio)
+            if k_desde <= (a, m) <= k_hasta
+        ]
+        rutas = [r for r in rutas if os.path.exists(r)]
+
+        if rutas:
+            df = pd.concat(
+                [pq.read_table(r, columns=columnas_leidas).to_pandas() for r in rutas],
+                ignore_index=True
+            )
+        else:
+            df = _vacia(directorio, columnas_leidas)
+
+    # Recorte exacto dentro del primer y último mes
+    if desde is not None:
+        df = df[df[col_fecha] >= desde.normalize()]
+    if hasta is not None:
+        df = df[df[col_fecha] < hasta.normalize() + pd.Timedelta(days=1)]
+
+    if columnas is not None:
+        df = df[list(columnas)]
+
+    return df.reset_index(drop=True)
@@ -4,17 +4,24 @@
 # ==============================================================
 
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
 import numpy as np
-import requests
-import folium
 from streamlit_folium import st_folium
-from folium.plugins import LocateControl, MarkerCluster
-from datetime import timedelta
-from fpdf import FPDF
+from datetime import date, timedelta
 import locale
-import xml.etree.ElementTree as ET
 from io import BytesIO
+import contextvars
+import threading
+from collections import OrderedDict
+
+import datos
+import instrumentacion
+import kml
+import mapas
+import pipeline
+import refresco
+import reporte_pdf
 
 
 # =====================================================
@@ -288,525 +295,246 @@ if "cargar_todo" not in st.session_state:
     st.session_state.cargar_todo = False
 
 # ==============================================================
-# CREDENCIALES Y URLS
+# CREDENCIALES Y RUTAS
 # ==============================================================
 
-URL_PRECIPITACIONES = "https://territorios.inta.gob.ar/assets/aYqLUVvU3EYiDa7NoJbPKF/submissions/?format=json"
-URL_MAPA = "https://territorios.inta.gob.ar/assets/aFwWKNGXZKppgNYKa33wC8/submissions/?format=json"
-
-TOKEN = st.secrets["INTA_TOKEN"]
-
-HEADERS = {"Authorization": f"Token {TOKEN}"}
-
-# ==============================================================
-# FUNCIONES AUXILIARES
-# ==============================================================
-
-def extraer_coordenadas(row):
+def secreto(nombre, defecto=None):
+    """Valor de st.secrets, o `defecto` si no está definido (o no hay secretos)."""
     try:
-        v = row.get("Ubicaci_in") or row.get("ubicaci_in") or row.get("_Ubicaci_in")
-        if isinstance(v, str):
-            p = v.split()
-            return float(p[0]), float(p[1])
-        if isinstance(v, list):
-            return float(v[0]), float(v[1])
-    except:
-        pass
-    return None, None
-
-@st.cache_data(ttl=1800)
-def cargar_datos(solo_reciente=True):
-    r1 = requests.get(URL_PRECIPITACIONES, headers=HEADERS)
-    r2 = requests.get(URL_MAPA, headers=HEADERS)
-
-    df_p = pd.DataFrame(r1.json())
-    df_c = pd.DataFrame(r2.json())
-
-    df_p["fecha_dt"] = pd.to_datetime(df_p["Fecha_del_dato"])
-    if solo_reciente:
-        corte = pd.Timestamp.now() - pd.Timedelta(days=60)
-        df_p = df_p[df_p["fecha_dt"] >= corte]
-
-    df_p["fecha"] = df_p["fecha_dt"].dt.date
-    df_p["mm"] = pd.to_numeric(df_p["Mil_metros_registrados"], errors="coerce").fillna(0)
-    df_p["fen_raw"] = df_p["fenomeno"].astype(str).str.lower()
-    
-    # =================================================
-# NORMALIZACIÓN DE FENÓMENOS ATMOSFÉRICOS
-# =================================================
-    df_p["fen_raw"] = (
-        df_p["fenomeno"]
-        .astype(str)
-        .str.strip()
-        .str.lower()
-    )
+        return st.secrets[nombre]
+    except (KeyError, FileNotFoundError):
+        return defecto
 
-    map_fen = {
-        "viento": "Vientos fuertes",
-        "granizo": "Granizo",
-        "tormenta": "Tormentas eléctricas",
-        "sinfeno": "Sin obs. de fenómenos"
-    }
-
-    df_p["Fenómeno atmosférico"] = (
-        df_p["fen_raw"]
-        .replace(map_fen)
-        .replace({
-            "none": "Sin obs. de fenómenos",
-            "nan": "Sin obs. de fenómenos",
-            "": "Sin obs. de fenómenos"
-        })
-    )
-        
-    
 
-    df_p["cod"] = df_p["Pluviometros"].astype(str).str.replace(".0", "", regex=False)
-    df_c["cod"] = df_c["Codigo_txt_del_pluviometro"].astype(str).str.replace(".0", "", regex=False)
+# Reproduciendo instantáneas (PLUVIO_KOBO_MODO=reproducir) no se necesita token
+TOKEN = st.secrets["INTA_TOKEN"] if pipeline.requiere_token() else secreto("INTA_TOKEN", "")
 
-    res = df_c.apply(extraer_coordenadas, axis=1)
-    df_c["lat"], df_c["lon"] = zip(*res)
+HEADERS = pipeline.encabezados(TOKEN)
 
-    col_n = next((c for c in df_c.columns if "Nombre_del_Pluviometro" in c), "cod")
-    col_depto = next((c for c in df_c.columns if "depto" in c.lower()), None)
-    col_prov = next((c for c in df_c.columns if "prov" in c.lower()), None)
-    col_region = next((c for c in df_c.columns if "reg" in c.lower()), None)
+# Panel de rendimiento: solo con ?admin=<ADMIN_CLAVE> en la URL (secreto opcional)
+CLAVE_ADMIN = secreto("ADMIN_CLAVE")
+ES_ADMIN = bool(CLAVE_ADMIN) and st.query_params.get("admin") == CLAVE_ADMIN
 
-    columnas = ["cod", "lat", "lon", col_n, col_depto, col_prov, col_region]
-    columnas = [c for c in columnas if c]
+# Columnas de la consulta diaria de 📈 Histórico
+COLUMNAS_HISTORICO = [
+    "fecha_dt", "Pluviómetro", "Departamento", "Provincia", "mm", "Fenómeno atmosférico"
+]
 
-    df = df_p.merge(df_c[columnas], on="cod", how="left")
-    df["Pluviómetro"] = df[col_n]
-    df["Departamento"] = df[col_depto].fillna("S/D") if col_depto else "S/D"
-    df["Provincia"] = df[col_prov].fillna("S/D") if col_prov else "S/D"
-    df["Region"] = df[col_region].fillna("General") if col_region else "General"
-
-    return df, df_c, col_n
+# Columnas necesarias para armar el cubo mensual desde registros diarios
+COLUMNAS_CUBO = datos.CLAVES_CUBO + ["fecha_dt", "mm"]
 
 # ==============================================================
-# PDF DIARIO
+# FUNCIONES AUXILIARES
 # ==============================================================
 
-def crear_pdf(df_dia, fecha_selec, cant_total):
-    """Genera bytes de PDF con el resumen diario."""
-
-    class PDF(FPDF):
-        def footer(self):
-            self.set_y(-15)
-            self.set_font("Helvetica", 'I', 8)
-            self.set_text_color(128, 128, 128)
-            self.cell(
-                0, 10,
-                'Documento generado automáticamente por el Sistema de Relevamiento Pluviométrico - INTA EEA Salta',
-                0, 0, 'L'
-            )
-            self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'R')
-
-    pdf = PDF()
-    pdf.add_page()
-
-    # =================================================
-    # ENCABEZADO INSTITUCIONAL
-    # =================================================
-    pdf.set_fill_color(30, 58, 138)  # Azul INTA
-    pdf.rect(0, 0, 210, 45, 'F')
-
-    try:
-        pdf.image("logo_inta.png", x=12, y=8, w=22)
-    except:
-        pass
-
-    pdf.set_text_color(255, 255, 255)
-    pdf.set_font("Helvetica", 'B', 16)
-    pdf.set_xy(38, 12)
-    pdf.cell(0, 10, "CENTRO REGIONAL SALTA - JUJUY", ln=True)
-
-    pdf.set_font("Helvetica", 'B', 13)
-    pdf.set_x(38)
-    pdf.cell(0, 8, "REPORTE DIARIO DE PRECIPITACIONES", ln=True)
-
-    pdf.ln(22)
-    pdf.set_text_color(0, 0, 0)
-
-    # =================================================
-    # RESUMEN GENERAL
-    # =================================================
-    pdf.set_font("Helvetica", 'B', 12)
-    pdf.cell(0, 10, "Resumen del día:", ln=True)
-
-    pdf.set_font("Helvetica", size=11)
-
-    meses = {
-        1: "enero", 2: "febrero", 3: "marzo", 4: "abril",
-        5: "mayo", 6: "junio", 7: "julio", 8: "agosto",
-        9: "septiembre", 10: "octubre", 11: "noviembre", 12: "diciembre"
-    }
-
-    fecha_formateada = (
-        f"{fecha_selec.day} de "
-        f"{meses[fecha_selec.month]} de "
-        f"{fecha_selec.year}"
-    )
-
-    pdf.cell(0, 8, f"Fecha de consulta: {fecha_formateada}", ln=True)
-    pdf.cell(0, 7, f"Estaciones con reporte: {len(df_dia)}", ln=True)
-    pdf.cell(0, 7, f"Total de estaciones en base: {cant_total}", ln=True)
+# Vigencia de los datos en memoria (segundos) y cuánto antes de vencer se renuevan
+TTL_DATOS = 1800
+ANTICIPO_RENOVACION = 120
 
-    # =================================================
-    # DÍA PLUVIOMÉTRICO
-    # =================================================
-    f1 = fecha_selec.strftime('%d/%m/%Y')
-    f2 = (fecha_selec + timedelta(days=1)).strftime('%d/%m/%Y')
+# Con Kobo caído se sirve la copia local y se reintenta a los 5 minutos
+# (cuando el circuito de kobo.py ya deja pasar un pedido de prueba)
+TTL_RESPALDO = ANTICIPO_RENOVACION + 300
 
-    x0 = pdf.get_x()
-    y0 = pdf.get_y()
 
-    pdf.set_fill_color(240, 240, 240)
-    pdf.rect(x0, y0, 190, 12, 'F')
-
-    pdf.set_xy(x0 + 2, y0 + 2)
-    pdf.set_font("Helvetica", 'B', 11)
-
-    pdf.multi_cell(
-        0, 8,
-        f"Lluvia acumulada desde las 9 hs del {f1} "
-        f"a las 9 hs del día {f2} - Día pluviométrico",
-        align='C'
+@st.cache_resource
+def refrescador():
+    """
+    Datos compartidos por todas las sesiones del proceso: "reciente" (modo
+    rápido) y "completo" (historial). Se renuevan en segundo plano antes de
+    vencer, así ningún rerun espera a Kobo salvo la primera carga. El modo
+    rápido se precarga al arrancar. Un modo que ninguna sesión lee durante
+    TTL_DATOS se descarta (p. ej. el historial completo tras consultarlo).
+    """
+    def cargar(clave):
+        # Con el historial completo en memoria, el modo rápido se recorta de él
+        if clave == "reciente":
+            completo = r.actual("completo")
+            if completo is not None:
+                return pipeline.recortar(completo)
+
+        # Sincronización, normalización y agregados viven en pipeline.py
+        return pipeline.cargar(HEADERS, solo_reciente=clave == "reciente")
+
+    r = refresco.Refrescador(
+        cargar,
+        ttl=TTL_DATOS,
+        anticipo=ANTICIPO_RENOVACION,
+        ttl_valor=lambda res: TTL_RESPALDO if res["degradado"] else TTL_DATOS,
     )
+    r.iniciar(["reciente"])
+    return r
 
-    pdf.ln(8)
 
-    # =================================================
-    # TABLA DE DATOS
-    # =================================================
-    pdf.set_font("Helvetica", 'B', 11)
-    pdf.set_fill_color(230, 230, 230)
-    pdf.cell(60, 10, "Pluviómetro", 1, 0, 'L', True)
-    pdf.cell(45, 10, "Departamento", 1, 0, 'L', True)
-    pdf.cell(45, 10, "Provincia", 1, 0, 'L', True)
-    pdf.cell(30, 10, "Lluvia (mm)", 1, 1, 'C', True)
-
-    pdf.set_font("Helvetica", size=10)
-    df_ord = df_dia.sort_values("mm", ascending=False)
-
-    for _, r in df_ord.iterrows():
-        pdf.cell(60, 10, r["Pluviómetro"], 1)
-        pdf.cell(45, 10, r["Departamento"], 1)
-        pdf.cell(45, 10, r["Provincia"], 1)
-        pdf.cell(30, 10, f"{r['mm']} mm", 1, 1, 'C')
-        
-        
-    # =================================================
-    # PÁGINA FINAL – EQUIPO DE TRABAJO Y COLABORADORES
-    # =================================================
-    pdf.add_page()
-
-    pdf.set_text_color(0, 0, 0)
-
-    # --- Equipo de trabajo ---
-    pdf.set_font("Helvetica", 'B', 12)
-    pdf.cell(0, 10, "Equipo de trabajo - INTA:", ln=True)
-
-    pdf.set_font("Helvetica", size=10)
-    pdf.multi_cell(
-        0, 7,
-        "Lic. Inf. Hernán Elena (EEA Salta), "
-        "Obs. Met. Germán Guanca (Meteorología - EEA Salta), "
-        "Ing. Agr. Rafael Saldaño (OIT Coronel Moldes), "
-        "Ing. Agr. Daniela Moneta (AER Valle de Lerma), "
-        "Ing. Juan Ramón Rojas (AER Santa Victoria Este), "
-        "Ing. Agr. Daniel Lamberti (AER Perico), "
-        "Tec. Recursos Hídricos Fátima del Valle Miranda (AER Palma Sola), "
-        "Ing. Agr. Florencia Diaz (AER Palma Sola), "
-        "Ing. Agr. Héctor Diaz (AER J.V. Gonzalez), "
-        "Ing. Agr. Carlos G. Cabrera (AER J.V. Gonzalez), "
-        "Lucas Diaz (AER Cafayate - OIT San Carlos), "
-        "Med. Vet. Cristina Rosetto (EECT Yuto), "
-        "Ing. RRNN Fabian Tejerina (EEA Salta), "
-        "Tec. Agr. Carlos Arias (OIT General Güemes)."
-    )
+def cargar_datos(solo_reciente=True):
+    """
+    Resultado de pipeline (dict). El modo rápido y el historial completo son
+    entradas distintas y conviven: cambiar de modo no descarta ninguna.
+    """
+    clave = "reciente" if solo_reciente else "completo"
+    if refrescador().actual(clave) is None:
+        # Primera carga (propia o en curso en otra sesión): este rerun espera
+        instrumentacion.fallo_cache("cargar_datos")
+    return refrescador().obtener(clave)
 
-    pdf.ln(4)
 
-    # --- Colaboradores ---
-    pdf.set_font("Helvetica", 'B', 12)
-    pdf.cell(0, 10, "Colaboradores:", ln=True)
+def consultar_periodo(desde, hasta, columnas):
+    """
+    Filas de [desde, hasta] con las columnas pedidas, de los datos ya en
+    memoria (últimos 60 días o historial completo): no se vuelve al disco.
+    """
+    return indice.rango(desde, hasta)[list(columnas)].reset_index(drop=True)
 
-    pdf.set_font("Helvetica", size=9)
-    pdf.multi_cell(
-        0, 6,
-        "Nicolás Uriburu, Nicolás Villegas, Matías Lanusse, Marcela López, Martín Amado, Agustín Sanz Navamuel, Luis Fernández Acevedo, Miguel A. Boasso, Luis Zavaleta, Mario Lambrisca, Noelia Rovedatti, Matías Canonica, Alejo Álvarez, Javier Montes, Guillermo Patrón Costa, Sebastián Mendilaharzu, Francisco Chehda, Jorge Robles, Gustavo Soricich, Javier Atea, Luis D. Elías, Leandro Carrizo, Daiana Núñez, Fátima González, Santiago Villalba, Juan Collado, Julio Collado, Estanislao Lara, Carlos Cruz, Daniel Espinoza, Fabián Álvarez, Lucio Señoranis, René Vallejos Rueda, Héctor Miranda, Emanuel Arias, Oscar Herrera, Francisca Vacaflor, Zaturnino Ceballos, Alcides Ceballos, Juan Ignacio Pearson, Pascual Erazo, Darío Romero, Luisa Andrada, Alejandro Ricalde, Odorico Romero, Lucas Campos, Sebastián Díaz, Carlos Sanz, Gabriel Brinder, Gastón Vizgarra, Diego Sulca, Alicia Tapia, Sergio Cassinelli, María Zamboni, Andrés Flores, Tomás Lienemann, Carmen Carattoni, Cecilia Carattoni, Tito Donoso, Javier Aprile, Carla Carattoni, Cuenca Renán, Luna Federico, Soloza Pedro, Aparicio Cirila, Torres Arnaldo, Torres Mergido, Sardina Rubén, Illesca Francisco, Saravia Adrián, Carabajal Jesús, Alvarado René, Saban Mary, Rodríguez Eleuterio, Guzmán Durbal, Sajama Sergio, Miranda Dina, Pedro Quispe, Fabiana Monasterio, Raquel Araoz, Raúl Álvarez, Rafael Mendoza, Lila Torfe, Samuel Aramayo, Jose Maidana, Hernan Terceros, Maria Sulca, Paulino Sulca, Nadia Ríos, Matías Copa, Marcos Aurelio Rodríguez, Horacio Hoyo, Alejandro Romero, Carlos Ruiz."
-    )
 
-    pdf.ln(4)
+def bloques_mensuales(en_memoria, desde, hasta, columnas):
+    """
+    Filas de [desde, hasta] de a un mes por vez, para exportaciones largas.
 
-    # --- Contacto ---
-    pdf.set_font("Helvetica", 'B', 11)
-    pdf.cell(0, 8, "Contacto:", ln=True)
+    `en_memoria` es el IndiceFechas de los datos cargados: cada bloque es
+    una porción del mes, sin copiar el período entero.
+    No usa st.session_state: corre también dentro de descargas diferidas.
+    """
+    desde = pd.Timestamp(desde).normalize()
+    hasta = pd.Timestamp(hasta).normalize()
+    columnas = list(columnas)
 
-    pdf.set_font("Helvetica", size=10)
-    pdf.cell(
-        0, 8,
-        "Para más información, podés contactarnos en: elena.hernan@inta.gob.ar",
-        ln=True
-    )    
+    for ini in pd.date_range(desde.replace(day=1), hasta, freq="MS"):
+        a, b = max(ini, desde), min(ini + pd.offsets.MonthEnd(0), hasta)
+        yield en_memoria.rango(a, b)[columnas]
 
-    # =================================================
-    # SALIDA ROBUSTA
-    # =================================================
-    data = pdf.output(dest='S')
-    return bytes(data) if isinstance(data, (bytes, bytearray)) else data.encode('latin-1', errors='replace')
-    
-    
 
 # ==============================================================
-# PDF MENSUAL POR REGIÓN / DEPARTAMENTO
+# DESCARGAS DIFERIDAS
 # ==============================================================
 
-def crear_pdf_mensual_region(df, region, fecha_desde, fecha_hasta):
-    """
-    Genera PDF mensual acumulado.
-    Divide automáticamente en semestres si hay más de 6 meses.
-    Incluye encabezado institucional y página final de créditos.
-    """
-
-    class PDF(FPDF):
-        def footer(self):
-            self.set_y(-15)
-            self.set_font("Helvetica", 'I', 8)
-            self.set_text_color(128, 128, 128)
-            self.cell(
-                0, 10,
-                'Documento generado automáticamente por el Sistema de Relevamiento Pluviométrico - INTA EEA Salta',
-                0, 0, 'L'
-            )
-            self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'R')
-
-    # =================================================
-    # CONFIGURACIÓN DE ANCHOS (OPTIMIZADOS)
-    # =================================================
-    ANCHO_EST = 58       # Pluviómetro
-    ANCHO_DEP = 38       # Departamento (reducido)
-    ANCHO_PROV = 28      # Provincia (reducido)
-    ANCHO_MES = 18       # Mes
-    ANCHO_TOTAL = 18    # Total
-
-    # =================================================
-    # PREPARACIÓN DE DATOS
-    # =================================================
-    df = df.copy()
-    df["Mes"] = df["fecha_dt"].dt.to_period("M")
-
-    tabla = (
-        df.groupby(["Pluviómetro", "Departamento", "Provincia", "Mes"])["mm"]
-        .sum()
-        .reset_index()
-    )
-
-    pivot = tabla.pivot_table(
-        index=["Pluviómetro", "Departamento", "Provincia"],
-        columns="Mes",
-        values="mm",
-        aggfunc="sum"
-    )
+# Archivos generados que se conservan en memoria (compartidos entre sesiones)
+MAX_DESCARGAS = 32
 
-    # Ordenar meses cronológicamente
-    meses = sorted(pivot.columns.tolist())
-    pivot = pivot[meses]
 
-    # Total anual
-    pivot["TOTAL"] = pivot.sum(axis=1)
+@st.cache_resource
+def _cache_descargas():
+    return {"lock": threading.Lock(), "archivos": OrderedDict()}
 
-    # Dividir meses en bloques de hasta 6
-    bloques = [meses[i:i+6] for i in range(0, len(meses), 6)]
 
-    pdf = PDF(orientation="L")
-
-    # =================================================
-    # PÁGINAS DE TABLA (1 por bloque)
-    # =================================================
-    for i, bloque in enumerate(bloques):
+def descarga_diferida(clave, generar):
+    """
+    Función sin argumentos para `st.download_button(data=...)`.
 
-        pdf.add_page()
+    El archivo se genera recién cuando el usuario hace clic y queda memorizado
+    por `clave`, que debe incluir la versión de los datos y los parámetros de
+    la consulta.
 
-        # ---------- ENCABEZADO INSTITUCIONAL ----------
-        pdf.set_fill_color(30, 58, 138)
-        pdf.rect(0, 0, 297, 45, 'F')
+    Streamlit llama a `obtener` en otro hilo, cuando la medición del rerun ya
+    se cerró: si se estaba midiendo, la generación abre su propia medición
+    (con el mismo contexto más `descarga`).
+    """
+    cache = _cache_descargas()
+    medicion = instrumentacion.actual()
+    contexto = dict(medicion.contexto, descarga=clave[0]) if medicion is not None else None
 
+    def generar_medido():
+        instrumentacion.iniciar(**contexto)
         try:
-            pdf.image("logo_inta.png", x=12, y=8, w=22)
-        except:
-            pass
-
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_font("Helvetica", 'B', 16)
-        pdf.set_xy(38, 12)
-        pdf.cell(0, 10, "CENTRO REGIONAL SALTA - JUJUY", ln=True)
-
-        pdf.set_font("Helvetica", 'B', 13)
-        pdf.set_x(38)
-        pdf.cell(0, 8, "REPORTE MENSUAL DE PRECIPITACIONES", ln=True)
-
-        pdf.ln(22)
-        pdf.set_text_color(0, 0, 0)
-
-        # ---------- DESCRIPCIÓN ----------
-        pdf.set_font("Helvetica", 'B', 12)
-        pdf.cell(0, 8, f"Región: {region}", ln=True)
-
-        pdf.set_font("Helvetica", size=11)
-        pdf.cell(
-            0, 8,
-            f"Período: {fecha_desde.strftime('%m/%Y')} a {fecha_hasta.strftime('%m/%Y')}",
-            ln=True
-        )
-
-        if len(bloques) > 1:
-            pdf.cell(
-                0, 8,
-                f"Bloque: meses {i*6 + 1} a {i*6 + len(bloque)}",
-                ln=True
-            )
-
-        pdf.ln(4)
-
-        # ---------- ENCABEZADO DE TABLA ----------
-        pdf.set_font("Helvetica", 'B', 9)
-        pdf.set_fill_color(230, 230, 230)
-
-        pdf.cell(ANCHO_EST, 8, "Pluviómetro", 1, 0, 'L', True)
-        pdf.cell(ANCHO_DEP, 8, "Departamento", 1, 0, 'L', True)
-        pdf.cell(ANCHO_PROV, 8, "Provincia", 1, 0, 'L', True)
-
-        for mes in bloque:
-            pdf.cell(ANCHO_MES, 8, mes.strftime("%m/%Y"), 1, 0, 'C', True)
-
-        if i == len(bloques) - 1:
-            pdf.cell(ANCHO_TOTAL, 8, "TOTAL", 1, 0, 'C', True)
-
-        pdf.ln()
-
-        # ---------- CUERPO DE TABLA ----------
-        pdf.set_font("Helvetica", size=9)
+            with instrumentacion.etapa(f"descarga.{clave[0]}"):
+                return generar()
+        finally:
+            instrumentacion.terminar()
+
+    def obtener():
+        with cache["lock"]:
+            if clave in cache["archivos"]:
+                cache["archivos"].move_to_end(clave)
+                return cache["archivos"][clave]
+
+        if contexto is None:
+            data = generar()
+        else:
+            # Contexto aislado: la medición no queda abierta en el hilo de Streamlit
+            data = contextvars.Context().run(generar_medido)
 
-        for idx, fila in pivot.iterrows():
-            pdf.cell(ANCHO_EST, 8, idx[0], 1)
-            pdf.cell(ANCHO_DEP, 8, idx[1], 1)
-            pdf.cell(ANCHO_PROV, 8, idx[2], 1)
+        with cache["lock"]:
+            cache["archivos"][clave] = data
+            while len(cache["archivos"]) > MAX_DESCARGAS:
+                cache["archivos"].popitem(last=False)
+        return data
 
-            for mes in bloque:
-                valor = fila[mes]
+    return obtener
 
-                if pd.notna(valor) and valor >= 1:
-                    texto = f"{valor:.1f}"
-                else:
-                    texto = ""
 
-                pdf.cell(ANCHO_MES, 8, texto, 1, 0, 'C')
+# ==============================================================
+# MAPA DE LA RED (MEMORIZADO POR VERSIÓN DEL CATÁLOGO)
+# ==============================================================
 
-            if i == len(bloques) - 1:
-                total = fila["TOTAL"]
+# Mapas de la red renderizados que se conservan (uno por búsqueda)
+MAX_MAPAS_RED = 64
 
-                if pd.notna(total) and total >= 1:
-                    texto_total = f"{total:.1f}"
-                else:
-                    texto_total = ""
 
-                pdf.cell(ANCHO_TOTAL, 8, texto_total, 1, 0, 'C')
+@st.cache_data(max_entries=4)
+def estaciones_red(version_catalogo, _df_estaciones, col_nombre_est):
+    """Estaciones del mapa de la red; `version_catalogo` invalida la caché."""
+    return mapas.estaciones_red(_df_estaciones, col_nombre_est)
 
-            pdf.ln()
 
-    # =================================================
-    # AVISO CELDAS EN BLANCO
-    # =================================================
-    pdf.ln(4)
-    pdf.set_font("Helvetica", "I", 9)
-    pdf.multi_cell(
-        0, 6,
-        "Las celdas en blanco indican ausencia de registro de precipitación.\n"
-        
-    )
-    
-    
-    # =================================================
-    # PÁGINA FINAL – EQUIPO Y COLABORADORES
-    # =================================================
-    pdf.add_page()
-
-    pdf.set_font("Helvetica", 'B', 12)
-    pdf.cell(0, 10, "Equipo de trabajo - INTA:", ln=True)
-
-    pdf.set_font("Helvetica", size=10)
-    pdf.multi_cell(
-        0, 7,
-        "Lic. Inf. Hernán Elena (EEA Salta), "
-        "Obs. Met. Germán Guanca (Meteorología - EEA Salta), "
-        "Ing. Agr. Rafael Saldaño (OIT Coronel Moldes), "
-        "Ing. Agr. Daniela Moneta (AER Valle de Lerma), "
-        "Ing. Juan Ramón Rojas (AER Santa Victoria Este), "
-        "Ing. Agr. Daniel Lamberti (AER Perico), "
-        "Tec. Recursos Hídricos Fátima del Valle Miranda (AER Palma Sola), "
-        "Ing. Agr. Florencia Diaz (AER Palma Sola), "
-        "Ing. Agr. Héctor Diaz (AER J.V. Gonzalez), "
-        "Ing. Agr. Carlos G. Cabrera (AER J.V. Gonzalez), "
-        "Lucas Diaz (AER Cafayate - OIT San Carlos), "
-        "Med. Vet. Cristina Rosetto (EECT Yuto), "
-        "Ing. RRNN Fabian Tejerina (EEA Salta), "
-        "Tec. Agr. Carlos Arias (OIT General Güemes)."
-    )
+@st.cache_data(max_entries=MAX_MAPAS_RED)
+def html_mapa_red(version_catalogo, seleccion, _df_red):
+    """HTML del mapa de la red para la búsqueda `seleccion` ("Ver todos" o un pluviómetro)."""
+    if seleccion == "Ver todos":
+        m = mapas.mapa_red(_df_red, zoom_start=7)
+    else:
+        m = mapas.mapa_red(_df_red[_df_red["Pluviómetro"] == seleccion], zoom_start=12)
+    return m.get_root().render()
 
-    pdf.ln(4)
-    pdf.set_font("Helvetica", 'B', 12)
-    pdf.cell(0, 10, "Colaboradores:", ln=True)
 
-    pdf.set_font("Helvetica", size=9)
-    pdf.multi_cell(
-        0, 6,
-        "Nicolás Uriburu, Nicolás Villegas, Matías Lanusse, Marcela López, Martín Amado, Agustín Sanz Navamuel, Luis Fernández Acevedo, Miguel A. Boasso, Luis Zavaleta, Mario Lambrisca, Noelia Rovedatti, Matías Canonica, Alejo Álvarez, Javier Montes, Guillermo Patrón Costa, Sebastián Mendilaharzu, Francisco Chehda, Jorge Robles, Gustavo Soricich, Javier Atea, Luis D. Elías, Leandro Carrizo, Daiana Núñez, Fátima González, Santiago Villalba, Juan Collado, Julio Collado, Estanislao Lara, Carlos Cruz, Daniel Espinoza, Fabián Álvarez, Lucio Señoranis, René Vallejos Rueda, Héctor Miranda, Emanuel Arias, Oscar Herrera, Francisca Vacaflor, Zaturnino Ceballos, Alcides Ceballos, Juan Ignacio Pearson, Pascual Erazo, Darío Romero, Luisa Andrada, Alejandro Ricalde, Odorico Romero, Lucas Campos, Sebastián Díaz, Carlos Sanz, Gabriel Brinder, Gastón Vizgarra, Diego Sulca, Alicia Tapia, Sergio Cassinelli, María Zamboni, Andrés Flores, Tomás Lienemann, Carmen Carattoni, Cecilia Carattoni, Tito Donoso, Javier Aprile, Carla Carattoni, Cuenca Renán, Luna Federico, Soloza Pedro, Aparicio Cirila, Torres Arnaldo, Torres Mergido, Sardina Rubén, Illesca Francisco, Saravia Adrián, Carabajal Jesús, Alvarado René, Saban Mary, Rodríguez Eleuterio, Guzmán Durbal, Sajama Sergio, Miranda Dina, Pedro Quispe, Fabiana Monasterio, Raquel Araoz, Raúl Álvarez, Rafael Mendoza, Lila Torfe, Samuel Aramayo, Jose Maidana, Hernan Terceros, Maria Sulca, Paulino Sulca, Nadia Ríos, Matías Copa, Marcos Aurelio Rodríguez, Horacio Hoyo, Alejandro Romero, Carlos Ruiz."
-    )
+def a_excel(tabla):
+    buffer = BytesIO()
+    tabla.to_excel(buffer, index=False, engine="openpyxl")
+    return buffer.getvalue()
 
-    pdf.ln(4)
-    pdf.set_font("Helvetica", 'B', 11)
-    pdf.cell(0, 8, "Contacto:", ln=True)
+# ==============================================================
+# KMZ DE UN PERÍODO (CON TIEMPO, PARA ANIMAR EN GOOGLE EARTH)
+# ==============================================================
 
-    pdf.set_font("Helvetica", size=10)
-    pdf.cell(
-        0, 8,
-        "Para más información, podés contactarnos en: elena.hernan@inta.gob.ar",
-        ln=True
+def generar_kmz_periodo(en_memoria, desde, hasta):
+    buffer = BytesIO()
+    kml.escribir_kmz(
+        bloques_mensuales(en_memoria, desde, hasta, kml.COLUMNAS_KML),
+        buffer,
+        nombre=f"Lluvia {desde.strftime('%d/%m/%Y')} - {hasta.strftime('%d/%m/%Y')}"
     )
-
-    # =================================================
-    # SALIDA ROBUSTA
-    # =================================================
-    data = pdf.output(dest="S")
-    return bytes(data) if isinstance(data, (bytes, bytearray)) else data.encode("latin-1", errors="replace")
-
-
+    return buffer.getvalue()
 
 # ==============================================================
-# KML DIARIO
+# INSTRUMENTACIÓN (PANEL DE ADMINISTRACIÓN)
 # ==============================================================
 
-def generar_kml(df):
-    kml = ET.Element("kml", xmlns="http://www.opengis.net/kml/2.2")
-    doc = ET.SubElement(kml, "Document")
+def panel_rendimiento(registro):
+    """Tiempos del rerun, caché y acumulados del proceso en el sidebar."""
+    with st.sidebar.expander("⏱️ Rendimiento (admin)"):
+        st.caption(f"Rerun: {registro['segundos']:.2f} s")
+
+        etapas = pd.DataFrame([
+            {"Etapa": n, "Segundos": e["segundos"], "Veces": e["veces"], "Filas": e.get("filas")}
+            for n, e in registro["etapas"].items()
+        ])
+        if not etapas.empty:
+            st.dataframe(
+                etapas.sort_values("Segundos", ascending=False),
+                hide_index=True, use_container_width=True
+            )
 
-    for _, r in df.iterrows():
-        pm = ET.SubElement(doc, "Placemark")
-        ET.SubElement(pm, "name").text = r["Pluviómetro"]
+        tot = instrumentacion.totales()
+        for nombre, c in tot["cache"].items():
+            st.caption(f"Caché {nombre}: {c['aciertos']} aciertos / {c['fallos']} fallos")
+        for clave, c in refrescador().contadores().items():
+            st.caption(f"Cargas {clave}: {c['ejecuciones']} ejecutadas / {c['coalescidas']} unificadas")
+        st.caption(f"Reruns medidos en el proceso: {tot['reruns']}")
 
-        desc = ET.SubElement(pm, "description")
-        desc.text = f"""
-        <b>Pluviómetro:</b> {r['Pluviómetro']}<br>
-        <b>Lluvia:</b> {r['mm']} mm<br>
-        <b>Departamento:</b> {r['Departamento']}<br>
-        <b>Provincia:</b> {r['Provincia']}
-        """
 
-        p = ET.SubElement(pm, "Point")
-        ET.SubElement(p, "coordinates").text = f"{r['lon']},{r['lat']},0"
+def cerrar_medicion():
+    """Cierra la medición del rerun (antes de terminarlo o de st.stop / st.rerun)."""
+    registro = instrumentacion.terminar()
+    if registro is not None and ES_ADMIN:
+        panel_rendimiento(registro)
 
-    return ET.tostring(kml, encoding="utf-8", xml_declaration=True)
 
 # ==============================================================
 # SIDEBAR – NAVEGACIÓN
@@ -837,6 +565,7 @@ seccion = st.sidebar.radio(
         "🗺️ Mapa",
         "📊 Día",
         "📅 Mes",
+        "🧮 Acumulado",
         "🏆 Máx / Mín",
         "📈 Histórico",
         "📑 Reportes",        
@@ -851,9 +580,63 @@ st.sidebar.markdown("---")
 # CARGA DE DATOS
 # ==============================================================
 
-df, df_estaciones, col_nombre_est = cargar_datos(
-    solo_reciente=not st.session_state.cargar_todo
-)
+# Instrumentación opcional del rerun (PLUVIO_INSTRUMENTAR o sesión de administración)
+if instrumentacion.ACTIVA or ES_ADMIN:
+    instrumentacion.iniciar(seccion=seccion, historial=st.session_state.cargar_todo)
+
+with instrumentacion.etapa("cargar_datos") as e:
+    instrumentacion.consulta_cache("cargar_datos")
+    try:
+        carga = cargar_datos(solo_reciente=not st.session_state.cargar_todo)
+    except pipeline.ERRORES_RED:
+        carga = None
+    e["filas"] = len(carga["df"]) if carga else 0
+
+if carga is None:
+    st.error(
+        "No se pudo conectar con KoboToolbox y todavía no hay una copia local "
+        "de los datos. Intente nuevamente en unos minutos."
+    )
+    cerrar_medicion()
+    st.stop()
+
+df = carga["df"]
+df_estaciones = carga["estaciones"]
+col_nombre_est = carga["col_nombre"]
+cubo = carga["cubo"]
+matriz = carga["matriz"]
+acumulado = carga["acumulado"]
+version_datos = carga["version"]
+version_catalogo = carga["version_catalogo"]
+
+# Antigüedad de los datos (y aviso si Kobo no respondió)
+if carga["datos_al"] is not None:
+    st.sidebar.caption(f"🕒 Datos al {carga['datos_al'].strftime('%d/%m/%Y %H:%M')}")
+if carga["degradado"]:
+    datos_al = carga["datos_al"].strftime("%d/%m/%Y %H:%M") if carga["datos_al"] else "la última descarga"
+    st.warning(
+        f"⚠️ KoboToolbox no responde: se muestran los datos al {datos_al}. "
+        "Se actualizarán automáticamente cuando el servicio vuelva."
+    )
+
+# Búsqueda binaria por fecha sobre la tabla ordenada (no copia datos)
+indice = datos.IndiceFechas(df)
+
+# Sin registros en el período cargado (p. ej. nada en los últimos días del modo rápido)
+if df.empty:
+    if not st.session_state.cargar_todo:
+        st.warning(
+            f"⚠️ No hay registros en los últimos {pipeline.DIAS_RECIENTES} días. "
+            "Cargue el historial completo para consultar datos anteriores."
+        )
+        if st.button("📂 Cargar historial completo", key="cargar_todo_vacio"):
+            st.session_state.cargar_todo = True
+            cerrar_medicion()
+            st.rerun()
+    else:
+        st.warning("No hay registros de precipitación para mostrar.")
+    cerrar_medicion()
+    st.stop()
 
 # ==============================================================
 # CONTROLES GLOBALES
@@ -861,7 +644,7 @@ df, df_estaciones, col_nombre_est = cargar_datos(
 
 f_hoy = st.sidebar.date_input(
     "Seleccione fecha de consulta:",
-    value=df["fecha"].max()
+    value=indice.maximo().date()
 )
 
 # =====================================================
@@ -870,11 +653,8 @@ f_hoy = st.sidebar.date_input(
 # Total de pluviómetros de la red
 total_pluvios = df_estaciones.shape[0]
 
-# Pluviómetros con registro en la fecha seleccionada
-reportados = (
-    df[df["fecha"] == f_hoy]["cod"]
-    .nunique()
-)
+# Pluviómetros con registro en la fecha seleccionada (columna de la matriz diaria)
+reportados = matriz.reportados(f_hoy)
 
 st.sidebar.markdown(
     f"**Pluviómetros reportados:** {reportados} / {total_pluvios}"
@@ -883,12 +663,12 @@ st.sidebar.markdown(
 if not st.session_state.cargar_todo:
     if st.sidebar.button("📂 Cargar historial completo"):
         st.session_state.cargar_todo = True
-        st.cache_data.clear()
+        cerrar_medicion()
         st.rerun()
 else:
     if st.sidebar.button("⚡ Volver a modo rápido"):
         st.session_state.cargar_todo = False
-        st.cache_data.clear()
+        cerrar_medicion()
         st.rerun()
 
 # ==============================================================
@@ -906,147 +686,47 @@ if seccion == "🗺️ Mapa":
         f"- Día pluviométrico"
     )
 
-    df_dia = df[df["fecha"] == f_hoy].dropna(subset=["lat", "lon"])
+    df_dia = indice.dia(f_hoy).dropna(subset=["lat", "lon"])
 
     if df_dia.empty:
         st.warning("No hay datos para la fecha seleccionada.")
     else:
-        centro = [df_dia["lat"].mean(), df_dia["lon"].mean()]
-
-        m = folium.Map(location=centro, zoom_start=7, tiles=None)
-
-        # === CAPAS BASE ===
-        folium.TileLayer(
-            tiles="https://mt1.google.com/vt/lyrs=y&x={x}&y={y}&z={z}",
-            attr="Google",
-            name="Google Satélite",
-            overlay=False,
-        ).add_to(m)
-
-        folium.TileLayer(
-            tiles="https://wms.ign.gob.ar/geoserver/gwc/service/tms/"
-                  "1.0.0/capabaseargenmap@EPSG%3A3857@png/{z}/{x}/{-y}.png",
-            attr="IGN",
-            name="Argenmap (IGN)",
-            overlay=False,
-        ).add_to(m)
-
-        # === LEYENDA ===
-        legend_html = """
-        <div style="
-            position: fixed;
-            top: 10px;
-            right: 10px;
-            width: 130px;
-            background-color: rgba(255, 255, 255, 0.9);
-            border: 2px solid #111827;
-            z-index: 9999;
-            font-size: 12px;
-            padding: 8px;
-            border-radius: 6px;
-            font-family: sans-serif;
-            line-height: 1.4;
-            box-shadow: 0 2px 6px rgba(0,0,0,0.3);
-            color: #111111;
-        ">
-            <b>Referencia</b><br>
-            <span style="display:inline-block;width:10px;height:10px;
-                background:#1a73e8;border-radius:50%;margin-right:6px;"></span>
-            0–20 mm<br>
-            <span style="display:inline-block;width:10px;height:10px;
-                background:#ef6c00;border-radius:50%;margin-right:6px;"></span>
-            20–50 mm<br>
-            <span style="display:inline-block;width:10px;height:10px;
-                background:#d32f2f;border-radius:50%;margin-right:6px;"></span>
-            +50 mm
-        </div>
-        """
-        
-        
-        
-        m.get_root().html.add_child(folium.Element(legend_html))
-
-        LocateControl(auto_start=False, flyTo=True).add_to(m)
-        folium.LayerControl(position="bottomright").add_to(m)
-
-        # === PUNTOS ===
-        for _, r in df_dia.iterrows():
-
-            # Color según lluvia
-            if r["mm"] > 50:
-                c_hex = "#d32f2f"
-                c_fol = "red"
-            elif r["mm"] > 20:
-                c_hex = "#ef6c00"
-                c_fol = "orange"
-            else:
-                c_hex = "#1a73e8"
-                c_fol = "blue"
-
-            # Ícono según fenómeno
-            icon_code = "cloud"
-            if "granizo" in r["fen_raw"]:
-                icon_code = "asterisk"
-            elif "tormenta" in r["fen_raw"]:
-                icon_code = "flash"
-            elif "viento" in r["fen_raw"]:
-                icon_code = "leaf"
-
-            popup_html = f"""
-            <div style="font-family:sans-serif;min-width:180px;">
-                <div style="
-                    margin:0;
-                    color:{c_hex};
-                    border-bottom:2px solid {c_hex};
-                    font-size:16px;
-                    font-weight:bold;
-                    padding-bottom:5px;
-                    margin-bottom:8px;">
-                    {r['Pluviómetro']}
-                </div>
-                <div style="font-size:14px;">
-                    <b>Lluvia:</b> {r['mm']} mm
-                </div>
-                <div style="font-size:13px;margin-top:4px;">
-                    <b>Fenómeno:</b> {r.get('Fenómeno atmosférico', 'S/D')}
-                </div>
-                <div style="
-                    font-size:12px;
-                    color:#333;
-                    border-top:1px solid #eee;
-                    padding-top:5px;
-                    margin-top:6px;">
-                    <b>{r['Departamento']}, {r['Provincia']}</b>
-                </div>
-            </div>
-            """
-
-            # Número grande (mm)
-            folium.map.Marker(
-                [r["lat"], r["lon"]],
-                icon=folium.DivIcon(
-                    icon_size=(40, 20),
-                    icon_anchor=(20, -10),
-                    html=f"""
-                    <div style="
-                        color:{c_hex};
-                        font-weight:900;
-                        font-size:11pt;
-                        text-shadow:1px 1px 0 #fff;">
-                        {int(r['mm'])}
-                    </div>
-                    """
-                )
-            ).add_to(m)
+        with instrumentacion.etapa("mapa.folium", len(df_dia)):
+            m = mapas.mapa_diario(df_dia)
 
-            # Marcador principal
-            folium.Marker(
-                [r["lat"], r["lon"]],
-                popup=folium.Popup(popup_html, max_width=260),
-                icon=folium.Icon(color=c_fol, icon=icon_code),
-            ).add_to(m)
+        with instrumentacion.etapa("mapa.st_folium", len(df_dia)):
+            st_folium(m, width="100%", height=560)
 
-        st_folium(m, width="100%", height=560)
+    # ============================
+    # EVENTO DE VARIOS DÍAS (KMZ CON TIEMPO)
+    # ============================
+    with st.expander("🎞️ Exportar un evento a Google Earth (KMZ animado)"):
+        col1, col2 = st.columns(2)
+        with col1:
+            ev_desde = st.date_input("Desde:", f_hoy - timedelta(days=6), key="kmz_desde")
+        with col2:
+            ev_hasta = st.date_input("Hasta:", f_hoy, key="kmz_hasta")
+
+        if ev_desde > ev_hasta:
+            st.warning("La fecha inicial debe ser anterior a la final.")
+        else:
+            # La fuente se fija acá: el archivo se genera fuera del hilo del script
+            historial = st.session_state.cargar_todo
+            en_memoria = indice
+            st.download_button(
+                "🌍 Descargar KMZ del período",
+                descarga_diferida(
+                    ("kmz_periodo", version_datos, historial, ev_desde, ev_hasta),
+                    lambda: generar_kmz_periodo(en_memoria, ev_desde, ev_hasta)
+                ),
+                file_name=f"lluvia_{ev_desde}_{ev_hasta}.kmz",
+                mime="application/vnd.google-earth.kmz",
+                use_container_width=True
+            )
+            st.caption(
+                "Un punto por pluviómetro y día, con fecha: use el control de "
+                "tiempo de Google Earth para recorrer el evento."
+            )
 
 
 # ------------------------- DÍA -------------------------
@@ -1055,7 +735,7 @@ elif seccion == "📊 Día":
 
     st.subheader(f"📊 Resumen del {f_hoy.strftime('%d/%m/%Y')}")
 
-    df_dia = df[df["fecha"] == f_hoy]
+    df_dia = indice.dia(f_hoy)
 
     if df_dia.empty:
         st.warning("No hay datos para la fecha seleccionada.")
@@ -1065,7 +745,7 @@ elif seccion == "📊 Día":
         # =================================================
         resumen_reg = (
             df_dia
-            .groupby("Region")["mm"]
+            .groupby("Region", observed=True)["mm"]
             .agg(["mean", "max", "count"])
             .sort_values("mean", ascending=False)
             .reset_index()
@@ -1082,7 +762,7 @@ elif seccion == "📊 Día":
                     st.metric(
                         label=f"Región: {r['Region']}",
                         value=f"{r['mean']:.1f} mm prom.",
-                        delta=f"Máx: {r['max']} mm ({int(r['count'])} pluviómetros)"
+                        delta=f"Máx: {r['max']:.1f} mm ({int(r['count'])} pluviómetros)"
                     )
 
         # =================================================
@@ -1103,6 +783,8 @@ elif seccion == "📊 Día":
                 ]
             ]
             .sort_values("mm", ascending=False)
+            # float32 -> float64 redondeado para que la tabla no muestre 12.300000190734863
+            .assign(mm=lambda d: d["mm"].astype("float64").round(1))
             .rename(columns={"mm": "Lluvia (mm)"}),
             use_container_width=True,
             hide_index=True
@@ -1116,7 +798,10 @@ elif seccion == "📊 Día":
         col1, col2 = st.columns(2)
 
         with col1:
-            pdf_dia = crear_pdf(df_dia, f_hoy, df_estaciones.shape[0])
+            pdf_dia = descarga_diferida(
+                ("pdf_dia", version_datos, f_hoy),
+                lambda: reporte_pdf.crear_pdf(df_dia, f_hoy, df_estaciones.shape[0])
+            )
             st.download_button(
                 "📥 Descargar PDF diario",
                 pdf_dia,
@@ -1126,7 +811,10 @@ elif seccion == "📊 Día":
             )
 
         with col2:
-            kml_dia = generar_kml(df_dia.dropna(subset=["lat", "lon"]))
+            kml_dia = descarga_diferida(
+                ("kml_dia", version_datos, f_hoy),
+                lambda: kml.generar_kml(df_dia.dropna(subset=["lat", "lon"]))
+            )
             st.download_button(
                 "📍 Descargar KML del día",
                 kml_dia,
@@ -1149,13 +837,6 @@ elif seccion == "📅 Mes":
             "Para meses/años anteriores, active «Cargar Historial Completo» en el panel lateral."
         )
 
-    # =================================================
-    # PREPARACIÓN DE DATOS
-    # =================================================
-    df_mes = df.copy()
-    df_mes["Año"] = df_mes["fecha_dt"].dt.year
-    df_mes["Mes_Num"] = df_mes["fecha_dt"].dt.month
-
     meses_n = {
         1: "Ene", 2: "Feb", 3: "Mar", 4: "Abr",
         5: "May", 6: "Jun", 7: "Jul", 8: "Ago",
@@ -1165,30 +846,26 @@ elif seccion == "📅 Mes":
     # =================================================
     # SELECTOR DE AÑO
     # =================================================
-    anios_disponibles = sorted(df_mes["Año"].unique(), reverse=True)
+    anios_disponibles = sorted(cubo["anio"].unique(), reverse=True)
     sel_anio = st.selectbox("Año:", anios_disponibles)
 
-    df_anio = df_mes[df_mes["Año"] == sel_anio].copy()
+    # =================================================
+    # PREPARACIÓN DE DATOS (rebanada del cubo mensual)
+    # =================================================
+    cubo_anio = cubo[cubo["anio"] == sel_anio]
 
-    if df_anio.empty:
+    if cubo_anio.empty:
         st.warning("No hay datos para el año seleccionado.")
     else:
         # =================================================
         # TABLA PIVOTE
         # =================================================
-        tabla = (
-            df_anio
-            .pivot_table(
-                index=["Pluviómetro", "Departamento", "Provincia"],
-                columns="Mes_Num",
-                values="mm",
-                aggfunc="sum"
-            )
-            .fillna(0)
-        )
+        # Diferencias de las sumas acumuladas en los bordes de cada mes
+        with instrumentacion.etapa("mes.pivot", len(cubo_anio)):
+            tabla = acumulado.mensual(date(int(sel_anio), 1, 1), date(int(sel_anio), 12, 31))
 
         # Renombrar columnas de meses
-        tabla.columns = [meses_n[c] for c in tabla.columns]
+        tabla.columns = [meses_n[c.month] for c in tabla.columns]
 
         # Total anual
         tabla["TOTAL"] = tabla.sum(axis=1)
@@ -1214,11 +891,14 @@ elif seccion == "📅 Mes":
         st.markdown("---")
         st.subheader("📄 Reporte mensual (PDF)")
 
-        pdf_mensual = crear_pdf_mensual_region(
-            df_anio,
-            region=f"Todas las regiones - Año {sel_anio}",
-            fecha_desde=df_anio["fecha_dt"].min().date(),
-            fecha_hasta=df_anio["fecha_dt"].max().date()
+        pdf_mensual = descarga_diferida(
+            ("pdf_mes", version_datos, sel_anio),
+            lambda: reporte_pdf.crear_pdf_mensual_region(
+                cubo_anio,
+                region=f"Todas las regiones - Año {sel_anio}",
+                fecha_desde=cubo_anio["fecha_min"].min().date(),
+                fecha_hasta=cubo_anio["fecha_max"].max().date()
+            )
         )
 
         st.download_button(
@@ -1230,6 +910,103 @@ elif seccion == "📅 Mes":
         )
 
 
+# ------------------------- ACUMULADO -------------------------
+# ------------------------- ACUMULADO -------------------------
+elif seccion == "🧮 Acumulado":
+
+    st.subheader("🧮 Lluvia acumulada por pluviómetro")
+
+    # ============================
+    # VENTANA
+    # ============================
+    ventanas = [
+        "Últimos 7 días",
+        "Últimos 15 días",
+        "Últimos 30 días",
+        "Mes calendario",
+        "Campaña agrícola (jul–jun)",
+        "Personalizado",
+    ]
+    sel_ventana = st.selectbox("Período:", ventanas)
+
+    if sel_ventana.startswith("Últimos"):
+        n_dias = int(sel_ventana.split()[1])
+        ac_desde, ac_hasta = f_hoy - timedelta(days=n_dias - 1), f_hoy
+    elif sel_ventana == "Mes calendario":
+        ac_desde, ac_hasta = f_hoy.replace(day=1), f_hoy
+    elif sel_ventana.startswith("Campaña"):
+        ac_desde, ac_hasta = datos.campania_agricola(f_hoy)[0].date(), f_hoy
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            ac_desde = st.date_input("Desde:", f_hoy - timedelta(days=29), key="acum_desde")
+        with col2:
+            ac_hasta = st.date_input("Hasta:", f_hoy, key="acum_hasta")
+
+    st.info(
+        f"Lluvia acumulada del {ac_desde.strftime('%d/%m/%Y')} "
+        f"al {ac_hasta.strftime('%d/%m/%Y')} (días pluviométricos)"
+    )
+
+    if not st.session_state.cargar_todo and pd.Timestamp(ac_desde) < matriz.fechas[0]:
+        st.warning(
+            f"⚠️ En modo rápido hay datos desde el {matriz.fechas[0].strftime('%d/%m/%Y')}. "
+            "Para el período completo, active «Cargar Historial Completo» en el panel lateral."
+        )
+
+    # ============================
+    # TOTALES (restas sobre las sumas acumuladas)
+    # ============================
+    if ac_desde > ac_hasta:
+        st.warning("La fecha inicial debe ser anterior a la final.")
+    else:
+        with instrumentacion.etapa("acumulado.ventana") as e:
+            df_acum = acumulado.ventana(ac_desde, ac_hasta)
+            e["filas"] = len(df_acum)
+
+        if df_acum.empty:
+            st.warning("No hay registros en el período seleccionado.")
+        else:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Pluviómetros con registro", f"{len(df_acum)} / {total_pluvios}")
+            col2.metric("Acumulado promedio", f"{df_acum['mm'].mean():.1f} mm")
+            col3.metric("Acumulado máximo", f"{df_acum['mm'].max():.1f} mm")
+
+            # ============================
+            # MAPA
+            # ============================
+            df_mapa = df_acum.dropna(subset=["lat", "lon"])
+            if not df_mapa.empty:
+                with instrumentacion.etapa("acumulado.mapa", len(df_mapa)):
+                    m = mapas.mapa_acumulado(df_mapa)
+                    st_folium(m, width="100%", height=560, key="mapa_acumulado")
+
+            # ============================
+            # TABLA
+            # ============================
+            tabla_acum = df_acum[[
+                "Pluviómetro",
+                "Departamento",
+                "Provincia",
+                "mm",
+                "dias"
+            ]].rename(columns={
+                "mm": "Acumulado (mm)",
+                "dias": "Días con registro"
+            }).sort_values("Acumulado (mm)", ascending=False)
+
+            st.dataframe(
+                tabla_acum.style.format({"Acumulado (mm)": "{:.1f}"}),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.caption(
+                "Suma de los registros de cada pluviómetro en el período. "
+                "Solo se listan pluviómetros con al menos un registro; "
+                "los días sin registro no se completan."
+            )
+
+
 # ------------------------- MAX / MIN -------------------------
 
 
@@ -1244,7 +1021,7 @@ elif seccion == "🏆 Máx / Mín":
     col1, col2 = st.columns(2)
 
     with col1:
-        anios = sorted(df["fecha_dt"].dt.year.unique(), reverse=True)
+        anios = sorted(cubo["anio"].unique(), reverse=True)
         sel_anio = st.selectbox("Año:", anios)
 
     with col2:
@@ -1255,7 +1032,7 @@ elif seccion == "🏆 Máx / Mín":
         }
 
         meses_disp = sorted(
-            df[df["fecha_dt"].dt.year == sel_anio]["fecha_dt"].dt.month.unique()
+            cubo[cubo["anio"] == sel_anio]["mes"].unique()
         )
 
         sel_mes = st.selectbox(
@@ -1267,21 +1044,17 @@ elif seccion == "🏆 Máx / Mín":
     # ============================
     # FILTRAR MES Y VALORES VÁLIDOS
     # ============================
-    df_mes = df[
-        (df["fecha_dt"].dt.year == sel_anio) &
-        (df["fecha_dt"].dt.month == sel_mes) &
-        (df["mm"] >= 1)
-    ].copy()
+    # ============================
+    # MÁXIMO POR PLUVIÓMETRO (reducción sobre la matriz diaria)
+    # ============================
+    inicio_mes = pd.Timestamp(year=sel_anio, month=sel_mes, day=1)
+    with instrumentacion.etapa("maxmin.maximo") as e:
+        df_max = matriz.maximo(inicio_mes, inicio_mes + pd.offsets.MonthEnd(0), minimo=1)
+        e["filas"] = len(df_max)
 
-    if df_mes.empty:
+    if df_max.empty:
         st.warning("No hay registros válidos de precipitación para el mes seleccionado.")
     else:
-        # ============================
-        # MÁXIMO POR PLUVIÓMETRO
-        # ============================
-        idx_max = df_mes.groupby("Pluviómetro")["mm"].idxmax()
-        df_max = df_mes.loc[idx_max].copy()
-
         df_max["Año"] = sel_anio
         df_max["Mes"] = meses_n[sel_mes]
         df_max["Fecha"] = df_max["fecha_dt"].dt.strftime("%d/%m/%Y")
@@ -1341,11 +1114,11 @@ elif seccion == "📈 Histórico":
     with col2:
         f_desde = st.date_input(
             "Desde:",
-            df["fecha"].min()
+            indice.minimo().date()
         )
         f_hasta = st.date_input(
             "Hasta:",
-            df["fecha"].max()
+            indice.maximo().date()
         )
 
     with col3:
@@ -1356,20 +1129,39 @@ elif seccion == "📈 Histórico":
 
     if not sel_est:
         st.info("Seleccione uno o más pluviómetros para visualizar el histórico.")
+        cerrar_medicion()
         st.stop()
 
     # ============================
     # FILTRADO BASE
     # ============================
-    df_filt = df[
-        (df["Pluviómetro"].isin(sel_est)) &
-        (df["fecha"] >= f_desde) &
-        (df["fecha"] <= f_hasta) &
-        (df["mm"] >= 1)
-    ].copy()
+    with instrumentacion.etapa(f"historico.consulta_{modo.lower()}") as e:
+        if modo == "Diario":
+            df_filt = consultar_periodo(f_desde, f_hasta, COLUMNAS_HISTORICO)
+            df_filt = df_filt[
+                (df_filt["Pluviómetro"].isin(sel_est)) &
+                (df_filt["mm"] >= 1)
+            ].copy()
+        else:
+            # Los meses completos salen del cubo; solo los bordes parciales
+            # del período se acumulan desde los registros diarios
+            completos, parciales = datos.dividir_periodo(f_desde, f_hasta)
+            partes = []
+            if completos:
+                partes.append(datos.filtrar_meses(cubo, *completos))
+            for ini, fin in parciales:
+                partes.append(datos.construir_cubo(consultar_periodo(ini, fin, COLUMNAS_CUBO)))
+
+            df_filt = pd.concat(partes, ignore_index=True)
+            df_filt = df_filt[
+                (df_filt["Pluviómetro"].isin(sel_est)) &
+                (df_filt["validos"] > 0)
+            ]
+        e["filas"] = len(df_filt)
 
     if df_filt.empty:
         st.warning("No hay datos válidos para los filtros seleccionados.")
+        cerrar_medicion()
         st.stop()
 
     # ============================
@@ -1409,9 +1201,6 @@ elif seccion == "📈 Histórico":
     # VISTA MENSUAL
     # ============================
     else:
-        df_filt["Año"] = df_filt["fecha_dt"].dt.year
-        df_filt["Mes_Num"] = df_filt["fecha_dt"].dt.month
-
         meses = {
             1:"Enero", 2:"Febrero", 3:"Marzo", 4:"Abril",
             5:"Mayo", 6:"Junio", 7:"Julio", 8:"Agosto",
@@ -1421,13 +1210,15 @@ elif seccion == "📈 Histórico":
         tabla = (
             df_filt
             .groupby(
-                ["Año", "Mes_Num", "Pluviómetro", "Departamento", "Provincia"]
-            )["mm"]
+                ["anio", "mes", "Pluviómetro", "Departamento", "Provincia"],
+                observed=True
+            )["mm_validos"]
             .sum()
             .reset_index()
+            .rename(columns={"anio": "Año", "mm_validos": "mm"})
         )
 
-        tabla["Mes"] = tabla["Mes_Num"].map(meses)
+        tabla["Mes"] = tabla["mes"].map(meses)
 
         tabla = (
             tabla[
@@ -1453,23 +1244,24 @@ elif seccion == "📈 Histórico":
 
     col_csv, col_xls = st.columns(2)
 
+    consulta = (version_datos, tuple(sel_est), f_desde, f_hasta, modo)
+
     with col_csv:
         st.download_button(
             "⬇️ Descargar CSV",
-            tabla.to_csv(index=False).encode("utf-8"),
+            descarga_diferida(
+                ("csv_hist",) + consulta,
+                lambda: tabla.to_csv(index=False).encode("utf-8")
+            ),
             file_name="historico_precipitaciones.csv",
             mime="text/csv",
             use_container_width=True
         )
 
     with col_xls:
-        buffer = BytesIO()
-        tabla.to_excel(buffer, index=False, engine="openpyxl")
-        buffer.seek(0)
-
         st.download_button(
             "⬇️ Descargar Excel",
-            buffer,
+            descarga_diferida(("xlsx_hist",) + consulta, lambda: a_excel(tabla)),
             file_name="historico_precipitaciones.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             use_container_width=True
@@ -1518,9 +1310,9 @@ elif seccion == "📑 Reportes":
     # ============================
     col1, col2 = st.columns(2)
     with col1:
-        f_desde = st.date_input("Desde:", df["fecha"].min())
+        f_desde = st.date_input("Desde:", indice.minimo().date())
     with col2:
-        f_hasta = st.date_input("Hasta:", df["fecha"].max())
+        f_hasta = st.date_input("Hasta:", indice.maximo().date())
 
     # ============================
     # AVISO HISTÓRICO
@@ -1544,12 +1336,9 @@ elif seccion == "📑 Reportes":
             + pd.offsets.MonthEnd(1)
         )
 
-        # --- filtro base por provincia y período ---
-        df_r = df[
-            (df["Provincia"] == provincia) &
-            (df["fecha_dt"] >= fecha_ini) &
-            (df["fecha_dt"] <= fecha_fin)
-        ].copy()
+        # --- filtro base por provincia y período (meses completos: rebanada del cubo) ---
+        df_r = datos.filtrar_meses(cubo, fecha_ini, fecha_fin)
+        df_r = df_r[df_r["Provincia"] == provincia]
 
         # --- lógica de departamentos ---
         if "Todos los departamentos" in departamentos_sel:
@@ -1569,11 +1358,17 @@ elif seccion == "📑 Reportes":
                 f"Provincia: {provincia} - Departamentos: {titulo_deptos}"
             )
 
-            pdf_m = crear_pdf_mensual_region(
-                df_r,
-                region=descripcion_reporte,
-                fecha_desde=fecha_ini.date(),
-                fecha_hasta=fecha_fin.date()
+            pdf_m = descarga_diferida(
+                (
+                    "pdf_reporte", version_datos, provincia,
+                    tuple(departamentos_sel), fecha_ini, fecha_fin
+                ),
+                lambda: reporte_pdf.crear_pdf_mensual_region(
+                    df_r,
+                    region=descripcion_reporte,
+                    fecha_desde=fecha_ini.date(),
+                    fecha_hasta=fecha_fin.date()
+                )
             )
 
             st.download_button(
@@ -1595,23 +1390,8 @@ elif seccion == "🌧️ Red":
     # ============================
     # BASE DE ESTACIONES (lat/lon)
     # ============================
-    df_red = df_estaciones.dropna(subset=["lat", "lon"]).copy()
-
-    # Nombre visible de estación
-    if col_nombre_est and col_nombre_est in df_red.columns:
-        df_red["Pluviómetro"] = df_red[col_nombre_est].fillna(df_red["cod"])
-    else:
-        df_red["Pluviómetro"] = df_red.get("cod", "S/D")
-
-    # Detección tolerante de columnas Depto/Prov (por si varían los nombres)
-    col_depto_base = next(
-        (c for c in df_red.columns if "depto" in c.lower() or "depart" in c.lower()),
-        None
-    )
-    col_prov_base = next(
-        (c for c in df_red.columns if "prov" in c.lower()),
-        None
-    )
+    # Solo se recalcula cuando cambia el catálogo de estaciones
+    df_red = estaciones_red(version_catalogo, df_estaciones, col_nombre_est)
 
     # ============================
     # BUSCADOR SIMPLE (opcional)
@@ -1619,87 +1399,20 @@ elif seccion == "🌧️ Red":
     opciones = ["Ver todos"] + sorted(df_red["Pluviómetro"].dropna().unique().tolist())
     seleccion = st.selectbox("🔍 Buscar un pluviómetro:", opciones, index=0)
 
-    if seleccion == "Ver todos":
-        df_mostrar = df_red
-        zoom_init = 7
-    else:
-        df_mostrar = df_red[df_red["Pluviómetro"] == seleccion]
-        zoom_init = 12
-
-    if df_mostrar.empty:
+    if df_red.empty:
         st.warning("No hay estaciones con coordenadas para mostrar.")
+        cerrar_medicion()
         st.stop()
 
     # ============================
-    # MAPA FOLIUM (sin parpadeo)
-    # ============================
-    centro = [df_mostrar["lat"].mean(), df_mostrar["lon"].mean()]
-    m_red = folium.Map(location=centro, zoom_start=zoom_init, tiles=None)
-
-    # Capas base
-    folium.TileLayer(
-        tiles="https://mt1.google.com/vt/lyrs=y&x={x}&y={y}&z={z}",
-        attr="Google",
-        name="Google Satélite",
-        overlay=False
-    ).add_to(m_red)
-
-    folium.TileLayer(
-        tiles="https://wms.ign.gob.ar/geoserver/gwc/service/tms/1.0.0/capabaseargenmap@EPSG%3A3857@png/{z}/{x}/{-y}.png",
-        attr="IGN",
-        name="Argenmap (IGN)",
-        overlay=False
-    ).add_to(m_red)
-
-    # Cluster de marcadores (mejor performance)
-    
-    #cluster = MarkerCluster().add_to(m_red)
-    pluvios = folium.FeatureGroup(
-        name="Pluviómetros",
-        overlay=False,   # 👈 CLAVE: no aparece en el control
-        control=False
-    )
-
-    cluster = MarkerCluster().add_to(pluvios)
-    m_red.add_child(pluvios)
-
-    # ============================
-    # POPUPS (Pluviómetro / Depto / Prov.)
+    # MAPA FOLIUM (HTML memorizado por catálogo y búsqueda)
     # ============================
-    for _, r in df_mostrar.iterrows():
-        depto_val = r[col_depto_base] if col_depto_base and pd.notna(r.get(col_depto_base)) else "S/D"
-        prov_val  = r[col_prov_base]  if col_prov_base  and pd.notna(r.get(col_prov_base))  else "S/D"
-
-        popup_html = f"""
-        <div style="font-family: sans-serif; min-width: 180px;">
-            <div style="font-weight:700; margin-bottom:6px;">{r['Pluviómetro']}</div>
-            <div style="font-size:13px; color:#333;">
-                <b>Depto/Prov:</b> {depto_val} / {prov_val}
-            </div>
-        </div>
-        """
-
-        folium.CircleMarker(
-            location=[r["lat"], r["lon"]],
-            radius=8,
-            color="#1E3A8A",
-            fill=True,
-            fill_color="#3B82F6",
-            fill_opacity=0.9,
-            tooltip=r["Pluviómetro"],
-            popup=folium.Popup(popup_html, max_width=260)
-        ).add_to(cluster)
-
-    # Controles
-    LocateControl(auto_start=False, flyTo=True).add_to(m_red)
-    folium.LayerControl(position="bottomright").add_to(m_red)
-
-    # Marco/estilo (opcional)
     st.markdown(
         '<div style="box-shadow:0 0 0 2px #000;border-radius:8px;margin:10px 2px;line-height:0;">',
         unsafe_allow_html=True
     )
-    st_folium(m_red, width="100%", height=600, key="mapa_red", returned_objects=[])
+    with instrumentacion.etapa("red.mapa", len(df_red)):
+        components.html(html_mapa_red(version_catalogo, seleccion, df_red), height=600)
     st.markdown('</div>', unsafe_allow_html=True)
     
 # ------------------------- INFO -------------------------
@@ -1707,3 +1420,9 @@ elif seccion == "ℹ️ Info":
     st.subheader("ℹ️ Información institucional")
 
     st.markdown(INFO_MD, unsafe_allow_html=True)
+
+# ==============================================================
+# CIERRE DEL RERUN
+# ==============================================================
+
+cerrar_medicion()
@@ -0,0 +1,83 @@
+# ==============================================================
+# BENCHMARK: PARSEO DE COORDENADAS DEL CATÁLOGO
+# extraer_coordenadas (apply fila a fila) vs parsear_coordenadas
+#
+# Uso:  python benchmarks/bench_coordenadas.py [n1 n2 ...]
+# ==============================================================
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datos  # noqa: E402
+
+
+def catalogo_sintetico(n, semilla=0):
+    """Catálogo con las tres variantes de columna, texto, lista y valores inválidos."""
+    rng = np.random.default_rng(semilla)
+    lat = rng.uniform(-26, -21.5, n).round(6)
+    lon = rng.uniform(-66.5, -62.5, n).round(6)
+
+    ubic = np.empty(n, dtype=object)
+    ubic_min = np.empty(n, dtype=object)
+    ubic_guion = np.empty(n, dtype=object)
+
+    forma = rng.integers(0, 10, n)
+    for i in range(n):
+        if forma[i] < 6:
+            ubic[i] = f"{lat[i]} {lon[i]} 1180.0 5.0"
+        elif forma[i] < 8:
+            ubic_min[i] = f"{lat[i]} {lon[i]} 0 0"
+        elif forma[i] < 9:
+            ubic_guion[i] = [lat[i], lon[i], 0, 0]
+        else:
+            ubic[i] = "sin dato"
+
+    return pd.DataFrame({
+        "Codigo_txt_del_pluviometro": np.arange(n).astype(str),
+        "Ubicaci_in": ubic,
+        "ubicaci_in": ubic_min,
+        "_Ubicaci_in": ubic_guion,
+    })
+
+
+def medir(f, repeticiones=3):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        f()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def main(tamanios):
+    print(f"{'estaciones':>10} {'apply (s)':>10} {'vector (s)':>11} {'aceleración':>12} {'inválidas':>10}")
+
+    for n in tamanios:
+        df = catalogo_sintetico(n)
+
+        t_fila = medir(lambda: df.apply(datos.extraer_coordenadas, axis=1))
+        t_vec = medir(lambda: datos.parsear_coordenadas(df))
+
+        # La versión vectorizada debe coincidir donde la original obtuvo coordenadas
+        ref = pd.DataFrame(
+            df.apply(datos.extraer_coordenadas, axis=1).tolist(),
+            columns=["lat", "lon"], index=df.index
+        ).astype(float)
+        vec = datos.parsear_coordenadas(df)
+        ok = ref["lat"].notna()
+        assert np.allclose(ref.loc[ok, ["lat", "lon"]], vec.loc[ok, ["lat", "lon"]])
+
+        print(
+            f"{n:>10} {t_fila:>10.4f} {t_vec:>11.4f} "
+            f"{t_fila / t_vec:>11.1f}x {int(vec['coord_invalida'].sum()):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100, 1_000, 10_000, 50_000])
@@ -0,0 +1,68 @@
+# ==============================================================
+# BENCHMARK: EXPORTACIÓN KMZ CON TIEMPO
+# Una temporada de registros diarios de todas las estaciones,
+# generada mes a mes (como la entrega el almacén columnar)
+#
+# Uso:  python benchmarks/bench_kml.py [estaciones] [días]
+# ==============================================================
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kml  # noqa: E402
+
+
+def meses_sinteticos(estaciones, dias, semilla=0):
+    """Genera un DataFrame por mes con un registro por estación y día."""
+    rng = np.random.default_rng(semilla)
+    lat = rng.uniform(-26, -21.5, estaciones).astype("float32")
+    lon = rng.uniform(-66.5, -62.5, estaciones).astype("float32")
+    nombres = pd.Categorical([f"Estación {i}" for i in range(estaciones)])
+    deptos = pd.Categorical(rng.choice(["Capital", "Cerrillos", "Orán", "Ledesma"], estaciones))
+    provs = pd.Categorical(rng.choice(["Salta", "Jujuy"], estaciones))
+
+    fechas = pd.date_range("2024-10-01", periods=dias, freq="D")
+    for _, mes in pd.Series(fechas).groupby(fechas.to_period("M")):
+        n = len(mes) * estaciones
+        yield pd.DataFrame({
+            "fecha_dt": np.repeat(mes.to_numpy(), estaciones),
+            "Pluviómetro": np.tile(nombres, len(mes)),
+            "Departamento": np.tile(deptos, len(mes)),
+            "Provincia": np.tile(provs, len(mes)),
+            "lat": np.tile(lat, len(mes)),
+            "lon": np.tile(lon, len(mes)),
+            "mm": rng.gamma(0.4, 12, n).round(1).astype("float32"),
+        })
+
+
+def main(estaciones, dias):
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "evento.kmz")
+
+        t0 = time.perf_counter()
+        with open(ruta, "wb") as f:
+            n = kml.escribir_kmz(meses_sinteticos(estaciones, dias), f)
+        seg = time.perf_counter() - t0
+
+        # Segunda pasada solo para medir memoria (tracemalloc enlentece mucho)
+        tracemalloc.start()
+        with open(ruta, "wb") as f:
+            kml.escribir_kmz(meses_sinteticos(estaciones, dias), f)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"estaciones: {estaciones}  días: {dias}  placemarks: {n}")
+        print(f"tiempo: {seg:.2f} s  KMZ: {os.path.getsize(ruta) / 1e6:.1f} MB  pico de memoria: {pico / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args or [2_000, 180]))
@@ -0,0 +1,70 @@
+# ==============================================================
+# BENCHMARK: MAPA DIARIO
+# Dos marcadores folium por estación vs una capa GeoJSON
+#
+# Mide el tiempo de construir y serializar el mapa (lo que hace
+# st_folium en cada rerun) y el tamaño del HTML enviado al navegador.
+#
+# Uso:  python benchmarks/bench_mapa.py [n1 n2 ...]
+# ==============================================================
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mapas  # noqa: E402
+
+
+FENOMENOS = ["", "granizo", "tormenta", "viento fuerte", "tormenta, granizo"]
+
+
+def dia_sintetico(n, semilla=0):
+    """Registros de un día para `n` estaciones con lluvias y fenómenos variados."""
+    rng = np.random.default_rng(semilla)
+    fen = rng.choice(FENOMENOS, n)
+    return pd.DataFrame({
+        "Pluviómetro": pd.Categorical([f"Estación {i}" for i in range(n)]),
+        "Departamento": pd.Categorical(rng.choice(["Capital", "Cerrillos", "Orán", "Ledesma"], n)),
+        "Provincia": pd.Categorical(rng.choice(["Salta", "Jujuy"], n)),
+        "lat": rng.uniform(-26, -21.5, n).astype("float32"),
+        "lon": rng.uniform(-66.5, -62.5, n).astype("float32"),
+        "mm": rng.gamma(1.2, 15, n).round(1).astype("float32"),
+        "fen_raw": pd.Categorical(fen),
+        "Fenómeno atmosférico": pd.Categorical(np.where(fen == "", "Ninguno", fen)),
+    })
+
+
+def medir(modo, df, repeticiones=3):
+    mejor, html = float("inf"), ""
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        html = mapas.mapa_diario(df, modo=modo).get_root().render()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor, len(html.encode("utf-8"))
+
+
+def main(tamanios):
+    print(
+        f"{'estaciones':>10} {'marcadores (s)':>15} {'geojson (s)':>12} {'aceleración':>12} "
+        f"{'marcadores (KB)':>16} {'geojson (KB)':>13} {'reducción':>10}"
+    )
+
+    for n in tamanios:
+        df = dia_sintetico(n)
+
+        t_mar, b_mar = medir("marcadores", df)
+        t_geo, b_geo = medir("geojson", df)
+
+        print(
+            f"{n:>10} {t_mar:>15.3f} {t_geo:>12.3f} {t_mar / t_geo:>11.1f}x "
+            f"{b_mar / 1024:>16.0f} {b_geo / 1024:>13.0f} {b_mar / b_geo:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100, 1_000, 5_000])
@@ -0,0 +1,65 @@
+# ==============================================================
+# BENCHMARK: REPORTE PDF MENSUAL DE TODA LA RED
+# Cubo sintético estación × mes -> crear_pdf_mensual_region
+#
+# Uso:  python benchmarks/bench_pdf.py [estaciones] [meses]
+# ==============================================================
+
+import os
+import re
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reporte_pdf  # noqa: E402
+
+
+def cubo_sintetico(estaciones, meses, semilla=0):
+    """Filas del cubo (una por estación y mes) con algunos meses sin lluvia."""
+    rng = np.random.default_rng(semilla)
+    periodos = pd.period_range("2023-01", periods=meses, freq="M")
+    mm = rng.gamma(1.0, 40, estaciones * meses)
+    mm[rng.random(len(mm)) < 0.15] = 0
+
+    return pd.DataFrame({
+        "Pluviómetro": pd.Categorical(np.repeat([f"Estación {i}" for i in range(estaciones)], meses)),
+        "Departamento": pd.Categorical(np.repeat(rng.choice(["Capital", "Cerrillos", "Orán", "Ledesma"], estaciones), meses)),
+        "Provincia": pd.Categorical(np.repeat(rng.choice(["Salta", "Jujuy"], estaciones), meses)),
+        "anio": np.tile(periodos.year, estaciones).astype("int16"),
+        "mes": np.tile(periodos.month, estaciones).astype("int8"),
+        "mm": mm,
+    }), periodos
+
+
+def main(estaciones, meses):
+    cubo, periodos = cubo_sintetico(estaciones, meses)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "reporte.pdf")
+
+        t0 = time.perf_counter()
+        reporte_pdf.crear_pdf_mensual_region(
+            cubo,
+            region="Toda la red",
+            fecha_desde=periodos[0].to_timestamp(),
+            fecha_hasta=periodos[-1].to_timestamp(how="end"),
+            destino=ruta,
+        )
+        seg = time.perf_counter() - t0
+
+        with open(ruta, "rb") as f:
+            paginas = len(re.findall(rb"/Type /Page\b", f.read()))
+        tam = os.path.getsize(ruta)
+
+    print(f"estaciones: {estaciones}  meses: {meses}  páginas: {paginas}")
+    print(f"tiempo: {seg:.2f} s  ({seg / paginas * 1000:.1f} ms/página)  PDF: {tam / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args or [2_000, 24]))
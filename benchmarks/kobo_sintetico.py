@@ -0,0 +1,115 @@
+# ==============================================================
+# GENERADOR DE RESPUESTAS SINTÉTICAS DE KOBO
+# Catálogo de estaciones (URL_MAPA) y envíos de precipitación
+# (URL_PRECIPITACIONES) con la misma forma que la API real
+# ==============================================================
+
+import numpy as np
+import pandas as pd
+
+
+# Mezcla de fenómenos por defecto (valores de la pregunta `fenomeno`)
+FENOMENOS = {"sinfeno": 0.80, "tormenta": 0.10, "viento": 0.06, "granizo": 0.04}
+
+PROVINCIAS = {
+    "Salta": ["Capital", "Cerrillos", "Chicoana", "Orán", "San Martín", "Anta", "Rosario de la Frontera", "Cafayate"],
+    "Jujuy": ["Dr. Manuel Belgrano", "El Carmen", "Ledesma", "San Pedro", "Palpalá", "Santa Bárbara"],
+}
+REGIONES = ["Valles Templados", "Chaco Semiárido", "Yungas", "Puna", "Valles Áridos"]
+
+
+def parsear_mezcla(texto):
+    """ "sinfeno=0.8,tormenta=0.1" -> dict normalizado a suma 1."""
+    mezcla = {}
+    for parte in texto.split(","):
+        clave, valor = parte.split("=")
+        mezcla[clave.strip()] = float(valor)
+    total = sum(mezcla.values())
+    return {k: v / total for k, v in mezcla.items()}
+
+
+def estaciones(n, semilla=0):
+    """
+    Registros del formulario de estaciones. La ubicación viene, como en
+    Kobo, en distintas columnas y formas (texto "lat lon alt prec" o lista),
+    con un pequeño porcentaje ilegible.
+    """
+    rng = np.random.default_rng(semilla)
+    provs = rng.choice(list(PROVINCIAS), n, p=[0.65, 0.35])
+    lat = rng.uniform(-26.2, -21.8, n).round(6)
+    lon = rng.uniform(-66.5, -62.4, n).round(6)
+    forma = rng.random(n)
+
+    registros = []
+    for i in range(n):
+        r = {
+            "_id": i + 1,
+            "_uuid": f"est-{i + 1:06d}",
+            "Codigo_txt_del_pluviometro": f"{1000 + i}.0" if i % 4 == 0 else str(1000 + i),
+            "Nombre_del_Pluviometro": f"Pluviómetro {i + 1}",
+            "Depto": str(rng.choice(PROVINCIAS[provs[i]])),
+            "Provincia": str(provs[i]),
+            "Region": str(rng.choice(REGIONES)),
+        }
+        if forma[i] < 0.70:
+            r["Ubicaci_in"] = f"{lat[i]} {lon[i]} {rng.integers(200, 3500)}.0 5.0"
+        elif forma[i] < 0.85:
+            r["ubicaci_in"] = f"{lat[i]} {lon[i]} 0 0"
+        elif forma[i] < 0.98:
+            r["_Ubicaci_in"] = [float(lat[i]), float(lon[i]), 0, 0]
+        else:
+            r["Ubicaci_in"] = "sin dato"
+        registros.append(r)
+    return registros
+
+
+def envios(catalogo, anios, densidad=0.5, fenomenos=None, hasta=None, semilla=0):
+    """
+    Envíos de precipitación: para cada estación y día de los últimos `anios`
+    años, un registro con probabilidad `densidad`. La lluvia sigue una
+    estacionalidad de verano (como en el NOA) y `fenomenos` define la mezcla
+    de la pregunta `fenomeno` (1 % de envíos la dejan sin responder).
+    """
+    rng = np.random.default_rng(semilla + 1)
+    fenomenos = fenomenos or FENOMENOS
+
+    hasta = pd.Timestamp(hasta or pd.Timestamp.now()).normalize()
+    dias = pd.date_range(hasta - pd.DateOffset(years=anios) + pd.Timedelta(days=1), hasta, freq="D")
+    codigos = np.array([int(float(e["Codigo_txt_del_pluviometro"])) for e in catalogo])
+
+    reporta = rng.random((len(dias), len(codigos))) < densidad
+    i_dia, i_est = np.nonzero(reporta)
+    n = len(i_dia)
+
+    # Más lluvia entre noviembre y marzo
+    mes = dias.month.to_numpy()[i_dia]
+    escala = 4 + 14 * (np.cos((mes - 1) / 12 * 2 * np.pi) + 1) / 2
+    llueve = rng.random(n) < 0.35
+    mm = np.where(llueve, rng.gamma(0.9, escala), 0.0).round(1)
+
+    fen = rng.choice(list(fenomenos), n, p=list(fenomenos.values()))
+    sin_respuesta = rng.random(n) < 0.01
+
+    fechas = dias.strftime("%Y-%m-%d").to_numpy()[i_dia]
+    envio = (hasta + pd.Timedelta(hours=12)).isoformat()
+
+    registros = []
+    for k in range(n):
+        r = {
+            "_id": k + 1,
+            "_uuid": f"env-{k + 1:09d}",
+            "meta/instanceID": f"uuid:env-{k + 1:09d}",
+            "_submission_time": envio,
+            "Fecha_del_dato": fechas[k],
+            "Pluviometros": str(codigos[i_est[k]]),
+            "Mil_metros_registrados": str(mm[k]),
+        }
+        if not sin_respuesta[k]:
+            r["fenomeno"] = str(fen[k])
+        registros.append(r)
+    return registros
+
+
+def respuesta(resultados):
+    """Cuerpo de una respuesta de la API (`count` + `results`, sin paginar)."""
+    return {"count": len(resultados), "next": None, "previous": None, "results": resultados}
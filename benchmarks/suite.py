@@ -0,0 +1,318 @@
+# ==============================================================
+# SUITE DE BENCHMARKS DE PUNTA A PUNTA
+# Respuestas sintéticas de Kobo -> carga -> vistas -> reportes
+#
+# Uso:
+#   python benchmarks/suite.py --estaciones 300 --anios 3 --salida actual.json
+#   python benchmarks/suite.py --comparar base.json --tolerancia 0.25
+#
+# Cada etapa se mide `--repeticiones` veces y se informa el mínimo. El
+# resultado es JSON (parámetros, versiones y segundos por etapa); con
+# --comparar sale con código 1 si alguna etapa es más lenta que la base
+# más la tolerancia.
+# ==============================================================
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datos  # noqa: E402
+import kml  # noqa: E402
+import kobo_sintetico  # noqa: E402
+import mapas  # noqa: E402
+import pipeline  # noqa: E402
+import reporte_pdf  # noqa: E402
+
+
+# ==============================================================
+# MEDICIÓN
+# ==============================================================
+
+def medir(funcion, repeticiones):
+    """(mínimo de segundos, último resultado) de llamar `funcion()` varias veces."""
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos), resultado
+
+
+def _tamano(resultado):
+    """Filas o bytes de lo que devuelve una etapa (para el informe)."""
+    if isinstance(resultado, tuple):
+        resultado = resultado[0]
+    if isinstance(resultado, (pd.DataFrame, pd.Series)):
+        return {"filas": len(resultado)}
+    if isinstance(resultado, (bytes, bytearray, str)):
+        return {"bytes": len(resultado)}
+    if isinstance(resultado, int):
+        return {"filas": resultado}
+    if isinstance(resultado, (datos.MatrizDiaria, datos.AcumuladoDiario)):
+        return {"bytes": resultado.memoria()}
+    return {}
+
+
+# ==============================================================
+# ETAPAS
+# ==============================================================
+
+def etapas(envios, estaciones):
+    """
+    Etapas en orden, como (nombre, función). Cada función usa el resultado
+    de las anteriores a través de `estado`, igual que la aplicación.
+    """
+    estado = {}
+    texto_envios = json.dumps(kobo_sintetico.respuesta(envios))
+
+    def crudo():
+        # Lo que hace kobo al recibir la respuesta: parsear JSON y armar el DataFrame
+        estado["crudo"] = pd.DataFrame(json.loads(texto_envios)["results"])
+        return estado["crudo"]
+
+    def catalogo():
+        estado["df_c"], estado["cols"] = pipeline.preparar_estaciones(pd.DataFrame(estaciones))
+        return estado["df_c"]
+
+    def normalizar():
+        estado["df_p"] = pipeline.normalizar_precipitaciones(estado["crudo"])
+        return estado["df_p"]
+
+    def unir():
+        estado["unido"] = pipeline.unir(estado["df_p"], estado["df_c"], estado["cols"])
+        return estado["unido"]
+
+    def compactar():
+        estado["df"], _ = datos.compactar(estado["unido"])
+        return estado["df"]
+
+    def cubo():
+        estado["cubo"] = datos.construir_cubo(estado["df"])
+        return estado["cubo"]
+
+    def matriz():
+        estado["matriz"] = datos.MatrizDiaria.construir(estado["df"], estado["df_c"], estado["cols"])
+        return estado["matriz"]
+
+    def acumulado():
+        estado["acumulado"] = datos.AcumuladoDiario.construir(estado["matriz"])
+        return estado["acumulado"]
+
+    def pivot_mes():
+        # "📅 Mes": rebanada anual del cubo -> pivote estación × mes
+        cubo_anio = estado["cubo"][estado["cubo"]["anio"] == estado["anio"]]
+        tabla = (
+            cubo_anio
+            .pivot_table(
+                index=["Pluviómetro", "Departamento", "Provincia"],
+                columns="mes",
+                values="mm",
+                aggfunc="sum",
+                observed=True
+            )
+            .fillna(0)
+        )
+        tabla["TOTAL"] = tabla.sum(axis=1)
+        return tabla
+
+    def mensual_acumulado():
+        # Lo mismo con diferencias de las sumas acumuladas (lo que usa la app)
+        anio = estado["anio"]
+        tabla = estado["acumulado"].mensual(pd.Timestamp(anio, 1, 1), pd.Timestamp(anio, 12, 31))
+        tabla["TOTAL"] = tabla.sum(axis=1)
+        return tabla
+
+    def ventana_campania():
+        # "🧮 Acumulado": campaña agrícola hasta el último día
+        desde, _ = datos.campania_agricola(estado["dia"])
+        return estado["acumulado"].ventana(desde, estado["dia"])
+
+    def maxmin_idxmax():
+        # "📈 Máx/Mín": registros del mes ≥ 1 mm -> máximo por estación
+        inicio_mes = estado["inicio_mes"]
+        df_mes = estado["indice"].rango(inicio_mes, inicio_mes + pd.offsets.MonthEnd(0))
+        df_mes = df_mes[df_mes["mm"] >= 1].copy()
+        idx_max = df_mes.groupby("Pluviómetro", observed=True)["mm"].idxmax()
+        return df_mes.loc[idx_max]
+
+    def maxmin_matriz():
+        # Lo mismo sobre la matriz estación × día (lo que usa la app)
+        inicio_mes = estado["inicio_mes"]
+        return estado["matriz"].maximo(inicio_mes, inicio_mes + pd.offsets.MonthEnd(0), minimo=1)
+
+    def pdf_diario():
+        return reporte_pdf.crear_pdf(estado["df_dia"], estado["dia"].date(), len(estado["df_c"]))
+
+    def pdf_mensual_red():
+        # Últimos 12 meses de toda la red
+        hasta = estado["indice"].maximo()
+        desde = (hasta - pd.DateOffset(months=11)).replace(day=1)
+        cubo_periodo = datos.filtrar_meses(estado["cubo"], desde, hasta)
+        return reporte_pdf.crear_pdf_mensual_region(cubo_periodo, "Toda la red", desde.date(), hasta.date())
+
+    def kml_diario():
+        return kml.generar_kml(estado["df_dia"])
+
+    def kmz_30_dias():
+        hasta = estado["indice"].maximo()
+        periodo = estado["indice"].rango(hasta - pd.Timedelta(days=29), hasta)[kml.COLUMNAS_KML]
+        destino = io.BytesIO()
+        kml.escribir_kmz([periodo], destino)
+        return destino.getvalue()
+
+    def mapa_diario():
+        return mapas.mapa_diario(estado["df_dia"]).get_root().render()
+
+    def mapa_red():
+        red = mapas.estaciones_red(estado["df_c"], estado["cols"]["n"])
+        return mapas.mapa_red(red).get_root().render()
+
+    def preparar_vistas():
+        # Selecciones por defecto de la app: último año, mes y día con datos
+        df = estado["df"]
+        estado["indice"] = datos.IndiceFechas(df)
+        ultimo = estado["indice"].maximo()
+        estado["anio"] = ultimo.year
+        estado["inicio_mes"] = ultimo.replace(day=1)
+        estado["dia"] = ultimo
+        estado["df_dia"] = estado["indice"].dia(ultimo).dropna(subset=["lat", "lon"]).reset_index(drop=True)
+        return estado["df_dia"]
+
+    return [
+        ("json_a_tabla", crudo),
+        ("cargar.preparar_estaciones", catalogo),
+        ("cargar.normalizar_precipitaciones", normalizar),
+        ("cargar.unir", unir),
+        ("cargar.compactar", compactar),
+        ("cargar.construir_cubo", cubo),
+        ("cargar.matriz", matriz),
+        ("cargar.acumulado", acumulado),
+        (None, preparar_vistas),
+        ("mes.pivot", pivot_mes),
+        ("mes.acumulado", mensual_acumulado),
+        ("acumulado.campania", ventana_campania),
+        ("maxmin.idxmax", maxmin_idxmax),
+        ("maxmin.matriz", maxmin_matriz),
+        ("pdf.diario", pdf_diario),
+        ("pdf.mensual_red", pdf_mensual_red),
+        ("kml.diario", kml_diario),
+        ("kml.kmz_30_dias", kmz_30_dias),
+        ("mapa.diario", mapa_diario),
+        ("mapa.red", mapa_red),
+    ]
+
+
+def ejecutar(params):
+    """Genera los datos, mide cada etapa y devuelve el informe (dict)."""
+    t0 = time.perf_counter()
+    estaciones = kobo_sintetico.estaciones(params["estaciones"], params["semilla"])
+    envios = kobo_sintetico.envios(
+        estaciones, params["anios"], params["densidad"], params["fenomenos"],
+        hasta=params["hasta"], semilla=params["semilla"],
+    )
+    generacion = time.perf_counter() - t0
+
+    resultados = {}
+    for nombre, funcion in etapas(envios, estaciones):
+        if nombre is None:
+            funcion()
+            continue
+        seg, res = medir(funcion, params["repeticiones"])
+        resultados[nombre] = {"segundos": round(seg, 4), **_tamano(res)}
+        print(f"  {nombre:<36} {seg:8.3f} s", file=sys.stderr)
+
+    resultados["cargar.total"] = {
+        "segundos": round(sum(r["segundos"] for k, r in resultados.items() if k.startswith("cargar.")), 4)
+    }
+
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {**params, "envios": len(envios)},
+        "entorno": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": __import__("numpy").__version__,
+        },
+        "generacion_segundos": round(generacion, 3),
+        "etapas": resultados,
+    }
+
+
+# Diferencias menores que esto se consideran ruido de medición
+MINIMO_SEGUNDOS = 0.01
+
+
+def comparar(actual, base, tolerancia):
+    """Etapas más lentas que la base por encima de la tolerancia: [(etapa, base, actual)]."""
+    regresiones = []
+    for nombre, r in actual["etapas"].items():
+        ref = base.get("etapas", {}).get(nombre)
+        if not ref or r["segundos"] - ref["segundos"] < MINIMO_SEGUNDOS:
+            continue
+        if r["segundos"] > ref["segundos"] * (1 + tolerancia):
+            regresiones.append((nombre, ref["segundos"], r["segundos"]))
+    return regresiones
+
+
+# ==============================================================
+# LÍNEA DE COMANDOS
+# ==============================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de carga, vistas y reportes con datos sintéticos de Kobo.")
+    parser.add_argument("--estaciones", type=int, default=300)
+    parser.add_argument("--anios", type=int, default=3, help="años de historial")
+    parser.add_argument("--densidad", type=float, default=0.5, help="probabilidad de envío por estación y día")
+    parser.add_argument(
+        "--fenomenos", type=kobo_sintetico.parsear_mezcla, default=kobo_sintetico.FENOMENOS,
+        help='mezcla de fenómenos, p. ej. "sinfeno=0.8,tormenta=0.1,viento=0.06,granizo=0.04"'
+    )
+    parser.add_argument("--hasta", default="2025-03-31", help="último día del historial (fijo para comparar corridas)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", help="archivo JSON (por defecto, salida estándar)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="aumento relativo admitido (0.25 = 25 %%)")
+    args = parser.parse_args(argv)
+
+    params = {
+        "estaciones": args.estaciones,
+        "anios": args.anios,
+        "densidad": args.densidad,
+        "fenomenos": args.fenomenos,
+        "hasta": args.hasta,
+        "semilla": args.semilla,
+        "repeticiones": max(args.repeticiones, 1),
+    }
+    informe = ejecutar(params)
+    texto = json.dumps(informe, ensure_ascii=False, indent=2)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        regresiones = comparar(informe, base, args.tolerancia)
+        for nombre, antes, ahora in regresiones:
+            print(f"REGRESIÓN {nombre}: {antes:.3f} s -> {ahora:.3f} s", file=sys.stderr)
+        if regresiones:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
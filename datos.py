@@ -0,0 +1,586 @@
+# ==============================================================
+# CAPA DE DATOS (SIN DEPENDENCIAS DE STREAMLIT)
+# ==============================================================
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+# Variantes con que Kobo exporta la pregunta de ubicación del pluviómetro
+COLUMNAS_UBICACION = ["Ubicaci_in", "ubicaci_in", "_Ubicaci_in"]
+
+
+# ==============================================================
+# COORDENADAS
+# ==============================================================
+
+def extraer_coordenadas(row):
+    """Versión fila a fila (se conserva como referencia para el benchmark)."""
+    try:
+        v = row.get("Ubicaci_in") or row.get("ubicaci_in") or row.get("_Ubicaci_in")
+        if isinstance(v, str):
+            p = v.split()
+            return float(p[0]), float(p[1])
+        if isinstance(v, list):
+            return float(v[0]), float(v[1])
+    except:
+        pass
+    return None, None
+
+
+# Forma texto de Kobo: "lat lon [altitud precisión]"
+_NUM = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_PATRON_TEXTO = rf"^\s*(?P<lat>{_NUM})\s+(?P<lon>{_NUM})(?:\s|$)"
+
+
+def _coordenadas_texto(v):
+    """lat/lon de una serie de textos con kernels de Arrow (NaN si no coincide el patrón)."""
+    arr = pa.array(v.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+    m = pc.extract_regex(arr, _PATRON_TEXTO)
+    lat = pc.cast(pc.struct_field(m, "lat"), pa.float64()).to_numpy(zero_copy_only=False)
+    lon = pc.cast(pc.struct_field(m, "lon"), pa.float64()).to_numpy(zero_copy_only=False)
+    return lat, lon
+
+
+def _coordenadas_lista(v):
+    lat = pd.to_numeric(v.str.get(0), errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(v.str.get(1), errors="coerce").to_numpy(dtype=float)
+    return lat, lon
+
+
+def parsear_coordenadas(df):
+    """
+    Extrae lat/lon de la ubicación de cada estación sin recorrer filas en Python.
+
+    Acepta la forma texto de Kobo ("lat lon alt precisión") y la forma lista
+    ([lat, lon, ...]). Si hay varias columnas de ubicación se toma, por fila,
+    la primera que tenga coordenadas legibles.
+
+    Devuelve un DataFrame con `lat`, `lon` (float64, NaN si no se pudo leer)
+    y `coord_invalida` (sin dato, ilegible o fuera de rango).
+    """
+    lat = np.full(len(df), np.nan)
+    lon = np.full(len(df), np.nan)
+
+    for c in COLUMNAS_UBICACION:
+        if c not in df.columns:
+            continue
+
+        pendiente = np.isnan(lat) | np.isnan(lon)
+        if not pendiente.any():
+            break
+
+        v = df[c].astype(object)
+        tipos = v.map(type)
+
+        for es, parsear in (
+            (tipos.eq(str).to_numpy(), _coordenadas_texto),
+            (tipos.isin([list, tuple]).to_numpy(), _coordenadas_lista),
+        ):
+            sel = es & pendiente
+            if sel.any():
+                lat[sel], lon[sel] = parsear(v[sel])
+
+    invalida = (
+        np.isnan(lat) | np.isnan(lon) |
+        (np.abs(lat) > 90) | (np.abs(lon) > 180)
+    )
+
+    return pd.DataFrame(
+        {"lat": lat, "lon": lon, "coord_invalida": invalida},
+        index=df.index
+    )
+
+
+# ==============================================================
+# ESQUEMA COMPACTO DE LA TABLA DE PRECIPITACIONES
+# ==============================================================
+
+# Cambia cuando cambia el esquema persistido o la preparación del catálogo
+# (obliga a regenerar la tabla en disco y el catálogo procesado)
+VERSION_ESQUEMA = 2
+
+# Columnas de la tabla normalizada (las que usa la aplicación)
+COLUMNAS_TABLA = [
+    "fecha_dt", "cod", "Pluviómetro", "Departamento", "Provincia", "Region",
+    "lat", "lon", "mm", "fen_raw", "Fenómeno atmosférico"
+]
+
+# Texto con pocos valores distintos: se guardan como categorías
+COLUMNAS_CATEGORICAS = [
+    "cod", "Pluviómetro", "Departamento", "Provincia", "Region",
+    "fen_raw", "Fenómeno atmosférico"
+]
+
+
+def memoria(df):
+    """Bytes ocupados por el DataFrame, incluyendo el contenido de columnas object."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def compactar(df):
+    """
+    Deja la tabla en su forma compacta:
+
+    - solo las columnas de COLUMNAS_TABLA
+    - texto repetido como `category`
+    - `mm`, `lat` y `lon` como float32
+    - `fecha_dt` normalizada al día y claves `anio` / `mes` precalculadas
+    - filas ordenadas por fecha
+
+    Es idempotente. Devuelve (df, {"antes": bytes, "despues": bytes}).
+    """
+    antes = memoria(df)
+
+    if df.empty:
+        # Sin filas (p. ej. ningún mes desde el corte): mismo esquema, aunque
+        # quien la armó no haya traído las columnas
+        df = df.reindex(columns=COLUMNAS_TABLA).astype(dict.fromkeys(COLUMNAS_CATEGORICAS, "object"))
+    df = df[COLUMNAS_TABLA].copy()
+
+    for c in COLUMNAS_CATEGORICAS:
+        # Al concatenar particiones con categorías distintas pandas vuelve a object
+        if not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+
+    df["mm"] = df["mm"].astype("float32")
+    df["lat"] = df["lat"].astype("float32")
+    df["lon"] = df["lon"].astype("float32")
+
+    df["fecha_dt"] = pd.to_datetime(df["fecha_dt"]).dt.normalize()
+    df["anio"] = df["fecha_dt"].dt.year.astype("int16")
+    df["mes"] = df["fecha_dt"].dt.month.astype("int8")
+
+    # Orden por fecha: habilita la búsqueda binaria de IndiceFechas
+    df = df.sort_values("fecha_dt", kind="stable").reset_index(drop=True)
+    return df, {"antes": antes, "despues": memoria(df)}
+
+
+# ==============================================================
+# ÍNDICE DE FECHAS
+# ==============================================================
+
+class IndiceFechas:
+    """
+    Acceso por día o rango de fechas a una tabla ordenada por `fecha_dt`.
+
+    Las búsquedas son binarias (np.searchsorted) y devuelven la porción
+    contigua de filas, sin recorrer la tabla completa. Construirlo no copia
+    datos, así que puede crearse en cada rerun.
+    """
+
+    def __init__(self, df, col="fecha_dt"):
+        self.df = df
+        self._fechas = df[col].to_numpy()
+
+    def _posicion(self, fecha, lado):
+        return int(np.searchsorted(self._fechas, np.datetime64(pd.Timestamp(fecha).normalize()), side=lado))
+
+    def rango(self, desde=None, hasta=None):
+        """Filas con fecha en [desde, hasta] (inclusive; None = sin límite)."""
+        i = 0 if desde is None else self._posicion(desde, "left")
+        j = len(self._fechas) if hasta is None else self._posicion(hasta, "right")
+        return self.df.iloc[i:j]
+
+    def dia(self, fecha):
+        return self.rango(fecha, fecha)
+
+    def minimo(self):
+        return pd.Timestamp(self._fechas[0]) if len(self._fechas) else None
+
+    def maximo(self):
+        return pd.Timestamp(self._fechas[-1]) if len(self._fechas) else None
+
+
+# ==============================================================
+# CUBO MENSUAL (ESTACIÓN × MES)
+# ==============================================================
+
+# Dimensiones del cubo: estación + metadatos territoriales + mes
+CLAVES_CUBO = ["Pluviómetro", "Departamento", "Provincia", "Region", "anio", "mes"]
+
+
+def construir_cubo(df):
+    """
+    Acumulados por estación y mes a partir de los registros diarios.
+
+    Medidas:
+    - `mm`: lluvia total del mes
+    - `mm_validos` / `validos`: suma y cantidad de registros ≥ 1 mm
+    - `registros`: cantidad de registros
+    - `fecha_min` / `fecha_max`: primer y último día con dato
+    """
+    mm = df["mm"].astype("float64")
+    valido = mm >= 1
+
+    base = df[CLAVES_CUBO].assign(
+        mm=mm,
+        mm_validos=mm.where(valido, 0.0),
+        validos=valido.astype("int32"),
+        fecha_dt=df["fecha_dt"],
+    )
+
+    return (
+        base
+        .groupby(CLAVES_CUBO, observed=True)
+        .agg(
+            mm=("mm", "sum"),
+            mm_validos=("mm_validos", "sum"),
+            validos=("validos", "sum"),
+            registros=("mm", "size"),
+            fecha_min=("fecha_dt", "min"),
+            fecha_max=("fecha_dt", "max"),
+        )
+        .reset_index()
+    )
+
+
+def filtrar_meses(cubo, desde=None, hasta=None):
+    """Filas del cubo cuyos meses caen entre el mes de `desde` y el de `hasta` (inclusive)."""
+    clave = cubo["anio"].astype("int32") * 100 + cubo["mes"].astype("int32")
+    sel = pd.Series(True, index=cubo.index)
+    if desde is not None:
+        desde = pd.Timestamp(desde)
+        sel &= clave >= desde.year * 100 + desde.month
+    if hasta is not None:
+        hasta = pd.Timestamp(hasta)
+        sel &= clave <= hasta.year * 100 + hasta.month
+    return cubo[sel]
+
+
+def dividir_periodo(desde, hasta):
+    """
+    Separa [desde, hasta] en el tramo de meses completos (que sale del cubo) y
+    los tramos parciales de los bordes (que requieren registros diarios).
+
+    Devuelve (completos, parciales): `completos` es (inicio, fin) o None y
+    `parciales` una lista de (inicio, fin). Todas las fechas son inclusive.
+    """
+    desde = pd.Timestamp(desde).normalize()
+    hasta = pd.Timestamp(hasta).normalize()
+
+    ini = desde if desde.day == 1 else desde + pd.offsets.MonthBegin(1)
+    fin = hasta if hasta.is_month_end else hasta.replace(day=1) - pd.Timedelta(days=1)
+
+    if ini > fin:
+        return None, [(desde, hasta)] if desde <= hasta else []
+
+    parciales = []
+    if desde < ini:
+        parciales.append((desde, ini - pd.Timedelta(days=1)))
+    if fin < hasta:
+        parciales.append((fin + pd.Timedelta(days=1), hasta))
+    return (ini, fin), parciales
+
+
+def periodos_mensuales(cubo):
+    """Mes de cada fila del cubo como pd.Period."""
+    return pd.PeriodIndex.from_fields(
+        year=cubo["anio"].astype(int), month=cubo["mes"].astype(int), freq="M"
+    )
+
+
+# ==============================================================
+# MATRIZ DENSA ESTACIÓN × DÍA
+# ==============================================================
+
+class MatrizDiaria:
+    """
+    Lluvia diaria como matriz float32: una fila por estación del catálogo y
+    una columna por día pluviométrico (NaN = sin registro). Ocupa
+    estaciones × días × 4 bytes.
+
+    - `valores`: np.ndarray (estaciones, días)
+    - `estaciones`: DataFrame con `cod`, `Pluviómetro`, `Departamento`,
+      `Provincia`, `Region`, `lat` y `lon` de cada fila (en el orden del catálogo)
+    - `fechas`: pd.DatetimeIndex diario de las columnas
+    - `duplicados`: (filas, columnas, máximo) de las celdas con más de un
+      registro; en `valores` esas celdas tienen la suma (como el cubo) y
+      `maximo` usa el mayor registro individual
+    - `sin_catalogo`: por día, códigos distintos con registro que no están
+      en el catálogo (no tienen fila, pero cuentan como reportados)
+
+    Recortes de días, series de una estación, sumas por ventana y
+    estadísticas de la red son indexación y reducciones de numpy.
+    """
+
+    def __init__(self, valores, estaciones, fechas, duplicados=None, sin_catalogo=None):
+        self.valores = valores
+        self.estaciones = estaciones
+        self.fechas = fechas
+        self.duplicados = duplicados if duplicados is not None else (
+            np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype="float32")
+        )
+        self.sin_catalogo = (
+            sin_catalogo if sin_catalogo is not None else np.zeros(len(fechas), dtype="int32")
+        )
+        self._filas = pd.Index(estaciones["cod"])
+
+    @classmethod
+    def construir(cls, df, df_c, cols):
+        """
+        Desde la tabla compacta (`cod`, `fecha_dt`, `mm`) y el catálogo
+        preparado (`cod` + columnas de `cols`, como en pipeline.unir). Si una
+        estación tiene más de un registro el mismo día se suman en `valores`
+        y se guarda aparte el mayor (ver `duplicados`).
+        """
+        cat = df_c.drop_duplicates("cod")
+        estaciones = pd.DataFrame({
+            "cod": cat["cod"].astype(str).to_numpy(),
+            "Pluviómetro": cat[cols["n"]].to_numpy(),
+            "Departamento": cat[cols["depto"]].fillna("S/D").to_numpy() if cols.get("depto") else "S/D",
+            "Provincia": cat[cols["prov"]].fillna("S/D").to_numpy() if cols.get("prov") else "S/D",
+            "Region": cat[cols["region"]].fillna("General").to_numpy() if cols.get("region") else "General",
+            "lat": cat["lat"].to_numpy(dtype="float64"),
+            "lon": cat["lon"].to_numpy(dtype="float64"),
+        })
+        filas = pd.Index(estaciones["cod"])
+
+        if df.empty:
+            fechas = pd.DatetimeIndex([], name="fecha_dt")
+            return cls(np.full((len(filas), 0), np.nan, dtype="float32"), estaciones, fechas)
+
+        fecha_dt = df["fecha_dt"].to_numpy()
+        fechas = pd.date_range(fecha_dt.min(), fecha_dt.max(), freq="D", name="fecha_dt")
+
+        # Fila de cada registro (códigos de la categoría -> posición en el catálogo)
+        cod = df["cod"]
+        if isinstance(cod.dtype, pd.CategoricalDtype):
+            por_categoria = filas.get_indexer(cod.cat.categories.astype(str))
+            codigos = cod.cat.codes.to_numpy()
+            fila = np.where(codigos >= 0, por_categoria[codigos], -1)
+        else:
+            codigos, categorias = pd.factorize(cod.astype(str))
+            fila = filas.get_indexer(categorias)[codigos]
+
+        n_dias = len(fechas)
+        columna = ((fecha_dt - fechas[0].to_datetime64()) // np.timedelta64(1, "D")).astype(np.int64)
+        validos = fila >= 0
+
+        plano = fila[validos].astype(np.int64) * n_dias + columna[validos]
+        celdas, inversa = np.unique(plano, return_inverse=True)
+        mm = df["mm"].to_numpy()[validos].astype("float64")
+        sumas = np.bincount(inversa, weights=mm)
+
+        valores = np.full((len(filas), n_dias), np.nan, dtype="float32")
+        valores.flat[celdas] = sumas
+
+        # Celdas con varios registros el mismo día: mayor registro individual
+        repetidas = np.bincount(inversa) > 1
+        maximos = np.full(len(celdas), -np.inf)
+        np.maximum.at(maximos, inversa, mm)
+        dup_fila, dup_col = np.divmod(celdas[repetidas], n_dias)
+        duplicados = (dup_fila, dup_col, maximos[repetidas].astype("float32"))
+
+        # Códigos fuera del catálogo: distintos por día
+        ajeno = ~validos & (codigos >= 0)
+        ajenos = np.unique(codigos[ajeno].astype(np.int64) * n_dias + columna[ajeno])
+        sin_catalogo = np.bincount(ajenos % n_dias, minlength=n_dias).astype("int32")
+
+        return cls(valores, estaciones, fechas, duplicados, sin_catalogo)
+
+    # ----------------------------------------------------------
+    # Posiciones
+    # ----------------------------------------------------------
+
+    def _columna(self, fecha, lado):
+        return int(self.fechas.searchsorted(pd.Timestamp(fecha).normalize(), side=lado))
+
+    def _rango(self, desde=None, hasta=None):
+        """Columnas [i, j) de las fechas en [desde, hasta] (inclusive; None = sin límite)."""
+        i = 0 if desde is None else self._columna(desde, "left")
+        j = len(self.fechas) if hasta is None else self._columna(hasta, "right")
+        return i, max(i, j)
+
+    def fila(self, cod):
+        """Posición de la estación `cod` (KeyError si no está en el catálogo)."""
+        return self._filas.get_loc(str(cod))
+
+    # ----------------------------------------------------------
+    # Consultas
+    # ----------------------------------------------------------
+
+    def ventana(self, desde=None, hasta=None):
+        """Vista (sin copia) de las columnas de [desde, hasta]: (estaciones, días)."""
+        i, j = self._rango(desde, hasta)
+        return self.valores[:, i:j]
+
+    def dia(self, fecha):
+        """Lluvia de cada estación en `fecha` (NaN si no reportó o fuera de rango)."""
+        i, j = self._rango(fecha, fecha)
+        if i == j:
+            return np.full(len(self._filas), np.nan, dtype="float32")
+        return self.valores[:, i]
+
+    def serie(self, cod, desde=None, hasta=None):
+        """Serie diaria de una estación (índice: fechas)."""
+        i, j = self._rango(desde, hasta)
+        return pd.Series(self.valores[self.fila(cod), i:j], index=self.fechas[i:j], name="mm")
+
+    def suma(self, desde=None, hasta=None):
+        """Lluvia acumulada por estación en [desde, hasta] (0 si no hubo registros)."""
+        return np.nansum(self.ventana(desde, hasta), axis=1, dtype="float64")
+
+    def reportes(self, desde=None, hasta=None):
+        """Cantidad de días con registro por estación en [desde, hasta]."""
+        return np.count_nonzero(~np.isnan(self.ventana(desde, hasta)), axis=1)
+
+    def reportados(self, fecha):
+        """Códigos distintos con registro en `fecha` (incluye los que no están en el catálogo)."""
+        i, j = self._rango(fecha, fecha)
+        if i == j:
+            return 0
+        return int(np.count_nonzero(~np.isnan(self.valores[:, i]))) + int(self.sin_catalogo[i])
+
+    def maximo(self, desde=None, hasta=None, minimo=1.0):
+        """
+        Mayor registro diario de cada estación en [desde, hasta], entre los
+        valores ≥ `minimo`. DataFrame con los metadatos de la estación, `mm` y
+        `fecha_dt` (primera fecha del máximo); solo estaciones con algún valor.
+        """
+        i, j = self._rango(desde, hasta)
+        bloque = self.valores[:, i:j]
+        con_valor = np.where(bloque >= minimo, bloque, -np.inf)
+
+        # Días con varios registros: cuenta el mayor, no la suma
+        dup_fila, dup_col, dup_max = self.duplicados
+        dentro = (dup_col >= i) & (dup_col < j)
+        if dentro.any():
+            v = dup_max[dentro]
+            con_valor[dup_fila[dentro], dup_col[dentro] - i] = np.where(v >= minimo, v, -np.inf)
+
+        col = con_valor.argmax(axis=1) if j > i else np.zeros(len(self._filas), dtype=np.int64)
+        mm = con_valor[np.arange(len(col)), col] if j > i else np.full(len(col), -np.inf)
+        sel = np.isfinite(mm)
+
+        return self.estaciones[sel].assign(
+            mm=mm[sel].astype("float32"),
+            fecha_dt=self.fechas[i:j][col[sel]] if j > i else pd.DatetimeIndex([]),
+        ).reset_index(drop=True)
+
+    def recortar(self, desde=None, hasta=None):
+        """Matriz de los días de [desde, hasta] (comparte memoria con esta)."""
+        i, j = self._rango(desde, hasta)
+        dup_fila, dup_col, dup_max = self.duplicados
+        dentro = (dup_col >= i) & (dup_col < j)
+        return MatrizDiaria(
+            self.valores[:, i:j], self.estaciones, self.fechas[i:j],
+            (dup_fila[dentro], dup_col[dentro] - i, dup_max[dentro]),
+            self.sin_catalogo[i:j],
+        )
+
+    def memoria(self):
+        return int(self.valores.nbytes)
+
+
+# ==============================================================
+# SUMAS ACUMULADAS POR ESTACIÓN (TOTALES DE VENTANA EN O(1))
+# ==============================================================
+
+class AcumuladoDiario:
+    """
+    Suma acumulada de la lluvia diaria de cada estación sobre una
+    MatrizDiaria (sin registro = 0), más la cuenta acumulada de días con
+    registro.
+
+    `acum[:, k]` es la lluvia de los k primeros días, así el total de
+    cualquier ventana [i, j) es `acum[:, j] - acum[:, i]`: una resta por
+    estación, sin importar el largo de la ventana (mes, campaña, últimos N
+    días o un rango cualquiera).
+    """
+
+    def __init__(self, acum, cuenta, matriz):
+        self.acum = acum
+        self.cuenta = cuenta
+        self.matriz = matriz
+        self.estaciones = matriz.estaciones
+        self.fechas = matriz.fechas
+
+    @classmethod
+    def construir(cls, matriz):
+        """Índice de `matriz` (una pasada de cumsum por estación)."""
+        valores = matriz.valores
+        n_est, n_dias = valores.shape
+        acum = np.empty((n_est, n_dias + 1), dtype="float64")
+        cuenta = np.empty((n_est, n_dias + 1), dtype="int32")
+        acum[:, 0] = 0
+        cuenta[:, 0] = 0
+        np.nancumsum(valores, axis=1, dtype="float64", out=acum[:, 1:])
+        np.cumsum(~np.isnan(valores), axis=1, dtype="int32", out=cuenta[:, 1:])
+        return cls(acum, cuenta, matriz)
+
+    # ----------------------------------------------------------
+    # Consultas
+    # ----------------------------------------------------------
+
+    def _rango(self, desde=None, hasta=None):
+        return self.matriz._rango(desde, hasta)
+
+    def total(self, desde=None, hasta=None):
+        """Lluvia acumulada de cada estación en [desde, hasta]."""
+        i, j = self._rango(desde, hasta)
+        return self.acum[:, j] - self.acum[:, i]
+
+    def dias(self, desde=None, hasta=None):
+        """Días con registro de cada estación en [desde, hasta]."""
+        i, j = self._rango(desde, hasta)
+        return self.cuenta[:, j] - self.cuenta[:, i]
+
+    def ventana(self, desde=None, hasta=None):
+        """
+        Estaciones con algún registro en [desde, hasta]: metadatos de la
+        estación, `mm` (acumulado) y `dias` (días con registro).
+        """
+        dias = self.dias(desde, hasta)
+        sel = dias > 0
+        return self.estaciones[sel].assign(
+            mm=self.total(desde, hasta)[sel],
+            dias=dias[sel],
+        ).reset_index(drop=True)
+
+    def mensual(self, desde=None, hasta=None):
+        """
+        Lluvia por estación y mes calendario en [desde, hasta]: DataFrame con
+        índice (Pluviómetro, Departamento, Provincia) y una columna por mes
+        (pd.Period mensual, así un rango de más de un año no repite
+        columnas), solo estaciones y meses con registros.
+        """
+        i, j = self._rango(desde, hasta)
+        if i == j:
+            return pd.DataFrame()
+
+        fechas = self.fechas[i:j]
+        inicio_mes = np.flatnonzero(fechas.is_month_start)
+        bordes = np.unique(np.concatenate([[0], inicio_mes, [j - i]])) + i
+
+        totales = np.diff(self.acum[:, bordes], axis=1)
+        dias = np.diff(self.cuenta[:, bordes], axis=1)
+
+        filas = dias.sum(axis=1) > 0
+        meses = dias.sum(axis=0) > 0
+        return pd.DataFrame(
+            totales[np.ix_(filas, meses)],
+            index=pd.MultiIndex.from_frame(
+                self.estaciones.loc[filas, ["Pluviómetro", "Departamento", "Provincia"]]
+            ),
+            columns=self.fechas[bordes[:-1]][meses].to_period("M"),
+        )
+
+    def recortar(self, desde=None, hasta=None):
+        """Índice de los días de [desde, hasta] (vista; las restas siguen siendo válidas)."""
+        i, j = self._rango(desde, hasta)
+        return AcumuladoDiario(
+            self.acum[:, i:j + 1], self.cuenta[:, i:j + 1], self.matriz.recortar(desde, hasta)
+        )
+
+    def memoria(self):
+        return int(self.acum.nbytes + self.cuenta.nbytes)
+
+
+def campania_agricola(fecha):
+    """(1 de julio, 30 de junio) de la campaña agrícola que contiene `fecha`."""
+    fecha = pd.Timestamp(fecha)
+    anio = fecha.year if fecha.month >= 7 else fecha.year - 1
+    return pd.Timestamp(anio, 7, 1), pd.Timestamp(anio + 1, 6, 30)
@@ -0,0 +1,133 @@
+# ==============================================================
+# INSTANTÁNEAS DE RESPUESTAS DE KOBO (GRABAR / REPRODUCIR)
+# ==============================================================
+#
+# Una instantánea es el contenido completo de un formulario (lista de
+# envíos tal como los devuelve la API) guardado como JSON comprimido, un
+# archivo por asset. Al reproducir se responde cada pedido a partir de la
+# instantánea, aplicando el subconjunto de la API que usa kobo.py:
+# `query` sobre `_id` ($gt, $gte, $lt, $lte, $in) o igualdad, `fields`,
+# `start` / `limit` y `count` en la respuesta.
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+
+# Instantáneas ya leídas: {ruta: (mtime, envíos ordenados por _id)}
+_leidas = {}
+_leidas_lock = threading.Lock()
+
+
+def nombre(url):
+    """Nombre de archivo de la instantánea de `url` (uid del asset de Kobo)."""
+    m = re.search(r"/assets/([^/]+)/", url)
+    clave = m.group(1) if m else hashlib.sha1(url.split("?")[0].encode("utf-8")).hexdigest()[:16]
+    return f"{clave}.json.gz"
+
+
+def ruta(directorio, url):
+    return os.path.join(directorio, nombre(url))
+
+
+def guardar(directorio, url, envios):
+    """Guarda los envíos de `url` (reemplazo atómico). Devuelve la ruta."""
+    os.makedirs(directorio, exist_ok=True)
+    destino = ruta(directorio, url)
+    envios = sorted(envios, key=lambda e: int(e["_id"]))
+
+    tmp = f"{destino}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(
+            {
+                "url": url,
+                "grabado": datetime.now().isoformat(timespec="seconds"),
+                "count": len(envios),
+                "results": envios,
+            },
+            f,
+            ensure_ascii=False
+        )
+    os.replace(tmp, destino)
+    return destino
+
+
+def existe(directorio, url):
+    return os.path.exists(ruta(directorio, url))
+
+
+def leer(directorio, url):
+    """Envíos de la instantánea de `url`, ordenados por `_id` (FileNotFoundError si no hay)."""
+    origen = ruta(directorio, url)
+    mtime = os.path.getmtime(origen)
+
+    with _leidas_lock:
+        previo = _leidas.get(origen)
+        if previo is not None and previo[0] == mtime:
+            return previo[1]
+
+    with gzip.open(origen, "rt", encoding="utf-8") as f:
+        envios = json.load(f)["results"]
+
+    with _leidas_lock:
+        _leidas[origen] = (mtime, envios)
+    return envios
+
+
+# ==============================================================
+# EMULACIÓN DE LA API
+# ==============================================================
+
+_OPERADORES = {
+    "$gt": lambda v, x: v > x,
+    "$gte": lambda v, x: v >= x,
+    "$lt": lambda v, x: v < x,
+    "$lte": lambda v, x: v <= x,
+    "$in": lambda v, x: v in x,
+}
+
+
+def _preparar(query):
+    """Query con los operandos de `$in` ya convertidos a conjunto (una vez por consulta)."""
+    return {
+        campo: (
+            {op: set(x) if op == "$in" else x for op, x in condicion.items()}
+            if isinstance(condicion, dict) else condicion
+        )
+        for campo, condicion in query.items()
+    }
+
+
+def _cumple(envio, query):
+    for campo, condicion in query.items():
+        valor = envio.get(campo)
+        if not isinstance(condicion, dict):
+            if valor != condicion:
+                return False
+            continue
+        for op, x in condicion.items():
+            if valor is None or not _OPERADORES[op](valor, x):
+                return False
+    return True
+
+
+def responder(envios, params=None):
+    """Cuerpo de respuesta de la API para `params` sobre los envíos de la instantánea."""
+    params = params or {}
+
+    query = _preparar(json.loads(params["query"])) if params.get("query") else None
+    seleccion = [e for e in envios if _cumple(e, query)] if query else envios
+
+    start = int(params.get("start", 0))
+    limit = params.get("limit")
+    pagina = seleccion[start:start + int(limit)] if limit is not None else seleccion[start:]
+
+    if params.get("fields"):
+        campos = json.loads(params["fields"])
+        pagina = [{c: e[c] for c in campos if c in e} for e in pagina]
+
+    return {"count": len(seleccion), "next": None, "previous": None, "results": pagina}
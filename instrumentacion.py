@@ -0,0 +1,195 @@
+# ==============================================================
+# INSTRUMENTACIÓN DE RERUNS (OPCIONAL)
+# Tiempos por etapa, aciertos de caché y filas procesadas
+# ==============================================================
+#
+# Sin dependencias de Streamlit. La aplicación abre una medición al
+# comienzo de cada rerun (iniciar) y la cierra al final (terminar); en el
+# medio cualquier módulo registra etapas con:
+#
+#   with instrumentacion.etapa("mes.pivot") as e:
+#       ...
+#       e["filas"] = len(tabla)
+#
+# Sin medición abierta las llamadas no hacen nada. Cada medición cerrada
+# se emite como una línea JSON por logging (y en PLUVIO_METRICAS, si está
+# definido).
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+log = logging.getLogger(__name__)
+
+
+# Activa la instrumentación en todas las sesiones (si no, solo en la de administración)
+ACTIVA = os.environ.get("PLUVIO_INSTRUMENTAR", "").lower() in ("1", "si", "true")
+
+# Archivo JSONL donde además se agregan las mediciones (opcional)
+ARCHIVO_METRICAS = os.environ.get("PLUVIO_METRICAS")
+
+_actual = contextvars.ContextVar("medicion", default=None)
+
+# Acumulados del proceso (todas las sesiones)
+_totales = {"reruns": 0, "etapas": {}, "cache": {}}
+_totales_lock = threading.Lock()
+_archivo_lock = threading.Lock()
+
+
+class Medicion:
+    """Etapas y consultas de caché de un rerun. Segura entre hilos."""
+
+    def __init__(self, **contexto):
+        self.contexto = contexto
+        self.fecha = datetime.now().isoformat(timespec="seconds")
+        self.t0 = time.perf_counter()
+        self.etapas = {}
+        self.cache = {}
+        self._lock = threading.Lock()
+
+    def sumar(self, nombre, segundos, filas=None):
+        with self._lock:
+            e = self.etapas.setdefault(nombre, {"segundos": 0.0, "veces": 0})
+            e["segundos"] += segundos
+            e["veces"] += 1
+            if filas is not None:
+                e["filas"] = e.get("filas", 0) + int(filas)
+
+    def consulta_cache(self, nombre):
+        with self._lock:
+            self.cache.setdefault(nombre, {"consultas": 0, "fallos": 0})["consultas"] += 1
+
+    def fallo_cache(self, nombre):
+        with self._lock:
+            self.cache.setdefault(nombre, {"consultas": 0, "fallos": 0})["fallos"] += 1
+
+    def como_dict(self):
+        with self._lock:
+            return {
+                "fecha": self.fecha,
+                **self.contexto,
+                "segundos": round(time.perf_counter() - self.t0, 4),
+                "etapas": {
+                    n: {**e, "segundos": round(e["segundos"], 4)} for n, e in self.etapas.items()
+                },
+                "cache": {
+                    n: {**c, "aciertos": max(c["consultas"] - c["fallos"], 0)}
+                    for n, c in self.cache.items()
+                },
+            }
+
+
+# ==============================================================
+# API
+# ==============================================================
+
+def iniciar(**contexto):
+    """Abre la medición del rerun actual (`contexto` va tal cual al registro)."""
+    m = Medicion(**contexto)
+    _actual.set(m)
+    return m
+
+
+def actual():
+    return _actual.get()
+
+
+def sumar(nombre, segundos, filas=None):
+    m = _actual.get()
+    if m is not None:
+        m.sumar(nombre, segundos, filas)
+
+
+@contextmanager
+def etapa(nombre, filas=None):
+    """
+    Mide el bloque como la etapa `nombre`. Devuelve un dict donde el bloque
+    puede dejar `filas` (cantidad de filas procesadas).
+    """
+    info = {"filas": filas}
+    if _actual.get() is None:
+        yield info
+        return
+
+    t0 = time.perf_counter()
+    try:
+        yield info
+    finally:
+        sumar(nombre, time.perf_counter() - t0, info.get("filas"))
+
+
+def consulta_cache(nombre):
+    """Cuenta una llamada a la función memorizada `nombre` (acierto o fallo)."""
+    m = _actual.get()
+    if m is not None:
+        m.consulta_cache(nombre)
+
+
+def fallo_cache(nombre):
+    """Lo llama el cuerpo de la función memorizada: solo se ejecuta en un fallo."""
+    m = _actual.get()
+    if m is not None:
+        m.fallo_cache(nombre)
+
+
+def _preparar_log():
+    """
+    Sin configuración de logging las líneas INFO se descartan: en ese caso
+    el logger de este módulo emite por stderr. Respeta una configuración
+    propia (nivel o handlers) si la hay.
+    """
+    if log.level == logging.NOTSET:
+        log.setLevel(logging.INFO)
+    if not log.handlers and not logging.getLogger().handlers:
+        salida = logging.StreamHandler()
+        salida.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(salida)
+
+
+def terminar():
+    """Cierra la medición actual, la emite como línea JSON y la devuelve (None si no había)."""
+    m = _actual.get()
+    if m is None:
+        return None
+    _actual.set(None)
+
+    registro = m.como_dict()
+    _acumular(registro)
+
+    linea = json.dumps(registro, ensure_ascii=False, default=str)
+    _preparar_log()
+    log.info(linea)
+    if ARCHIVO_METRICAS:
+        with _archivo_lock, open(ARCHIVO_METRICAS, "a", encoding="utf-8") as f:
+            f.write(linea + "\n")
+    return registro
+
+
+# ==============================================================
+# ACUMULADOS DEL PROCESO
+# ==============================================================
+
+def _acumular(registro):
+    with _totales_lock:
+        _totales["reruns"] += 1
+        for nombre, e in registro["etapas"].items():
+            t = _totales["etapas"].setdefault(nombre, {"segundos": 0.0, "veces": 0, "maximo": 0.0})
+            t["segundos"] += e["segundos"]
+            t["veces"] += e["veces"]
+            t["maximo"] = max(t["maximo"], e["segundos"])
+        for nombre, c in registro["cache"].items():
+            t = _totales["cache"].setdefault(nombre, {"aciertos": 0, "fallos": 0})
+            t["aciertos"] += c["aciertos"]
+            t["fallos"] += c["fallos"]
+
+
+def totales():
+    """Acumulados del proceso desde su inicio: reruns, etapas y caché."""
+    with _totales_lock:
+        return json.loads(json.dumps(_totales))
@@ -0,0 +1,161 @@
+# ==============================================================
+# EXPORTACIÓN KML / KMZ (GOOGLE EARTH)
+# ==============================================================
+#
+# - generar_kml: las estaciones de un día.
+# - escribir_kml / escribir_kmz: un Placemark por registro diario con
+#   <TimeStamp>, de modo que Google Earth pueda animar un evento de
+#   lluvia de varios días.
+#
+# El documento del período se escribe por bloques: cada bloque de filas
+# se convierte a texto con operaciones vectorizadas y se vuelca al
+# destino, así que la memoria no crece con el largo del período exportado.
+
+import xml.etree.ElementTree as ET
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from mapas import CLASES_LLUVIA
+
+
+# Columnas que necesita el exportador
+COLUMNAS_KML = ["fecha_dt", "Pluviómetro", "Departamento", "Provincia", "lat", "lon", "mm"]
+
+# Filas que se convierten a texto de una vez
+FILAS_POR_BLOQUE = 20_000
+
+
+# ==============================================================
+# KML DIARIO
+# ==============================================================
+
+def generar_kml(df):
+    """KML de un día: un Placemark por estación de `df` (con lat/lon)."""
+    kml = ET.Element("kml", xmlns="http://www.opengis.net/kml/2.2")
+    doc = ET.SubElement(kml, "Document")
+
+    for _, r in df.iterrows():
+        pm = ET.SubElement(doc, "Placemark")
+        ET.SubElement(pm, "name").text = r["Pluviómetro"]
+
+        desc = ET.SubElement(pm, "description")
+        desc.text = f"""
+        <b>Pluviómetro:</b> {r['Pluviómetro']}<br>
+        <b>Lluvia:</b> {r['mm']:.1f} mm<br>
+        <b>Departamento:</b> {r['Departamento']}<br>
+        <b>Provincia:</b> {r['Provincia']}
+        """
+
+        p = ET.SubElement(pm, "Point")
+        ET.SubElement(p, "coordinates").text = f"{r['lon']},{r['lat']},0"
+
+    return ET.tostring(kml, encoding="utf-8", xml_declaration=True)
+
+
+# ==============================================================
+# KML / KMZ DE UN PERÍODO (ESCRITURA POR BLOQUES)
+# ==============================================================
+
+def _color_kml(c_hex):
+    """#rrggbb -> aabbggrr (orden de colores de KML)."""
+    r, g, b = c_hex[1:3], c_hex[3:5], c_hex[5:7]
+    return f"ff{b}{g}{r}"
+
+
+def _cabecera(nombre):
+    estilos = "".join(
+        f'<Style id="lluvia{k}"><IconStyle><color>{_color_kml(c_hex)}</color>'
+        f"<Icon><href>http://maps.google.com/mapfiles/kml/paddle/wht-blank.png</href></Icon>"
+        f"</IconStyle></Style>\n"
+        for k, (_, c_hex, _) in enumerate(CLASES_LLUVIA)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<kml xmlns="http://www.opengis.net/kml/2.2">\n'
+        f"<Document><name>{_escapar_texto(nombre)}</name>\n{estilos}"
+    )
+
+
+_PIE = "</Document>\n</kml>\n"
+
+
+def _escapar_texto(s):
+    return str(s).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _escapar(s):
+    """Serie de texto escapada para XML (se escapa cada valor distinto una sola vez)."""
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype("category")
+    s = s.cat.rename_categories([_escapar_texto(c) for c in s.cat.categories])
+    return s.astype(object).fillna("S/D")
+
+
+def _clase(mm):
+    return np.select(
+        [mm > u for u, _, _ in CLASES_LLUVIA[:-1]],
+        [str(k) for k in range(len(CLASES_LLUVIA) - 1)],
+        default=str(len(CLASES_LLUVIA) - 1),
+    ).astype(object)
+
+
+def _placemarks(df):
+    """Texto KML de los Placemark de `df`, armado columna a columna."""
+    df = df.dropna(subset=["lat", "lon"])
+    if df.empty:
+        return ""
+
+    mm = df["mm"].to_numpy(dtype="float64")
+    fecha = np.datetime_as_string(df["fecha_dt"].to_numpy(dtype="datetime64[D]"), unit="D").astype(object)
+    lat = np.char.mod("%.5f", df["lat"].to_numpy(dtype="float64")).astype(object)
+    lon = np.char.mod("%.5f", df["lon"].to_numpy(dtype="float64")).astype(object)
+    lluvia = np.char.mod("%.1f", mm).astype(object)
+
+    nombre = _escapar(df["Pluviómetro"]).to_numpy(dtype=object)
+    depto = _escapar(df["Departamento"]).to_numpy(dtype=object)
+    prov = _escapar(df["Provincia"]).to_numpy(dtype=object)
+
+    # Los valores ya están escapados: no pueden cerrar el CDATA
+    texto = (
+        "<Placemark><name>" + nombre + "</name>"
+        "<TimeStamp><when>" + fecha + "</when></TimeStamp>"
+        "<styleUrl>#lluvia" + _clase(mm) + "</styleUrl>"
+        "<description><![CDATA[<b>Pluviómetro:</b> " + nombre
+        + "<br><b>Fecha:</b> " + fecha
+        + "<br><b>Lluvia:</b> " + lluvia + " mm"
+        + "<br><b>Departamento:</b> " + depto
+        + "<br><b>Provincia:</b> " + prov + "]]></description>"
+        "<Point><coordinates>" + lon + "," + lat + ",0</coordinates></Point>"
+        "</Placemark>\n"
+    )
+    return "".join(texto)
+
+
+def escribir_kml(bloques, destino, nombre="Red Pluviométrica"):
+    """
+    Escribe en `destino` (archivo binario abierto) un KML con un Placemark por
+    registro de los DataFrames de `bloques` (con COLUMNAS_KML).
+
+    `bloques` puede ser un generador: se consume de a un DataFrame por vez.
+    Devuelve la cantidad de registros escritos.
+    """
+    destino.write(_cabecera(nombre).encode("utf-8"))
+
+    n = 0
+    for df in bloques:
+        for i in range(0, len(df), FILAS_POR_BLOQUE):
+            parte = df.iloc[i:i + FILAS_POR_BLOQUE]
+            destino.write(_placemarks(parte).encode("utf-8"))
+            n += int(parte["lat"].notna().mul(parte["lon"].notna()).sum())
+
+    destino.write(_PIE.encode("utf-8"))
+    return n
+
+
+def escribir_kmz(bloques, destino, nombre="Red Pluviométrica"):
+    """Igual que escribir_kml, comprimido como KMZ (doc.kml dentro de un ZIP)."""
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        with z.open("doc.kml", "w") as f:
+            return escribir_kml(bloques, f, nombre)
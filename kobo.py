@@ -0,0 +1,677 @@
+# ==============================================================
+# ACCESO A KOBO (INTA TERRITORIOS)
+# Sincronización incremental de envíos con almacén local
+# ==============================================================
+
+import contextvars
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import instantaneas
+import instrumentacion
+
+
+log = logging.getLogger(__name__)
+
+
+# Directorio local donde se persisten los datos descargados
+DIR_DATOS = os.environ.get("PLUVIO_DIR_DATOS", ".datos")
+
+# Campos mínimos para conciliar ediciones y bajas sin bajar registros completos
+CAMPOS_INDICE = ["_id", "meta/instanceID", "_uuid"]
+
+# Cantidad máxima de _id por consulta "$in" al re-descargar registros editados
+LOTE_IDS = 500
+
+# Paginación de descargas (parámetros `start`/`limit` de la API de Kobo)
+TAM_PAGINA = int(os.environ.get("PLUVIO_TAM_PAGINA", 1000))
+
+# Páginas pedidas en paralelo cuando se conoce el total de envíos (`count`)
+PAGINAS_CONCURRENTES = int(os.environ.get("PLUVIO_PAGINAS_CONCURRENTES", 4))
+
+
+# Antigüedad máxima del catálogo de estaciones antes de volver a consultarlo (segundos)
+TTL_CATALOGO = int(os.environ.get("PLUVIO_TTL_CATALOGO", 6 * 3600))
+
+# Tiempo máximo de conexión y de lectura por pedido (segundos)
+TIMEOUT = (
+    float(os.environ.get("PLUVIO_TIMEOUT_CONEXION", 5)),
+    float(os.environ.get("PLUVIO_TIMEOUT_LECTURA", 30)),
+)
+
+# Tiempo máximo de una sincronización completa cuando hay copia local para usar en su lugar
+PRESUPUESTO_SINCRONIZACION = float(os.environ.get("PLUVIO_PRESUPUESTO", 45))
+
+# Circuito: tras FALLAS_CIRCUITO errores seguidos no se consulta a Kobo durante ESPERA_CIRCUITO segundos
+FALLAS_CIRCUITO = 3
+ESPERA_CIRCUITO = int(os.environ.get("PLUVIO_ESPERA_CIRCUITO", 300))
+
+# Reintentos ante errores de red o respuestas 429/5xx, con espera exponencial
+REINTENTOS = 3
+BACKOFF = 0.5
+
+# Instantáneas de las respuestas (ver instantaneas.py):
+#   - "grabar": se consulta a Kobo y se guarda el contenido completo de cada formulario
+#   - "reproducir": se responde desde las instantáneas, sin red ni token
+MODO_RED = os.environ.get("PLUVIO_KOBO_MODO", "").lower()
+DIR_INSTANTANEAS = os.environ.get("PLUVIO_INSTANTANEAS", os.path.join(DIR_DATOS, "instantaneas"))
+
+# Demora agregada a cada respuesta reproducida (segundos), para simular la red
+LATENCIA_REPRODUCCION = float(os.environ.get("PLUVIO_LATENCIA", 0))
+
+
+# ==============================================================
+# CLIENTE HTTP
+# ==============================================================
+
+def crear_sesion(reintentos=REINTENTOS, backoff=BACKOFF):
+    """
+    Sesión con conexiones persistentes (keep-alive) y reintentos acotados.
+    requests ya negocia gzip/deflate y descomprime la respuesta.
+    """
+    retry = Retry(
+        total=reintentos,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry,
+        pool_connections=2,
+        pool_maxsize=max(PAGINAS_CONCURRENTES, 2) * 2,
+    )
+    s = requests.Session()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+_sesion = None
+_sesion_lock = threading.Lock()
+
+
+def sesion():
+    """Sesión compartida por todos los pedidos del proceso."""
+    global _sesion
+    with _sesion_lock:
+        if _sesion is None:
+            _sesion = crear_sesion()
+        return _sesion
+
+
+# ==============================================================
+# CIRCUITO (CORTA LAS CONSULTAS MIENTRAS KOBO NO RESPONDE)
+# ==============================================================
+
+class KoboNoDisponible(RuntimeError):
+    """Kobo no respondió a tiempo o el circuito está abierto."""
+
+
+class Circuito:
+    """
+    Interruptor de pedidos a Kobo (circuit breaker).
+
+    - cerrado: los pedidos pasan; cada error seguido suma una falla
+    - abierto: tras `fallas` errores seguidos, los pedidos fallan al instante
+      durante `espera` segundos, sin tocar la red
+    - semiabierto: vencida la espera pasa un único pedido de prueba; si
+      responde se cierra, si falla se vuelve a abrir
+    """
+
+    def __init__(self, fallas=FALLAS_CIRCUITO, espera=ESPERA_CIRCUITO):
+        self.fallas_max = fallas
+        self.espera = espera
+        self._fallas = 0
+        self._abierto_hasta = None
+        self._probando = False
+        self._lock = threading.Lock()
+
+    def estado(self):
+        with self._lock:
+            if self._abierto_hasta is None:
+                return "cerrado"
+            return "abierto" if time.time() < self._abierto_hasta else "semiabierto"
+
+    def permitir(self):
+        with self._lock:
+            if self._abierto_hasta is None:
+                return True
+            if time.time() < self._abierto_hasta or self._probando:
+                return False
+            self._probando = True
+            return True
+
+    def exito(self):
+        with self._lock:
+            if self._abierto_hasta is not None:
+                log.info("Kobo responde de nuevo: circuito cerrado")
+            self._fallas = 0
+            self._abierto_hasta = None
+            self._probando = False
+
+    def falla(self):
+        with self._lock:
+            self._fallas += 1
+            if self._probando or self._fallas >= self.fallas_max:
+                if self._abierto_hasta is None or self._probando:
+                    log.warning("Kobo no responde: circuito abierto por %d s", self.espera)
+                self._abierto_hasta = time.time() + self.espera
+            self._probando = False
+
+
+circuito = Circuito()
+
+# Errores de una consulta a Kobo ante los que se puede usar la copia local
+ERRORES_RED = (requests.RequestException, KoboNoDisponible)
+
+
+def comprobar_circuito():
+    """Lanza KoboNoDisponible si el circuito no deja pasar pedidos."""
+    if not circuito.permitir():
+        raise KoboNoDisponible(f"Kobo no disponible (circuito {circuito.estado()})")
+
+
+# ==============================================================
+# PEDIDOS
+# ==============================================================
+
+# Últimos pedidos realizados: url, parámetros, estado, bytes y segundos
+_tiempos = deque(maxlen=200)
+
+
+def tiempos_recientes():
+    return list(_tiempos)
+
+
+# Ronda de en_paralelo en la que corre cada pedido (un Event que se activa si
+# se la abandona por tiempo: desde entonces sus pedidos no tocan el circuito)
+_ronda = contextvars.ContextVar("ronda", default=None)
+
+
+def _abandonada():
+    ronda = _ronda.get()
+    return ronda is not None and ronda.is_set()
+
+
+def en_paralelo(tareas, limite=None):
+    """
+    Ejecuta en paralelo las funciones de `tareas` ({nombre: función sin argumentos}).
+
+    Devuelve (resultados, segundos), ambos indexados por nombre.
+    Si alguna tarea falla se propaga su excepción. Cada tarea corre en una
+    copia del contexto de quien llama (mediciones de instrumentacion).
+
+    Con `limite` (segundos), si no terminaron todas a tiempo se lanza
+    KoboNoDisponible sin esperarlas. La demora cuenta como una sola falla del
+    circuito; las tareas abandonadas ya no lo actualizan y no hacen pedidos
+    nuevos.
+    """
+    ronda = threading.Event()
+
+    def medir(f):
+        _ronda.set(ronda)
+        t0 = time.perf_counter()
+        res = f()
+        return res, time.perf_counter() - t0
+
+    ex = ThreadPoolExecutor(max_workers=len(tareas))
+    try:
+        futuros = {
+            nombre: ex.submit(contextvars.copy_context().run, medir, f)
+            for nombre, f in tareas.items()
+        }
+        _, pendientes = wait(futuros.values(), timeout=limite)
+        if pendientes:
+            ronda.set()
+            circuito.falla()
+            raise KoboNoDisponible(f"Kobo no respondió en {limite:.0f} s")
+        salida = {nombre: fut.result() for nombre, fut in futuros.items()}
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+
+    resultados = {nombre: r for nombre, (r, _) in salida.items()}
+    segundos = {nombre: t for nombre, (_, t) in salida.items()}
+    return resultados, segundos
+
+
+def _resultados(payload):
+    """Devuelve la lista de envíos tanto si la API responde lista como dict paginado."""
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        return payload.get("results", [])
+    return []
+
+
+def _reproducir(url, params=None):
+    """Respuesta de `url` desde su instantánea, con la latencia configurada."""
+    t0 = time.perf_counter()
+    if LATENCIA_REPRODUCCION > 0:
+        time.sleep(LATENCIA_REPRODUCCION)
+    payload = instantaneas.responder(instantaneas.leer(DIR_INSTANTANEAS, url), params)
+    seg = time.perf_counter() - t0
+
+    _tiempos.append({
+        "url": url,
+        "params": params,
+        "estado": "instantánea",
+        "bytes": None,
+        "segundos": round(seg, 3),
+    })
+    instrumentacion.sumar("kobo.http", seg)
+    return payload
+
+
+def _get_json(url, headers, params=None):
+    if MODO_RED == "reproducir":
+        return _reproducir(url, params)
+
+    if _abandonada():
+        raise KoboNoDisponible("Sincronización abandonada por tiempo")
+    comprobar_circuito()
+
+    # Cualquier salida sin respuesta válida cuenta como falla: si este era el
+    # pedido de prueba del circuito semiabierto, no puede quedar pendiente.
+    # En una ronda abandonada la falla ya se contó (y liberó la prueba)
+    respondio = False
+    try:
+        payload = _pedir(url, headers, params)
+        respondio = True
+    finally:
+        if _abandonada():
+            pass
+        elif respondio:
+            circuito.exito()
+        else:
+            circuito.falla()
+    return payload
+
+
+def _pedir(url, headers, params):
+    t0 = time.perf_counter()
+    r = sesion().get(url, headers=headers, params=params, timeout=TIMEOUT)
+    seg = time.perf_counter() - t0
+
+    _tiempos.append({
+        "url": url,
+        "params": params,
+        "estado": r.status_code,
+        "bytes": len(r.content),
+        "segundos": round(seg, 3),
+    })
+    log.info("GET %s %s -> %s (%d bytes, %.2f s)", url, params or "", r.status_code, len(r.content), seg)
+
+    instrumentacion.sumar("kobo.http", seg)
+
+    t0 = time.perf_counter()
+    r.raise_for_status()
+    # Una página de error (HTML) con estado 200 también cuenta como falla
+    payload = r.json()
+    instrumentacion.sumar("kobo.json", time.perf_counter() - t0, len(_resultados(payload)))
+    return payload
+
+
+# ==============================================================
+# DESCARGA PAGINADA
+# ==============================================================
+
+def _pedir_pagina(url, headers, params, start, limit):
+    p = dict(params)
+    p["start"] = start
+    p["limit"] = limit
+    return _get_json(url, headers, p)
+
+
+# Endpoints cuyo equivalente v2 no informó `count` (no se vuelve a preguntar)
+_sin_conteo = set()
+
+
+def url_conteo(url):
+    """
+    Endpoint v2 (`/api/v2/assets/<uid>/data/`) equivalente a `url`, que
+    responde un dict con `count`; None si `url` no es de un asset.
+    """
+    if "/api/v2/" in url:
+        return None
+    nueva, n = re.subn(r"/assets/([^/]+)/submissions/?", r"/api/v2/assets/\1/data/", url)
+    return nueva if n else None
+
+
+def contar(url, headers, params=None):
+    """
+    Total de envíos de `url` que cumplen `params` (mismo `query`), pidiendo
+    un único envío al endpoint v2. None si no se puede saber; si el endpoint
+    no lo informa (p. ej. responde 404) no se vuelve a preguntar.
+    """
+    destino = url_conteo(url)
+    if destino is None or url in _sin_conteo:
+        return None
+
+    p = {k: v for k, v in (params or {}).items() if k == "query"}
+    p.update(start=0, limit=1, fields=json.dumps(["_id"]))
+    if MODO_RED == "reproducir":
+        payload = _reproducir(destino, p)
+    else:
+        # Consulta optativa: no pasa por el circuito (un 404/403 del endpoint
+        # v2 no es una caída de Kobo) ni se hace con el circuito sin cerrar
+        if circuito.estado() != "cerrado" or _abandonada():
+            return None
+        try:
+            payload = _pedir(destino, headers, p)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code >= 500:
+                return None
+            payload = None
+        except requests.RequestException:
+            return None
+
+    total = payload.get("count") if isinstance(payload, dict) else None
+    if total is None:
+        log.info("%s no informa el total de envíos: páginas en secuencia", destino)
+        _sin_conteo.add(url)
+    return total
+
+
+def iterar_paginas(url, headers, params=None, tam_pagina=None, concurrentes=None):
+    """
+    Recorre los envíos de `url` página por página (lista de dicts por página).
+
+    Si se conoce el total de envíos (`count` en la primera respuesta o, si el
+    endpoint responde una lista, con `contar`) las páginas restantes se piden
+    en paralelo, con a lo sumo `concurrentes` en vuelo; si no, se sigue
+    secuencialmente hasta una página incompleta. Las páginas se entregan en
+    orden y sin acumularse, para acotar la memoria.
+    """
+    tam_pagina = tam_pagina or TAM_PAGINA
+    concurrentes = concurrentes or PAGINAS_CONCURRENTES
+
+    params = dict(params or {})
+    # Orden estable: sin él, `start` puede saltear o repetir registros
+    params.setdefault("sort", json.dumps({"_id": 1}))
+
+    primera = _pedir_pagina(url, headers, params, 0, tam_pagina)
+    pagina = _resultados(primera)
+    yield pagina
+
+    total = primera.get("count") if isinstance(primera, dict) else None
+    if total is None and len(pagina) == tam_pagina and concurrentes > 1:
+        total = contar(url, headers, params)
+
+    start = 0
+    if total is not None and concurrentes > 1:
+        with ThreadPoolExecutor(max_workers=concurrentes) as ex:
+            en_vuelo = deque()
+            for start in range(tam_pagina, total, tam_pagina):
+                en_vuelo.append(ex.submit(
+                    contextvars.copy_context().run, _pedir_pagina, url, headers, params, start, tam_pagina
+                ))
+                if len(en_vuelo) >= concurrentes:
+                    pagina = _resultados(en_vuelo.popleft().result())
+                    yield pagina
+            while en_vuelo:
+                pagina = _resultados(en_vuelo.popleft().result())
+                yield pagina
+        # Envíos llegados después de contar: se siguen en secuencia
+
+    while len(pagina) == tam_pagina:
+        start += tam_pagina
+        pagina = _resultados(_pedir_pagina(url, headers, params, start, tam_pagina))
+        if pagina:
+            yield pagina
+
+
+def descargar_dataframe(url, headers, params=None, tam_pagina=None, concurrentes=None):
+    """Descarga paginada armando un DataFrame por página y concatenando al final."""
+    bloques = [
+        pd.DataFrame(pagina)
+        for pagina in iterar_paginas(url, headers, params, tam_pagina, concurrentes)
+        if pagina
+    ]
+    if not bloques:
+        return pd.DataFrame()
+    return pd.concat(bloques, ignore_index=True)
+
+
+def huella(envio):
+    """Identifica la versión de un envío: Kobo cambia el instanceID al editarlo."""
+    return envio.get("meta/instanceID") or envio.get("_uuid") or ""
+
+
+# ==============================================================
+# ALMACÉN LOCAL DE ENVÍOS
+# ==============================================================
+
+class AlmacenEnvios:
+    """
+    Copia local y persistente de los envíos de un formulario Kobo.
+
+    Se guarda como JSON comprimido con los envíos indexados por `_id`
+    y metadatos de la última sincronización.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.envios = {}
+        self.ultimo_id = 0
+        self.ultima_sync = None
+        # Cambia (valor nuevo) cada vez que se modifica el contenido
+        self.version = ""
+        self._leer()
+
+    def _leer(self):
+        if not os.path.exists(self.ruta):
+            return
+        try:
+            with gzip.open(self.ruta, "rt", encoding="utf-8") as f:
+                contenido = json.load(f)
+        except (OSError, ValueError):
+            # Archivo corrupto o truncado: se reconstruye desde cero
+            return
+
+        self.envios = {int(e["_id"]): e for e in contenido.get("envios", [])}
+        self.ultimo_id = contenido.get("ultimo_id", 0)
+        self.ultima_sync = contenido.get("ultima_sync")
+        self.version = contenido.get("version", "")
+
+    def guardar(self):
+        os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+        tmp = f"{self.ruta}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "ultimo_id": self.ultimo_id,
+                    "ultima_sync": self.ultima_sync,
+                    "version": self.version,
+                    "envios": list(self.envios.values()),
+                },
+                f,
+                ensure_ascii=False
+            )
+        # Reemplazo atómico: un lector nunca ve el archivo a medio escribir
+        os.replace(tmp, self.ruta)
+
+    def aplicar(self, nuevos=(), borrados=()):
+        """Incorpora envíos nuevos o editados y elimina los borrados. Devuelve True si hubo cambios."""
+        cambios = False
+
+        for e in nuevos:
+            i = int(e["_id"])
+            previo = self.envios.get(i)
+            if previo is None or huella(previo) != huella(e):
+                self.envios[i] = e
+                cambios = True
+            self.ultimo_id = max(self.ultimo_id, i)
+
+        for i in borrados:
+            if self.envios.pop(i, None) is not None:
+                cambios = True
+
+        if cambios:
+            self.version = uuid.uuid4().hex
+        return cambios
+
+    def registros(self):
+        return list(self.envios.values())
+
+
+# ==============================================================
+# SINCRONIZACIÓN
+# ==============================================================
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_para(ruta):
+    with _locks_guard:
+        return _locks.setdefault(ruta, threading.Lock())
+
+
+def _paginas_nuevas(url, headers, desde_id):
+    params = {"query": json.dumps({"_id": {"$gt": desde_id}})} if desde_id else None
+    return iterar_paginas(url, headers, params)
+
+
+def _descargar_indice(url, headers):
+    """Devuelve {_id: huella} de todos los envíos remotos."""
+    params = {"fields": json.dumps(CAMPOS_INDICE)}
+    indice = {}
+    for pagina in iterar_paginas(url, headers, params):
+        indice.update((int(e["_id"]), huella(e)) for e in pagina)
+    return indice
+
+
+def _descargar_ids(url, headers, ids):
+    envios = []
+    ids = sorted(ids)
+    for i in range(0, len(ids), LOTE_IDS):
+        query = {"_id": {"$in": ids[i:i + LOTE_IDS]}}
+        envios.extend(_resultados(_get_json(url, headers, {"query": json.dumps(query)})))
+    return envios
+
+
+def sincronizar(url, headers, ruta, conciliar=True):
+    """
+    Actualiza el almacén local en `ruta` pidiendo a Kobo solo los envíos
+    con `_id` mayor al último visto.
+
+    Con `conciliar=True` además descarga el índice liviano (`_id` + instanceID)
+    para detectar registros editados (se vuelven a bajar) y borrados
+    (se eliminan del almacén).
+
+    Devuelve el almacén actualizado.
+    """
+    with _lock_para(ruta):
+        almacen = AlmacenEnvios(ruta)
+        # En la primera descarga no hay nada que conciliar
+        conciliar = conciliar and bool(almacen.envios)
+
+        # Cada página se incorpora al llegar; no se retiene la respuesta completa
+        for pagina in _paginas_nuevas(url, headers, almacen.ultimo_id):
+            almacen.aplicar(pagina)
+
+        if conciliar:
+            remotos = _descargar_indice(url, headers)
+
+            borrados = set(almacen.envios) - set(remotos)
+            editados = [
+                i for i, h in remotos.items()
+                if i in almacen.envios and h != huella(almacen.envios[i])
+            ]
+            # Envíos con _id menor al último visto que se confirmaron tarde en el servidor
+            faltantes = [i for i in remotos if i not in almacen.envios]
+
+            recuperados = _descargar_ids(url, headers, editados + faltantes)
+            almacen.aplicar(recuperados, borrados)
+
+        almacen.ultima_sync = time.time()
+        almacen.guardar()
+
+        if MODO_RED == "grabar":
+            instantaneas.guardar(DIR_INSTANTANEAS, url, almacen.registros())
+        return almacen
+
+
+# ==============================================================
+# CATÁLOGO DE ESTACIONES
+# ==============================================================
+
+def leer_catalogo(ruta):
+    """Catálogo guardado en `ruta` por sincronizar_catalogo (None si no existe o está dañado)."""
+    try:
+        return pd.read_pickle(ruta)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _guardar_catalogo(catalogo, ruta):
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    tmp = f"{ruta}.tmp"
+    pd.to_pickle(catalogo, tmp)
+    os.replace(tmp, ruta)
+
+
+def sincronizar_catalogo(url, headers, ruta, preparar, max_edad=None, version=None):
+    """
+    Catálogo de estaciones ya procesado, persistido en `ruta`.
+
+    Mientras la copia local tenga menos de `max_edad` segundos no se consulta
+    a Kobo. Al vencer se descarga y se compara la huella (SHA-1 del contenido):
+    solo si cambió se vuelve a procesar con `preparar(df) -> (df, columnas)`.
+    `version` identifica a `preparar`: una copia procesada con otra versión
+    no se reutiliza aunque el contenido no haya cambiado.
+
+    Devuelve un dict con `df`, `cols`, `huella`, `version` y `descargado` (epoch).
+    """
+    max_edad = TTL_CATALOGO if max_edad is None else max_edad
+
+    # Al grabar, el catálogo se descarga aunque esté vigente si todavía no tiene instantánea
+    grabar = MODO_RED == "grabar" and not instantaneas.existe(DIR_INSTANTANEAS, url)
+
+    with _lock_para(ruta):
+        previo = leer_catalogo(ruta)
+        if previo is not None and previo.get("version") != version:
+            previo = None
+        if previo is not None and time.time() - previo["descargado"] < max_edad and not grabar:
+            return previo
+
+        sha = hashlib.sha1()
+        bloques = []
+        crudos = []
+        for pagina in iterar_paginas(url, headers):
+            sha.update(json.dumps(pagina, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+            if pagina:
+                bloques.append(pd.DataFrame(pagina))
+                if MODO_RED == "grabar":
+                    crudos.extend(pagina)
+        huella = sha.hexdigest()
+
+        if MODO_RED == "grabar":
+            instantaneas.guardar(DIR_INSTANTANEAS, url, crudos)
+
+        if previo is not None and previo["huella"] == huella:
+            # Sin cambios: se renueva la vigencia sin reprocesar
+            previo["descargado"] = time.time()
+            _guardar_catalogo(previo, ruta)
+            return previo
+
+        df, cols = preparar(pd.concat(bloques, ignore_index=True) if bloques else pd.DataFrame())
+        catalogo = {"df": df, "cols": cols, "huella": huella, "version": version, "descargado": time.time()}
+        _guardar_catalogo(catalogo, ruta)
+        return catalogo
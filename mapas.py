@@ -0,0 +1,437 @@
+# ==============================================================
+# MAPA DIARIO DE LLUVIA
+# ==============================================================
+#
+# Dos formas de dibujar las estaciones del día:
+#
+#   - "geojson" (por defecto): una sola FeatureCollection con las
+#     propiedades mínimas de cada estación; color, ícono, etiqueta y
+#     popup se arman en el navegador.
+#   - "marcadores": dos folium.Marker por estación (etiqueta + ícono con
+#     popup), como se hacía originalmente.
+#
+# Se elige con la variable de entorno PLUVIO_MODO_MAPA.
+#
+# El mismo mapa sirve para lluvia acumulada en una ventana de días
+# (`clases=CLASES_ACUMULADO`). Al final está el mapa de la red completa
+# de estaciones.
+
+import json
+import os
+
+import folium
+import numpy as np
+import pandas as pd
+from branca.element import MacroElement
+from folium.plugins import LocateControl, MarkerCluster
+from jinja2 import Template
+
+
+MODO_MAPA = os.environ.get("PLUVIO_MODO_MAPA", "geojson")
+
+# Clases de lluvia: (umbral inferior exclusivo, color hex, color de folium.Icon)
+CLASES_LLUVIA = [
+    (50, "#d32f2f", "red"),
+    (20, "#ef6c00", "orange"),
+    (None, "#1a73e8", "blue"),
+]
+
+# Clases de lluvia acumulada (varios días), mismo formato
+CLASES_ACUMULADO = [
+    (200, "#6a1b9a", "purple"),
+    (100, "#d32f2f", "red"),
+    (50, "#ef6c00", "orange"),
+    (None, "#1a73e8", "blue"),
+]
+
+# Rótulos del popup: (valor en mm, segundo renglón)
+ETIQUETAS_LLUVIA = ("Lluvia", "Fenómeno")
+ETIQUETAS_ACUMULADO = ("Acumulado", "Días con registro")
+
+# Ícono según fenómeno (el primero que aparezca en el texto manda)
+ICONOS_FENOMENO = [
+    ("granizo", "asterisk"),
+    ("tormenta", "flash"),
+    ("viento", "leaf"),
+]
+ICONO_DEFECTO = "cloud"
+
+def leyenda_html(clases=CLASES_LLUVIA, titulo="Referencia"):
+    """Recuadro de referencia con un renglón por clase (de menor a mayor)."""
+    umbrales = [u for u, _, _ in clases[:-1]]
+    inferiores = [0] + umbrales[::-1]
+    renglones = []
+    for k, (_, c_hex, _) in enumerate(reversed(clases)):
+        rango = f"+{inferiores[k]} mm" if k == len(clases) - 1 else f"{inferiores[k]}–{inferiores[k + 1]} mm"
+        renglones.append(
+            f'''    <span style="display:inline-block;width:10px;height:10px;
+        background:{c_hex};border-radius:50%;margin-right:6px;"></span>
+    {rango}'''
+        )
+    cuerpo = "<br>\n".join(renglones)
+
+    return f"""
+<div style="
+    position: fixed;
+    top: 10px;
+    right: 10px;
+    width: 130px;
+    background-color: rgba(255, 255, 255, 0.9);
+    border: 2px solid #111827;
+    z-index: 9999;
+    font-size: 12px;
+    padding: 8px;
+    border-radius: 6px;
+    font-family: sans-serif;
+    line-height: 1.4;
+    box-shadow: 0 2px 6px rgba(0,0,0,0.3);
+    color: #111111;
+">
+    <b>{titulo}</b><br>
+{cuerpo}
+</div>
+"""
+
+
+LEYENDA_HTML = leyenda_html()
+
+
+# ==============================================================
+# CLASIFICACIÓN
+# ==============================================================
+
+def clasificar(df_dia, clases=CLASES_LLUVIA):
+    """
+    Clase de lluvia e ícono de cada fila, sin recorrer filas en Python.
+
+    Devuelve (clase, icono): arrays de enteros que indexan `clases` y
+    ICONOS_FENOMENO (+ ICONO_DEFECTO al final).
+    """
+    mm = df_dia["mm"].to_numpy(dtype="float64")
+    clase = np.select(
+        [mm > u for u, _, _ in clases[:-1]],
+        list(range(len(clases) - 1)),
+        default=len(clases) - 1,
+    )
+
+    fen = df_dia["fen_raw"].astype("string").fillna("")
+    icono = np.select(
+        [fen.str.contains(t, regex=False).to_numpy(dtype=bool) for t, _ in ICONOS_FENOMENO],
+        list(range(len(ICONOS_FENOMENO))),
+        default=len(ICONOS_FENOMENO),
+    )
+    return clase, icono
+
+
+# ==============================================================
+# MAPA BASE
+# ==============================================================
+
+def agregar_capas_base(m):
+
+    # === CAPAS BASE ===
+    folium.TileLayer(
+        tiles="https://mt1.google.com/vt/lyrs=y&x={x}&y={y}&z={z}",
+        attr="Google",
+        name="Google Satélite",
+        overlay=False,
+    ).add_to(m)
+
+    folium.TileLayer(
+        tiles="https://wms.ign.gob.ar/geoserver/gwc/service/tms/"
+              "1.0.0/capabaseargenmap@EPSG%3A3857@png/{z}/{x}/{-y}.png",
+        attr="IGN",
+        name="Argenmap (IGN)",
+        overlay=False,
+    ).add_to(m)
+
+
+def mapa_base(df_dia, leyenda=LEYENDA_HTML):
+    centro = [float(df_dia["lat"].mean()), float(df_dia["lon"].mean())]
+
+    m = folium.Map(location=centro, zoom_start=7, tiles=None)
+    agregar_capas_base(m)
+
+    # === LEYENDA ===
+    m.get_root().html.add_child(folium.Element(leyenda))
+
+    LocateControl(auto_start=False, flyTo=True).add_to(m)
+    folium.LayerControl(position="bottomright").add_to(m)
+    return m
+
+
+# ==============================================================
+# MODO MARCADORES (DOS MARCADORES POR ESTACIÓN)
+# ==============================================================
+
+def agregar_marcadores(m, df_dia, clases=CLASES_LLUVIA, etiquetas=ETIQUETAS_LLUVIA):
+    clase, icono = clasificar(df_dia, clases)
+    iconos = [i for _, i in ICONOS_FENOMENO] + [ICONO_DEFECTO]
+
+    for (_, r), k, i in zip(df_dia.iterrows(), clase, icono):
+        _, c_hex, c_fol = clases[k]
+        icon_code = iconos[i]
+
+        popup_html = f"""
+        <div style="font-family:sans-serif;min-width:180px;">
+            <div style="
+                margin:0;
+                color:{c_hex};
+                border-bottom:2px solid {c_hex};
+                font-size:16px;
+                font-weight:bold;
+                padding-bottom:5px;
+                margin-bottom:8px;">
+                {r['Pluviómetro']}
+            </div>
+            <div style="font-size:14px;">
+                <b>{etiquetas[0]}:</b> {r['mm']:.1f} mm
+            </div>
+            <div style="font-size:13px;margin-top:4px;">
+                <b>{etiquetas[1]}:</b> {r.get('Fenómeno atmosférico', 'S/D')}
+            </div>
+            <div style="
+                font-size:12px;
+                color:#333;
+                border-top:1px solid #eee;
+                padding-top:5px;
+                margin-top:6px;">
+                <b>{r['Departamento']}, {r['Provincia']}</b>
+            </div>
+        </div>
+        """
+
+        # Número grande (mm)
+        folium.map.Marker(
+            [r["lat"], r["lon"]],
+            icon=folium.DivIcon(
+                icon_size=(40, 20),
+                icon_anchor=(20, -10),
+                html=f"""
+                <div style="
+                    color:{c_hex};
+                    font-weight:900;
+                    font-size:11pt;
+                    text-shadow:1px 1px 0 #fff;">
+                    {int(r['mm'])}
+                </div>
+                """
+            )
+        ).add_to(m)
+
+        # Marcador principal
+        folium.Marker(
+            [r["lat"], r["lon"]],
+            popup=folium.Popup(popup_html, max_width=260),
+            icon=folium.Icon(color=c_fol, icon=icon_code),
+        ).add_to(m)
+
+
+# ==============================================================
+# MODO GEOJSON (UNA CAPA, ESTILO EN EL NAVEGADOR)
+# ==============================================================
+
+def _texto(s):
+    return s.astype("string").fillna("S/D").to_numpy(dtype=object)
+
+
+def coleccion_geojson(df_dia, clases=CLASES_LLUVIA):
+    """
+    FeatureCollection del día con propiedades abreviadas:
+
+    n = pluviómetro, mm = lluvia (1 decimal), f = fenómeno,
+    d / p = departamento / provincia, k = clase de lluvia, i = ícono.
+    """
+    clase, icono = clasificar(df_dia, clases)
+
+    lat = df_dia["lat"].to_numpy(dtype="float64").round(5)
+    lon = df_dia["lon"].to_numpy(dtype="float64").round(5)
+    mm = df_dia["mm"].to_numpy(dtype="float64").round(1)
+
+    fen = (
+        df_dia["Fenómeno atmosférico"]
+        if "Fenómeno atmosférico" in df_dia.columns
+        else pd.Series("S/D", index=df_dia.index)
+    )
+
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [x, y]},
+            "properties": {"n": n, "mm": v, "f": f, "d": d, "p": p, "k": k, "i": i},
+        }
+        for y, x, v, n, f, d, p, k, i in zip(
+            lat.tolist(), lon.tolist(), mm.tolist(),
+            _texto(df_dia["Pluviómetro"]), _texto(fen),
+            _texto(df_dia["Departamento"]), _texto(df_dia["Provincia"]),
+            clase.tolist(), icono.tolist(),
+        )
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+
+class CapaLluvia(MacroElement):
+    """Capa L.geoJSON que arma íconos, etiquetas y popups a partir de las propiedades."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = (function () {
+            var clases = {{ this.clases|tojson }};
+            var iconos = {{ this.iconos|tojson }};
+            var etiquetas = {{ this.etiquetas|tojson }};
+            function esc(s) {
+                return String(s).replace(/[&<>"']/g, function (c) {
+                    return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+                });
+            }
+            function popup(p, c) {
+                return '<div style="font-family:sans-serif;min-width:180px;">'
+                    + '<div style="margin:0;color:' + c + ';border-bottom:2px solid ' + c
+                    + ';font-size:16px;font-weight:bold;padding-bottom:5px;margin-bottom:8px;">'
+                    + esc(p.n) + '</div>'
+                    + '<div style="font-size:14px;"><b>' + etiquetas[0] + ':</b> ' + p.mm.toFixed(1) + ' mm</div>'
+                    + '<div style="font-size:13px;margin-top:4px;"><b>' + etiquetas[1] + ':</b> ' + esc(p.f) + '</div>'
+                    + '<div style="font-size:12px;color:#333;border-top:1px solid #eee;'
+                    + 'padding-top:5px;margin-top:6px;"><b>' + esc(p.d) + ', ' + esc(p.p) + '</b></div>'
+                    + '</div>';
+            }
+            return L.geoJSON({{ this.datos_json }}, {
+                pointToLayer: function (f, latlng) {
+                    var p = f.properties, c = clases[p.k];
+                    var etiqueta = L.marker(latlng, {icon: L.divIcon({
+                        className: "", iconSize: [40, 20], iconAnchor: [20, -10],
+                        html: '<div style="color:' + c[0] + ';font-weight:900;font-size:11pt;'
+                            + 'text-shadow:1px 1px 0 #fff;">' + Math.trunc(p.mm) + '</div>'
+                    })});
+                    var marcador = L.marker(latlng, {icon: L.AwesomeMarkers.icon({
+                        icon: iconos[p.i], markerColor: c[1], prefix: "glyphicon"
+                    })}).bindPopup(popup(p, c[0]), {maxWidth: 260});
+                    return L.layerGroup([etiqueta, marcador]);
+                }
+            }).addTo({{ this._parent.get_name() }});
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, datos, clases=CLASES_LLUVIA, etiquetas=ETIQUETAS_LLUVIA):
+        super().__init__()
+        self._name = "CapaLluvia"
+        # JSON compacto (el payload crece lineal con las estaciones); se escapan
+        # los caracteres que podrían cerrar el <script>
+        self.datos_json = (
+            json.dumps(datos, ensure_ascii=False, separators=(",", ":"))
+            .replace("<", "\\u003c").replace(">", "\\u003e").replace("&", "\\u0026")
+        )
+        self.clases = [[c_hex, c_fol] for _, c_hex, c_fol in clases]
+        self.iconos = [i for _, i in ICONOS_FENOMENO] + [ICONO_DEFECTO]
+        self.etiquetas = list(etiquetas)
+
+
+def agregar_geojson(m, df_dia, clases=CLASES_LLUVIA, etiquetas=ETIQUETAS_LLUVIA):
+    CapaLluvia(coleccion_geojson(df_dia, clases), clases, etiquetas).add_to(m)
+
+
+# ==============================================================
+# PUNTO DE ENTRADA
+# ==============================================================
+
+def mapa_diario(df_dia, modo=None, clases=CLASES_LLUVIA, etiquetas=ETIQUETAS_LLUVIA, leyenda=LEYENDA_HTML):
+    """Mapa folium con las estaciones de `df_dia` (requiere lat/lon sin nulos)."""
+    modo = modo or MODO_MAPA
+    m = mapa_base(df_dia, leyenda)
+    if modo == "marcadores":
+        agregar_marcadores(m, df_dia, clases, etiquetas)
+    else:
+        agregar_geojson(m, df_dia, clases, etiquetas)
+    return m
+
+
+def mapa_acumulado(df_ventana, modo=None):
+    """
+    Mapa de lluvia acumulada por estación. `df_ventana` trae lo mismo que un
+    día (`mm` = total de la ventana) y `dias` (días con registro).
+    """
+    df = df_ventana.assign(
+        fen_raw="",
+        **{"Fenómeno atmosférico": df_ventana["dias"].astype("int64").astype(str)},
+    )
+    return mapa_diario(
+        df, modo, CLASES_ACUMULADO, ETIQUETAS_ACUMULADO,
+        leyenda_html(CLASES_ACUMULADO, "Acumulado"),
+    )
+
+
+# ==============================================================
+# MAPA DE LA RED COMPLETA
+# ==============================================================
+
+def estaciones_red(df_estaciones, col_nombre=None):
+    """
+    Estaciones del catálogo con coordenadas, listas para el mapa de la red:
+    `Pluviómetro`, `lat`, `lon`, `Depto` y `Prov` ("S/D" si falta el dato).
+    """
+    df_red = df_estaciones.dropna(subset=["lat", "lon"])
+
+    # Nombre visible de estación
+    if col_nombre and col_nombre in df_red.columns:
+        nombre = df_red[col_nombre].fillna(df_red["cod"])
+    else:
+        nombre = df_red["cod"] if "cod" in df_red.columns else pd.Series("S/D", index=df_red.index)
+
+    # Detección tolerante de columnas Depto/Prov (por si varían los nombres)
+    col_depto = next(
+        (c for c in df_red.columns if "depto" in c.lower() or "depart" in c.lower()),
+        None
+    )
+    col_prov = next((c for c in df_red.columns if "prov" in c.lower()), None)
+
+    return pd.DataFrame({
+        "Pluviómetro": nombre,
+        "lat": df_red["lat"],
+        "lon": df_red["lon"],
+        "Depto": df_red[col_depto].fillna("S/D") if col_depto else "S/D",
+        "Prov": df_red[col_prov].fillna("S/D") if col_prov else "S/D",
+    }).reset_index(drop=True)
+
+
+def mapa_red(df_mostrar, zoom_start=7):
+    """Mapa de la red: un CircleMarker agrupado por estación de `df_mostrar`."""
+    centro = [float(df_mostrar["lat"].mean()), float(df_mostrar["lon"].mean())]
+    m = folium.Map(location=centro, zoom_start=zoom_start, tiles=None)
+    agregar_capas_base(m)
+
+    pluvios = folium.FeatureGroup(
+        name="Pluviómetros",
+        overlay=False,   # no aparece en el control
+        control=False
+    )
+
+    cluster = MarkerCluster().add_to(pluvios)
+    m.add_child(pluvios)
+
+    # === POPUPS (Pluviómetro / Depto / Prov.) ===
+    for r in df_mostrar.itertuples(index=False):
+        popup_html = f"""
+        <div style="font-family: sans-serif; min-width: 180px;">
+            <div style="font-weight:700; margin-bottom:6px;">{r.Pluviómetro}</div>
+            <div style="font-size:13px; color:#333;">
+                <b>Depto/Prov:</b> {r.Depto} / {r.Prov}
+            </div>
+        </div>
+        """
+
+        folium.CircleMarker(
+            location=[r.lat, r.lon],
+            radius=8,
+            color="#1E3A8A",
+            fill=True,
+            fill_color="#3B82F6",
+            fill_opacity=0.9,
+            tooltip=r.Pluviómetro,
+            popup=folium.Popup(popup_html, max_width=260)
+        ).add_to(cluster)
+
+    # Controles
+    LocateControl(auto_start=False, flyTo=True).add_to(m)
+    folium.LayerControl(position="bottomright").add_to(m)
+    return m
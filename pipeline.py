@@ -0,0 +1,424 @@
+# ==============================================================
+# PIPELINE DE DATOS: KOBO -> NORMALIZACIÓN -> UNIÓN -> AGREGADOS
+# ==============================================================
+#
+# Sin dependencias de Streamlit: lo usan la aplicación, reportes_lote y
+# los benchmarks. Tres puntos de entrada según de dónde vengan los datos:
+#
+#   - cargar(headers): sincroniza con Kobo y mantiene la copia local
+#   - cargar_copia_local(): solo la copia local, sin red
+#   - desde_payloads(envios, estaciones): respuestas de Kobo ya en memoria
+#
+# Todos devuelven el mismo dict (ver _resultado).
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+
+import pandas as pd
+
+import almacen_columnar
+import datos
+import instrumentacion
+import kobo
+
+
+log = logging.getLogger(__name__)
+
+
+URL_PRECIPITACIONES = "https://territorios.inta.gob.ar/assets/aYqLUVvU3EYiDa7NoJbPKF/submissions/?format=json"
+URL_MAPA = "https://territorios.inta.gob.ar/assets/aFwWKNGXZKppgNYKa33wC8/submissions/?format=json"
+
+# Días que se cargan en el modo rápido
+DIAS_RECIENTES = 60
+
+# Errores de Kobo: cargar() los resuelve con la copia local si la hay
+ERRORES_RED = kobo.ERRORES_RED
+
+
+def encabezados(token):
+    return {"Authorization": f"Token {token}"}
+
+
+def requiere_token():
+    """False al reproducir instantáneas de Kobo (kobo.MODO_RED): no hay pedidos reales."""
+    return kobo.MODO_RED != "reproducir"
+
+
+def rutas(dir_datos=None):
+    """
+    Archivos de la copia local dentro de `dir_datos` (por defecto kobo.DIR_DATOS):
+
+    - `envios`: envíos de precipitación (sincronización incremental)
+    - `catalogo`: catálogo de estaciones ya procesado
+    - `tabla`: tabla normalizada en Parquet particionada por año/mes
+    - `ultima_carga`: fecha de la última sincronización exitosa con Kobo
+    """
+    dir_datos = dir_datos or kobo.DIR_DATOS
+    return {
+        "envios": os.path.join(dir_datos, "precipitaciones.json.gz"),
+        "catalogo": os.path.join(dir_datos, "estaciones.pkl"),
+        "tabla": os.path.join(dir_datos, "tabla"),
+        "ultima_carga": os.path.join(dir_datos, "ultima_carga.json"),
+    }
+
+
+def _guardar_ultima_carga(ruta, fecha):
+    tmp = f"{ruta}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"fecha": fecha.isoformat(timespec="seconds")}, f)
+    os.replace(tmp, ruta)
+
+
+def _leer_ultima_carga(ruta):
+    """Fecha de la última sincronización exitosa (None si no se registró)."""
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return datetime.fromisoformat(json.load(f)["fecha"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# ==============================================================
+# NORMALIZACIÓN Y UNIÓN
+# ==============================================================
+
+def normalizar_precipitaciones(df_p):
+    """Tipos, código de pluviómetro y fenómeno atmosférico de los envíos crudos."""
+    df_p = df_p.copy()
+    if "fenomeno" not in df_p.columns:
+        # Ningún envío respondió la pregunta (p. ej. al reconstruir un solo mes)
+        df_p["fenomeno"] = None
+    df_p["fecha_dt"] = pd.to_datetime(df_p["Fecha_del_dato"])
+    df_p["mm"] = pd.to_numeric(df_p["Mil_metros_registrados"], errors="coerce").fillna(0)
+
+    # =================================================
+    # NORMALIZACIÓN DE FENÓMENOS ATMOSFÉRICOS
+    # =================================================
+    df_p["fen_raw"] = (
+        df_p["fenomeno"]
+        .astype(str)
+        .str.strip()
+        .str.lower()
+    )
+
+    map_fen = {
+        "viento": "Vientos fuertes",
+        "granizo": "Granizo",
+        "tormenta": "Tormentas eléctricas",
+        "sinfeno": "Sin obs. de fenómenos"
+    }
+
+    df_p["Fenómeno atmosférico"] = (
+        df_p["fen_raw"]
+        .replace(map_fen)
+        .replace({
+            "none": "Sin obs. de fenómenos",
+            "nan": "Sin obs. de fenómenos",
+            "": "Sin obs. de fenómenos"
+        })
+    )
+
+    df_p["cod"] = df_p["Pluviometros"].astype(str).str.replace(".0", "", regex=False)
+    return df_p
+
+
+def preparar_estaciones(df_c):
+    """Código y coordenadas del catálogo. Devuelve (df_c, columnas detectadas del catálogo)."""
+    df_c = df_c.copy()
+    df_c["cod"] = df_c["Codigo_txt_del_pluviometro"].astype(str).str.replace(".0", "", regex=False)
+
+    coords = datos.parsear_coordenadas(df_c)
+    df_c[["lat", "lon", "coord_invalida"]] = coords
+
+    if coords["coord_invalida"].any():
+        log.warning(
+            "Estaciones con coordenadas inválidas: %s",
+            ", ".join(df_c.loc[coords["coord_invalida"], "cod"])
+        )
+
+    col_n = next((c for c in df_c.columns if "Nombre_del_Pluviometro" in c), "cod")
+    col_depto = next((c for c in df_c.columns if "depto" in c.lower()), None)
+    col_prov = next((c for c in df_c.columns if "prov" in c.lower()), None)
+    col_region = next((c for c in df_c.columns if "reg" in c.lower()), None)
+
+    return df_c, {"n": col_n, "depto": col_depto, "prov": col_prov, "region": col_region}
+
+
+def unir(df_p, df_c, cols):
+    """Cruza precipitaciones con el catálogo (nombre, ubicación y territorio)."""
+    columnas = ["cod", "lat", "lon", cols["n"], cols["depto"], cols["prov"], cols["region"]]
+    columnas = list(dict.fromkeys(c for c in columnas if c))
+
+    df = df_p.merge(df_c[columnas], on="cod", how="left")
+    df["Pluviómetro"] = df[cols["n"]]
+    df["Departamento"] = df[cols["depto"]].fillna("S/D") if cols["depto"] else "S/D"
+    df["Provincia"] = df[cols["prov"]].fillna("S/D") if cols["prov"] else "S/D"
+    df["Region"] = df[cols["region"]].fillna("General") if cols["region"] else "General"
+
+    return df
+
+
+def corte_reciente(dias=DIAS_RECIENTES):
+    """Primer día incluido en el modo rápido."""
+    return pd.Timestamp.now().normalize() - pd.Timedelta(days=dias)
+
+
+def recortar(r, dias=DIAS_RECIENTES):
+    """
+    Resultado del modo rápido derivado de uno con el historial completo (`r`),
+    sin red ni disco: misma tabla desde el corte y su cubo.
+    """
+    corte = corte_reciente(dias)
+    df = datos.IndiceFechas(r["df"]).rango(desde=corte).reset_index(drop=True)
+    mem = dict.fromkeys(["antes", "despues"], datos.memoria(df))
+    cols = {"n": r["col_nombre"]}
+    return _resultado(
+        df, mem, r["estaciones"], cols, r["origen"], r["version_catalogo"], corte,
+        r["datos_al"], r["degradado"],
+        matriz=r["matriz"].recortar(desde=corte), acumulado=r["acumulado"].recortar(desde=corte)
+    )
+
+
+def construir_tabla(envios, df_c, cols):
+    """Tabla compacta (datos.compactar) a partir de los envíos crudos y el catálogo preparado."""
+    with instrumentacion.etapa("pipeline.normalizar") as e:
+        df_p = normalizar_precipitaciones(pd.DataFrame(envios))
+        e["filas"] = len(df_p)
+    with instrumentacion.etapa("pipeline.unir", len(df_p)):
+        df = unir(df_p, df_c, cols)
+    with instrumentacion.etapa("pipeline.compactar", len(df)):
+        return datos.compactar(df)
+
+
+# ==============================================================
+# TABLA EN DISCO (RECONSTRUCCIÓN POR MES)
+# ==============================================================
+
+def huellas_mensuales(envios):
+    """
+    (mes de cada envío, {"AAAA-MM": huella}) según `Fecha_del_dato`. La
+    huella de un mes cambia si se agrega, edita o borra alguno de sus envíos.
+    """
+    fechas = pd.to_datetime(pd.Series([e.get("Fecha_del_dato") for e in envios], dtype=object), errors="coerce")
+    meses = fechas.dt.strftime("%Y-%m").fillna("")
+    claves = pd.DataFrame({
+        "id": [int(e["_id"]) for e in envios],
+        "version": [kobo.huella(e) for e in envios],
+    })
+    h = pd.util.hash_pandas_object(claves, index=False)
+    return meses.to_numpy(), {m: str(int(v)) for m, v in h.groupby(meses.to_numpy()).sum().items()}
+
+
+def _misma_base(origen_a, origen_b):
+    """True si dos `origen` difieren a lo sumo en la versión de los envíos (mismo esquema y catálogo)."""
+    if not origen_a or not origen_b:
+        return False
+    a, b = origen_a.split(":"), origen_b.split(":")
+    return a[0] == b[0] and a[-1] == b[-1]
+
+
+def actualizar_tabla(envios, df_c, cols, ruta, origen):
+    """
+    Lleva la tabla en disco (`ruta`) al contenido de `envios`.
+
+    Si solo cambiaron envíos (mismo esquema y catálogo) se reconstruyen
+    únicamente los meses cuya huella cambió. Devuelve (df, mem) con la tabla
+    completa si se reconstruyó todo, o None si se reemplazaron solo algunos
+    meses (la tabla se lee luego de disco).
+    """
+    meses, fuentes = huellas_mensuales(envios)
+    previo = almacen_columnar.leer_manifiesto(ruta)
+
+    if not _misma_base(previo.get("origen"), origen):
+        df, mem = construir_tabla(envios, df_c, cols)
+        with instrumentacion.etapa("almacen.escribir", len(df)):
+            almacen_columnar.escribir(df, ruta, origen, fuentes=fuentes)
+        return df, mem
+
+    viejas = previo.get("fuentes", {})
+    cambiados = {m for m in set(fuentes) | set(viejas) if fuentes.get(m) != viejas.get(m)}
+    seleccion = [e for e, m in zip(envios, meses) if m in cambiados]
+    log.info("Tabla en disco: se reconstruyen %d meses (%d envíos)", len(cambiados), len(seleccion))
+
+    if seleccion:
+        df_meses, _ = construir_tabla(seleccion, df_c, cols)
+    else:
+        df_meses = pd.DataFrame({"fecha_dt": pd.to_datetime(pd.Series([], dtype=object))})
+    with instrumentacion.etapa("almacen.escribir", len(df_meses)):
+        almacen_columnar.escribir(df_meses, ruta, origen, meses=cambiados, fuentes=fuentes)
+    return None
+
+
+# ==============================================================
+# RESULTADO
+# ==============================================================
+
+def _resultado(df, mem, df_c, cols, origen, version_catalogo, corte, datos_al=None, degradado=False,
+               matriz=None, acumulado=None):
+    """
+    Dict con lo que consume la aplicación:
+
+    - `df`: tabla compacta ordenada por fecha
+    - `estaciones` / `col_nombre`: catálogo preparado y su columna de nombre
+    - `cubo`: acumulados estación × mes (datos.construir_cubo)
+    - `matriz`: lluvia estación × día (datos.MatrizDiaria)
+    - `acumulado`: sumas acumuladas de `matriz` (datos.AcumuladoDiario)
+    - `origen`: identifica envíos + catálogo + esquema de la tabla
+    - `version`: `origen` más el corte cargado (clave de resultados derivados)
+    - `version_catalogo`: huella del catálogo de estaciones
+    - `datos_al`: fecha de la sincronización con Kobo de la que salen los datos
+    - `degradado`: True si Kobo no respondió y se usó la copia local
+    """
+    log.info(
+        "Tabla de precipitaciones: %d filas, %.1f MB -> %.1f MB compacta",
+        len(df), mem["antes"] / 1e6, mem["despues"] / 1e6
+    )
+
+    with instrumentacion.etapa("pipeline.cubo", len(df)):
+        cubo = datos.construir_cubo(df)
+
+    if matriz is None:
+        with instrumentacion.etapa("pipeline.matriz", len(df)):
+            matriz = datos.MatrizDiaria.construir(df, df_c, cols)
+    log.info(
+        "Matriz diaria: %d estaciones × %d días, %.1f MB",
+        *matriz.valores.shape, matriz.memoria() / 1e6
+    )
+
+    if acumulado is None:
+        with instrumentacion.etapa("pipeline.acumulado", len(df)):
+            acumulado = datos.AcumuladoDiario.construir(matriz)
+
+    return {
+        "df": df,
+        "estaciones": df_c,
+        "col_nombre": cols["n"],
+        "cubo": cubo,
+        "matriz": matriz,
+        "acumulado": acumulado,
+        "origen": origen,
+        "version": f"{origen}:{corte.date() if corte is not None else 'completo'}",
+        "version_catalogo": version_catalogo,
+        "datos_al": datos_al,
+        "degradado": degradado,
+    }
+
+
+# ==============================================================
+# PUNTOS DE ENTRADA
+# ==============================================================
+
+def cargar(headers, dir_datos=None, solo_reciente=True):
+    """
+    Sincroniza con Kobo y devuelve los datos (últimos DIAS_RECIENTES días o
+    el historial completo).
+
+    Ambos modos leen del mismo almacén local; solo se piden a Kobo las
+    novedades. El catálogo de estaciones tiene su propia vigencia
+    (kobo.TTL_CATALOGO) y solo se reprocesa si cambió su contenido. Ambas
+    consultas van en paralelo.
+
+    Si ya hay copia local, la sincronización tiene a lo sumo
+    kobo.PRESUPUESTO_SINCRONIZACION segundos: si Kobo no responde a tiempo,
+    falla o su circuito está abierto, se devuelve la copia local con
+    `degradado=True`.
+    """
+    r = rutas(dir_datos)
+    hay_copia = almacen_columnar.origen(r["tabla"]) is not None and os.path.exists(r["catalogo"])
+
+    try:
+        res, segundos = kobo.en_paralelo(
+            {
+                "precipitaciones": lambda: kobo.sincronizar(URL_PRECIPITACIONES, headers, r["envios"]),
+                "estaciones": lambda: kobo.sincronizar_catalogo(
+                    URL_MAPA, headers, r["catalogo"], preparar_estaciones,
+                    version=datos.VERSION_ESQUEMA,
+                ),
+            },
+            limite=kobo.PRESUPUESTO_SINCRONIZACION if hay_copia else None,
+        )
+    except kobo.ERRORES_RED as e:
+        if not hay_copia:
+            raise
+        log.warning("Sin respuesta de Kobo (%s): se usa la copia local", e)
+        return cargar_copia_local(dir_datos, solo_reciente, degradado=True)
+
+    datos_al = datetime.now()
+    _guardar_ultima_carga(r["ultima_carga"], datos_al)
+    for nombre, seg in segundos.items():
+        instrumentacion.sumar(f"kobo.{nombre}", seg)
+    almacen = res["precipitaciones"]
+    catalogo = res["estaciones"]
+    df_c, cols = catalogo["df"], catalogo["cols"]
+
+    corte = corte_reciente() if solo_reciente else None
+
+    # La tabla normalizada se actualiza solo si cambiaron los envíos (los meses
+    # afectados) o el catálogo (completa); después se leen de disco únicamente
+    # los meses necesarios.
+    # Comprobación, reconstrucción y lectura con el directorio bloqueado: otra
+    # carga (el otro modo, otra renovación) no toca las particiones en el medio.
+    origen = f"{datos.VERSION_ESQUEMA}:{almacen.version}:{catalogo['huella']}"
+    with almacen_columnar.bloqueo(r["tabla"]):
+        completa = None
+        if almacen_columnar.origen(r["tabla"]) != origen:
+            completa = actualizar_tabla(almacen.registros(), df_c, cols, r["tabla"], origen)
+
+        if completa is not None:
+            df, mem = completa
+            if corte is not None:
+                df = datos.IndiceFechas(df).rango(desde=corte).reset_index(drop=True)
+        else:
+            with instrumentacion.etapa("almacen.leer") as e:
+                df, mem = datos.compactar(almacen_columnar.leer(r["tabla"], desde=corte))
+                e["filas"] = len(df)
+
+    return _resultado(df, mem, df_c, cols, origen, catalogo["huella"], corte, datos_al)
+
+
+def cargar_copia_local(dir_datos=None, solo_reciente=True, degradado=False):
+    """
+    Datos de la última sincronización guardada en disco, sin consultar a Kobo.
+    Lanza FileNotFoundError si todavía no hay copia local.
+    """
+    r = rutas(dir_datos)
+    catalogo = kobo.leer_catalogo(r["catalogo"])
+    corte = corte_reciente() if solo_reciente else None
+
+    with almacen_columnar.bloqueo(r["tabla"]):
+        origen = almacen_columnar.origen(r["tabla"])
+        if origen is None or catalogo is None:
+            raise FileNotFoundError(f"No hay copia local de los datos en {os.path.dirname(r['tabla'])!r}")
+        df, mem = datos.compactar(almacen_columnar.leer(r["tabla"], desde=corte))
+
+    return _resultado(
+        df, mem, catalogo["df"], catalogo["cols"], origen, catalogo["huella"], corte,
+        _leer_ultima_carga(r["ultima_carga"]), degradado
+    )
+
+
+def desde_payloads(envios, estaciones, solo_reciente=False):
+    """
+    Datos a partir de las respuestas de Kobo ya descargadas: `envios` y
+    `estaciones` son listas de registros (dicts) como los de `results`.
+    No usa red ni disco.
+    """
+    version_catalogo = hashlib.sha1(
+        json.dumps(estaciones, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+
+    df_c, cols = preparar_estaciones(pd.DataFrame(estaciones))
+    df, mem = construir_tabla(envios, df_c, cols)
+
+    # Huella del contenido de la tabla (vectorizada; no serializa los envíos)
+    huella_tabla = int(pd.util.hash_pandas_object(df, index=False).sum()) & 0xFFFFFFFFFFFFFFFF
+    origen = f"{datos.VERSION_ESQUEMA}:payload:{huella_tabla:016x}:{version_catalogo}"
+
+    corte = corte_reciente() if solo_reciente else None
+    if corte is not None:
+        df = datos.IndiceFechas(df).rango(desde=corte).reset_index(drop=True)
+
+    return _resultado(df, mem, df_c, cols, origen, version_catalogo, corte)
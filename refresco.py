@@ -0,0 +1,228 @@
+# ==============================================================
+# DATOS COMPARTIDOS CON RENOVACIÓN EN SEGUNDO PLANO
+# (stale-while-revalidate)
+# ==============================================================
+#
+# Sin dependencias de Streamlit. Cada conjunto de datos (clave) se carga
+# una vez por proceso y se sirve a todas las sesiones. Un hilo lo vuelve
+# a cargar `anticipo` segundos antes de que venza; mientras tanto se sigue
+# sirviendo la versión anterior, así ningún pedido espera a Kobo salvo la
+# primera carga de cada clave. Las cargas concurrentes de una misma clave
+# se unifican (UnSoloVuelo): corre una sola y las demás esperan su resultado.
+#
+# Solo se renuevan las claves leídas desde su última carga; una clave que
+# nadie lee durante `ttl` segundos se descarta y libera su memoria (la
+# próxima lectura la vuelve a cargar).
+
+import logging
+import threading
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+class _Vuelo:
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class UnSoloVuelo:
+    """
+    Unifica llamadas concurrentes por clave: mientras una ejecución de
+    `clave` está en curso, las siguientes no la repiten sino que esperan y
+    reciben su resultado (o su excepción).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_vuelo = {}
+        self._contadores = {}
+
+    def hacer(self, clave, funcion):
+        with self._lock:
+            c = self._contadores.setdefault(clave, {"ejecuciones": 0, "coalescidas": 0})
+            vuelo = self._en_vuelo.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._en_vuelo[clave] = _Vuelo()
+                c["ejecuciones"] += 1
+            else:
+                c["coalescidas"] += 1
+
+        if not lider:
+            vuelo.listo.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.resultado
+
+        try:
+            vuelo.resultado = funcion()
+            return vuelo.resultado
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._en_vuelo[clave]
+            vuelo.listo.set()
+
+    def contadores(self):
+        """{clave: {"ejecuciones", "coalescidas"}} desde el inicio del proceso."""
+        with self._lock:
+            return {k: dict(c) for k, c in self._contadores.items()}
+
+
+class Refrescador:
+    """
+    Conjuntos de datos del proceso indexados por clave.
+
+    - `cargar(clave)`: función que arma el valor (puede tardar)
+    - `ttl`: vigencia de cada valor (segundos)
+    - `anticipo`: cuánto antes del vencimiento se renueva
+    - `intervalo`: cada cuánto revisa el hilo de renovación
+    - `ttl_valor(valor)`: vigencia propia de un valor (p. ej. más corta para
+      datos de respaldo); por defecto `ttl`
+
+    Una clave sin lecturas durante `ttl` segundos se descarta.
+    """
+
+    def __init__(self, cargar, ttl, anticipo=120, intervalo=30, ttl_valor=None):
+        self._cargar = cargar
+        self.ttl = ttl
+        self._ttl_valor = ttl_valor or (lambda valor: ttl)
+        self.anticipo = anticipo
+        self.intervalo = intervalo
+
+        self._entradas = {}
+        self._vuelos = UnSoloVuelo()
+        self._renovando = set()
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    # ----------------------------------------------------------
+    # Consulta
+    # ----------------------------------------------------------
+
+    def actual(self, clave):
+        """Valor en memoria de `clave` (aunque esté vencido) o None, sin cargar nada."""
+        with self._lock:
+            e = self._entradas.get(clave)
+            return None if e is None else e["valor"]
+
+    def cargado(self, clave):
+        """Momento (epoch) de la última carga exitosa de `clave`, o None."""
+        with self._lock:
+            e = self._entradas.get(clave)
+            return None if e is None else e["cargado"]
+
+    def obtener(self, clave):
+        """
+        Valor de `clave`. Solo bloquea si todavía no hay ninguno; si el que
+        hay está por vencer (o vencido) se renueva en segundo plano.
+        """
+        with self._lock:
+            e = self._entradas.get(clave)
+
+            if e is not None:
+                e["leido"] = time.time()
+
+        if e is None:
+            return self._cargar_ahora(clave)
+
+        if self._por_vencer(e, time.time()):
+            self.renovar(clave)
+        return e["valor"]
+
+    def _por_vencer(self, entrada, ahora):
+        return ahora - entrada["cargado"] >= max(entrada["ttl"] - self.anticipo, 0)
+
+    def _en_uso(self, entrada):
+        """True si se leyó desde su última carga (solo esas se renuevan)."""
+        return entrada["leido"] >= entrada["cargado"]
+
+    def _sin_lecturas(self, entrada, ahora):
+        return ahora - entrada["leido"] >= self.ttl
+
+    # ----------------------------------------------------------
+    # Carga y renovación
+    # ----------------------------------------------------------
+
+    def _cargar_ahora(self, clave):
+        """Carga `clave`; si ya hay una carga en curso (de una sesión o de la renovación) espera esa."""
+        def cargar():
+            valor = self._cargar(clave)
+            ahora = time.time()
+            with self._lock:
+                # Renovar no cuenta como lectura: se conserva la última
+                previo = self._entradas.get(clave)
+                self._entradas[clave] = {
+                    "valor": valor,
+                    "cargado": ahora,
+                    "ttl": self._ttl_valor(valor),
+                    "leido": previo["leido"] if previo is not None else ahora,
+                }
+            return valor
+
+        return self._vuelos.hacer(clave, cargar)
+
+    def contadores(self):
+        """Cargas ejecutadas y cargas unificadas con otra en curso, por clave."""
+        return self._vuelos.contadores()
+
+    def renovar(self, clave):
+        """Vuelve a cargar `clave` en un hilo aparte (si no se está renovando ya)."""
+        with self._lock:
+            if clave in self._renovando:
+                return
+            self._renovando.add(clave)
+
+        def tarea():
+            t0 = time.perf_counter()
+            try:
+                self._cargar_ahora(clave)
+                log.info("Datos %r renovados en %.1f s", clave, time.perf_counter() - t0)
+            except Exception:
+                # Se sigue sirviendo la versión anterior; se reintenta en la próxima revisión
+                log.exception("No se pudieron renovar los datos %r", clave)
+            finally:
+                with self._lock:
+                    self._renovando.discard(clave)
+
+        threading.Thread(target=tarea, name=f"renovar-{clave}", daemon=True).start()
+
+    def iniciar(self, claves=()):
+        """
+        Arranca el hilo de renovación y precarga `claves` en segundo plano
+        (al iniciar el servidor, antes de que llegue el primer pedido).
+        """
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._revisar, name="refrescador", daemon=True)
+
+        for clave in claves:
+            if self.actual(clave) is None:
+                self.renovar(clave)
+        self._hilo.start()
+
+    def _revisar(self):
+        while True:
+            time.sleep(self.intervalo)
+            self._revisar_una_vez(time.time())
+
+    def _revisar_una_vez(self, ahora):
+        """Descarta las claves sin lecturas y renueva las que están en uso y por vencer."""
+        with self._lock:
+            for clave, e in list(self._entradas.items()):
+                if self._sin_lecturas(e, ahora) and clave not in self._renovando:
+                    del self._entradas[clave]
+                    log.info("Datos %r descartados: sin lecturas en %d s", clave, self.ttl)
+            por_vencer = [
+                clave for clave, e in self._entradas.items()
+                if self._por_vencer(e, ahora) and self._en_uso(e)
+            ]
+        for clave in por_vencer:
+            self.renovar(clave)
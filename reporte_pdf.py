@@ -0,0 +1,443 @@
+# ==============================================================
+# MOTOR DE REPORTES PDF (PLANTILLA INSTITUCIONAL + TABLAS)
+# ==============================================================
+#
+# - ReporteINTA: encabezado azul con logo, pie con número de página y
+#   página final de créditos, compartidos por todos los reportes.
+# - tabla(): dibuja una tabla fila por fila a partir de columnas de texto
+#   ya formateadas (arrays), cortando página y repitiendo el encabezado
+#   de la tabla cuando hace falta.
+# - salida(): bytes en memoria, archivo o stream.
+#
+# Sobre esa base están los reportes de la aplicación: crear_pdf (resumen
+# diario) y crear_pdf_mensual_region (acumulados mensuales por estación).
+#
+# Las celdas del cuerpo no usan FPDF.cell (costoso por celda): el texto se
+# ubica con anchos precalculados y la grilla se traza con una línea por
+# fila y las verticales una vez por página.
+
+import os
+from datetime import timedelta
+
+import numpy as np
+from fpdf import FPDF
+
+import datos
+
+
+LOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logo_inta.png")
+AZUL_INTA = (30, 58, 138)
+GRIS_ENCABEZADO = (230, 230, 230)
+
+PIE = "Documento generado automáticamente por el Sistema de Relevamiento Pluviométrico - INTA EEA Salta"
+
+EQUIPO = (
+    "Lic. Inf. Hernán Elena (EEA Salta), "
+    "Obs. Met. Germán Guanca (Meteorología - EEA Salta), "
+    "Ing. Agr. Rafael Saldaño (OIT Coronel Moldes), "
+    "Ing. Agr. Daniela Moneta (AER Valle de Lerma), "
+    "Ing. Juan Ramón Rojas (AER Santa Victoria Este), "
+    "Ing. Agr. Daniel Lamberti (AER Perico), "
+    "Tec. Recursos Hídricos Fátima del Valle Miranda (AER Palma Sola), "
+    "Ing. Agr. Florencia Diaz (AER Palma Sola), "
+    "Ing. Agr. Héctor Diaz (AER J.V. Gonzalez), "
+    "Ing. Agr. Carlos G. Cabrera (AER J.V. Gonzalez), "
+    "Lucas Diaz (AER Cafayate - OIT San Carlos), "
+    "Med. Vet. Cristina Rosetto (EECT Yuto), "
+    "Ing. RRNN Fabian Tejerina (EEA Salta), "
+    "Tec. Agr. Carlos Arias (OIT General Güemes)."
+)
+
+COLABORADORES = "Nicolás Uriburu, Nicolás Villegas, Matías Lanusse, Marcela López, Martín Amado, Agustín Sanz Navamuel, Luis Fernández Acevedo, Miguel A. Boasso, Luis Zavaleta, Mario Lambrisca, Noelia Rovedatti, Matías Canonica, Alejo Álvarez, Javier Montes, Guillermo Patrón Costa, Sebastián Mendilaharzu, Francisco Chehda, Jorge Robles, Gustavo Soricich, Javier Atea, Luis D. Elías, Leandro Carrizo, Daiana Núñez, Fátima González, Santiago Villalba, Juan Collado, Julio Collado, Estanislao Lara, Carlos Cruz, Daniel Espinoza, Fabián Álvarez, Lucio Señoranis, René Vallejos Rueda, Héctor Miranda, Emanuel Arias, Oscar Herrera, Francisca Vacaflor, Zaturnino Ceballos, Alcides Ceballos, Juan Ignacio Pearson, Pascual Erazo, Darío Romero, Luisa Andrada, Alejandro Ricalde, Odorico Romero, Lucas Campos, Sebastián Díaz, Carlos Sanz, Gabriel Brinder, Gastón Vizgarra, Diego Sulca, Alicia Tapia, Sergio Cassinelli, María Zamboni, Andrés Flores, Tomás Lienemann, Carmen Carattoni, Cecilia Carattoni, Tito Donoso, Javier Aprile, Carla Carattoni, Cuenca Renán, Luna Federico, Soloza Pedro, Aparicio Cirila, Torres Arnaldo, Torres Mergido, Sardina Rubén, Illesca Francisco, Saravia Adrián, Carabajal Jesús, Alvarado René, Saban Mary, Rodríguez Eleuterio, Guzmán Durbal, Sajama Sergio, Miranda Dina, Pedro Quispe, Fabiana Monasterio, Raquel Araoz, Raúl Álvarez, Rafael Mendoza, Lila Torfe, Samuel Aramayo, Jose Maidana, Hernan Terceros, Maria Sulca, Paulino Sulca, Nadia Ríos, Matías Copa, Marcos Aurelio Rodríguez, Horacio Hoyo, Alejandro Romero, Carlos Ruiz."
+
+CONTACTO = "Para más información, podés contactarnos en: elena.hernan@inta.gob.ar"
+
+
+# ==============================================================
+# PLANTILLA
+# ==============================================================
+
+class ReporteINTA(FPDF):
+    """FPDF con la identidad institucional de los reportes de la red."""
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font("Helvetica", 'I', 8)
+        self.set_text_color(128, 128, 128)
+        self.cell(0, 10, PIE, 0, 0, 'L')
+        self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'R')
+
+    def encabezado(self, titulo):
+        """Franja azul con logo, centro regional y `titulo` (ocupa el ancho de la página)."""
+        self.set_fill_color(*AZUL_INTA)
+        self.rect(0, 0, self.w, 45, 'F')
+
+        try:
+            self.image(LOGO, x=12, y=8, w=22)
+        except Exception:
+            pass
+
+        self.set_text_color(255, 255, 255)
+        self.set_font("Helvetica", 'B', 16)
+        self.set_xy(38, 12)
+        self.cell(0, 10, "CENTRO REGIONAL SALTA - JUJUY", ln=True)
+
+        self.set_font("Helvetica", 'B', 13)
+        self.set_x(38)
+        self.cell(0, 8, titulo, ln=True)
+
+        self.ln(22)
+        self.set_text_color(0, 0, 0)
+
+    def creditos(self):
+        """Página final: equipo de trabajo, colaboradores y contacto."""
+        self.add_page()
+        self.set_text_color(0, 0, 0)
+
+        self.set_font("Helvetica", 'B', 12)
+        self.cell(0, 10, "Equipo de trabajo - INTA:", ln=True)
+        self.set_font("Helvetica", size=10)
+        self.multi_cell(0, 7, EQUIPO)
+
+        self.ln(4)
+        self.set_font("Helvetica", 'B', 12)
+        self.cell(0, 10, "Colaboradores:", ln=True)
+        self.set_font("Helvetica", size=9)
+        self.multi_cell(0, 6, COLABORADORES)
+
+        self.ln(4)
+        self.set_font("Helvetica", 'B', 11)
+        self.cell(0, 8, "Contacto:", ln=True)
+        self.set_font("Helvetica", size=10)
+        self.cell(0, 8, CONTACTO, ln=True)
+
+
+# ==============================================================
+# TABLA PAGINADA
+# ==============================================================
+
+def _anchos_texto(pdf, textos):
+    """Ancho impreso de cada texto (se mide una vez por valor distinto)."""
+    unicos, inversa = np.unique(textos, return_inverse=True)
+    medidas = np.array([pdf.get_string_width(t) for t in unicos.tolist()], dtype=float)
+    return medidas[inversa.ravel()]
+
+
+def _x_texto(pdf, textos, x, ancho, alineacion):
+    if alineacion == 'L':
+        return np.full(len(textos), x + pdf.c_margin)
+    w = _anchos_texto(pdf, textos)
+    if alineacion == 'R':
+        return x + ancho - pdf.c_margin - w
+    return x + (ancho - w) / 2
+
+
+def _encabezado_tabla(pdf, columnas, alto, fuente):
+    pdf.set_font("Helvetica", 'B', fuente)
+    pdf.set_fill_color(*GRIS_ENCABEZADO)
+    for titulo, ancho, alineacion in columnas:
+        pdf.cell(ancho, alto, titulo, 1, 0, alineacion, True)
+    pdf.ln()
+
+
+def tabla(pdf, columnas, celdas, alto=8, fuente=9, fuente_encabezado=None):
+    """
+    Dibuja una tabla con bordes desde la posición actual.
+
+    `columnas` es una lista de (título, ancho, alineación 'L'/'C'/'R') y
+    `celdas` una lista con un array de textos ya formateados por columna
+    (todos del mismo largo). Las filas se recorren de a una: si la siguiente
+    no entra en la página se agrega otra y se repite el encabezado.
+    """
+    fuente_encabezado = fuente_encabezado or fuente
+    celdas = [np.asarray(c, dtype=object) for c in celdas]
+    n = len(celdas[0]) if celdas else 0
+
+    _encabezado_tabla(pdf, columnas, alto, fuente_encabezado)
+    pdf.set_font("Helvetica", size=fuente)
+
+    # Posición horizontal de cada texto, calculada de una vez por columna
+    bordes = [pdf.l_margin]
+    for _, ancho, _ in columnas:
+        bordes.append(bordes[-1] + ancho)
+    x_texto = [
+        _x_texto(pdf, c, bordes[j], ancho, alineacion).tolist()
+        for j, (c, (_, ancho, alineacion)) in enumerate(zip(celdas, columnas))
+    ]
+    celdas = [c.tolist() for c in celdas]
+    x_fin = bordes[-1]
+    baja = alto / 2 + 0.3 * pdf.font_size
+
+    def cerrar_tramo(y_ini, y_fin):
+        # Verticales del tramo de filas dibujado en la página actual
+        if y_fin > y_ini:
+            for x in bordes:
+                pdf.line(x, y_ini, x, y_fin)
+
+    y_ini = y = pdf.get_y()
+    for i in range(n):
+        if y + alto > pdf.page_break_trigger:
+            cerrar_tramo(y_ini, y)
+            pdf.add_page()
+            _encabezado_tabla(pdf, columnas, alto, fuente_encabezado)
+            pdf.set_font("Helvetica", size=fuente)
+            y_ini = y = pdf.get_y()
+
+        for j in range(len(celdas)):
+            t = celdas[j][i]
+            if t:
+                pdf.text(x_texto[j][i], y + baja, t)
+        y += alto
+        pdf.line(bordes[0], y, x_fin, y)
+
+    cerrar_tramo(y_ini, y)
+    pdf.set_xy(pdf.l_margin, y)
+
+
+def formatear_mm(valores, minimo=1):
+    """Texto "%.1f" de cada valor; vacío si es NaN o menor que `minimo`."""
+    valores = np.asarray(valores, dtype=float)
+    texto = np.char.mod("%.1f", np.nan_to_num(valores)).astype(object)
+    texto[~(valores >= minimo)] = ""
+    return texto
+
+
+# ==============================================================
+# SALIDA
+# ==============================================================
+
+def salida(pdf, destino=None):
+    """
+    Cierra el documento. Sin `destino` devuelve los bytes; con una ruta
+    escribe el archivo y con un objeto con `write` (archivo abierto, socket,
+    BytesIO...) escribe en él.
+    """
+    data = pdf.output()
+    data = bytes(data) if isinstance(data, (bytes, bytearray)) else data.encode("latin-1", errors="replace")
+
+    if destino is None:
+        return data
+    if hasattr(destino, "write"):
+        destino.write(data)
+    else:
+        with open(destino, "wb") as f:
+            f.write(data)
+    return None
+
+
+# ==============================================================
+# PDF DIARIO
+# ==============================================================
+
+def crear_pdf(df_dia, fecha_selec, cant_total, destino=None):
+    """
+    PDF con el resumen diario. Devuelve los bytes, o los escribe en
+    `destino` (ruta o stream) si se indica.
+    """
+    pdf = ReporteINTA()
+    pdf.add_page()
+
+    # =================================================
+    # ENCABEZADO INSTITUCIONAL
+    # =================================================
+    pdf.encabezado("REPORTE DIARIO DE PRECIPITACIONES")
+
+    # =================================================
+    # RESUMEN GENERAL
+    # =================================================
+    pdf.set_font("Helvetica", 'B', 12)
+    pdf.cell(0, 10, "Resumen del día:", ln=True)
+
+    pdf.set_font("Helvetica", size=11)
+
+    meses = {
+        1: "enero", 2: "febrero", 3: "marzo", 4: "abril",
+        5: "mayo", 6: "junio", 7: "julio", 8: "agosto",
+        9: "septiembre", 10: "octubre", 11: "noviembre", 12: "diciembre"
+    }
+
+    fecha_formateada = (
+        f"{fecha_selec.day} de "
+        f"{meses[fecha_selec.month]} de "
+        f"{fecha_selec.year}"
+    )
+
+    pdf.cell(0, 8, f"Fecha de consulta: {fecha_formateada}", ln=True)
+    pdf.cell(0, 7, f"Estaciones con reporte: {len(df_dia)}", ln=True)
+    pdf.cell(0, 7, f"Total de estaciones en base: {cant_total}", ln=True)
+
+    # =================================================
+    # DÍA PLUVIOMÉTRICO
+    # =================================================
+    f1 = fecha_selec.strftime('%d/%m/%Y')
+    f2 = (fecha_selec + timedelta(days=1)).strftime('%d/%m/%Y')
+
+    x0 = pdf.get_x()
+    y0 = pdf.get_y()
+
+    pdf.set_fill_color(240, 240, 240)
+    pdf.rect(x0, y0, 190, 12, 'F')
+
+    pdf.set_xy(x0 + 2, y0 + 2)
+    pdf.set_font("Helvetica", 'B', 11)
+
+    pdf.multi_cell(
+        0, 8,
+        f"Lluvia acumulada desde las 9 hs del {f1} "
+        f"a las 9 hs del día {f2} - Día pluviométrico",
+        align='C'
+    )
+
+    pdf.ln(8)
+
+    # =================================================
+    # TABLA DE DATOS
+    # =================================================
+    df_ord = df_dia.sort_values("mm", ascending=False)
+
+    tabla(
+        pdf,
+        [
+            ("Pluviómetro", 60, 'L'),
+            ("Departamento", 45, 'L'),
+            ("Provincia", 45, 'L'),
+            ("Lluvia (mm)", 30, 'C'),
+        ],
+        [
+            df_ord["Pluviómetro"].astype(str).to_numpy(),
+            df_ord["Departamento"].astype(str).to_numpy(),
+            df_ord["Provincia"].astype(str).to_numpy(),
+            np.char.mod("%.1f mm", df_ord["mm"].to_numpy(dtype=float)),
+        ],
+        alto=10, fuente=10, fuente_encabezado=11
+    )
+
+    # =================================================
+    # PÁGINA FINAL – EQUIPO DE TRABAJO Y COLABORADORES
+    # =================================================
+    pdf.creditos()
+
+    return salida(pdf, destino)
+
+
+
+# ==============================================================
+# PDF MENSUAL POR REGIÓN / DEPARTAMENTO
+# ==============================================================
+
+# Meses por página de tabla (el bloque final agrega la columna TOTAL)
+MESES_POR_BLOQUE = 6
+
+
+def crear_pdf_mensual_region(cubo, region, fecha_desde, fecha_hasta, destino=None):
+    """
+    Genera PDF mensual acumulado a partir de las filas del cubo estación × mes.
+    Divide automáticamente en semestres si hay más de 6 meses.
+    Incluye encabezado institucional y página final de créditos.
+    Devuelve los bytes, o los escribe en `destino` (ruta o stream) si se indica.
+    """
+
+    # =================================================
+    # CONFIGURACIÓN DE ANCHOS (OPTIMIZADOS)
+    # =================================================
+    ANCHO_EST = 58       # Pluviómetro
+    ANCHO_DEP = 38       # Departamento (reducido)
+    ANCHO_PROV = 28      # Provincia (reducido)
+    ANCHO_MES = 18       # Mes
+    ANCHO_TOTAL = 18    # Total
+
+    # =================================================
+    # PREPARACIÓN DE DATOS
+    # =================================================
+    base = cubo[["Pluviómetro", "Departamento", "Provincia", "mm"]].assign(
+        Mes=datos.periodos_mensuales(cubo)
+    )
+
+    pivot = base.pivot_table(
+        index=["Pluviómetro", "Departamento", "Provincia"],
+        columns="Mes",
+        values="mm",
+        aggfunc="sum",
+        observed=True
+    )
+
+    # Ordenar meses cronológicamente
+    meses = sorted(pivot.columns.tolist())
+    pivot = pivot[meses]
+
+    # Textos de todas las celdas, formateados una sola vez
+    est, dep, prov = (
+        pivot.index.get_level_values(k).astype(str).to_numpy(dtype=object)
+        for k in range(3)
+    )
+    valores = formatear_mm(pivot.to_numpy(dtype=float).ravel()).reshape(pivot.shape)
+    totales = formatear_mm(pivot.sum(axis=1).to_numpy(dtype=float))
+
+    # Dividir meses en bloques de hasta 6
+    bloques = [
+        list(range(i, min(i + MESES_POR_BLOQUE, len(meses))))
+        for i in range(0, len(meses), MESES_POR_BLOQUE)
+    ]
+
+    pdf = ReporteINTA(orientation="L")
+
+    # =================================================
+    # PÁGINAS DE TABLA (1 por bloque)
+    # =================================================
+    for i, bloque in enumerate(bloques):
+
+        pdf.add_page()
+
+        # ---------- ENCABEZADO INSTITUCIONAL ----------
+        pdf.encabezado("REPORTE MENSUAL DE PRECIPITACIONES")
+
+        # ---------- DESCRIPCIÓN ----------
+        pdf.set_font("Helvetica", 'B', 12)
+        pdf.cell(0, 8, f"Región: {region}", ln=True)
+
+        pdf.set_font("Helvetica", size=11)
+        pdf.cell(
+            0, 8,
+            f"Período: {fecha_desde.strftime('%m/%Y')} a {fecha_hasta.strftime('%m/%Y')}",
+            ln=True
+        )
+
+        if len(bloques) > 1:
+            pdf.cell(
+                0, 8,
+                f"Bloque: meses {bloque[0] + 1} a {bloque[-1] + 1}",
+                ln=True
+            )
+
+        pdf.ln(4)
+
+        # ---------- TABLA ----------
+        columnas = [
+            ("Pluviómetro", ANCHO_EST, 'L'),
+            ("Departamento", ANCHO_DEP, 'L'),
+            ("Provincia", ANCHO_PROV, 'L'),
+        ] + [(meses[j].strftime("%m/%Y"), ANCHO_MES, 'C') for j in bloque]
+        celdas = [est, dep, prov] + [valores[:, j] for j in bloque]
+
+        if i == len(bloques) - 1:
+            columnas.append(("TOTAL", ANCHO_TOTAL, 'C'))
+            celdas.append(totales)
+
+        tabla(pdf, columnas, celdas, alto=8, fuente=9)
+
+    # =================================================
+    # AVISO CELDAS EN BLANCO
+    # =================================================
+    pdf.ln(4)
+    pdf.set_font("Helvetica", "I", 9)
+    pdf.multi_cell(
+        0, 6,
+        "Las celdas en blanco indican ausencia de registro de precipitación.\n"
+    )
+
+    # =================================================
+    # PÁGINA FINAL – EQUIPO Y COLABORADORES
+    # =================================================
+    pdf.creditos()
+
+    return salida(pdf, destino)
@@ -0,0 +1,310 @@
+# ==============================================================
+# GENERACIÓN DE REPORTES POR LOTES (SIN STREAMLIT NI RED)
+# ==============================================================
+#
+# Genera en paralelo, en varios procesos, los mismos reportes que la
+# aplicación, a partir de la copia local de los datos que la app mantiene
+# en .datos/ (tabla Parquet + catálogo de estaciones):
+#
+#   python reportes_lote.py mensual --desde 2024-01-01 --hasta 2024-12-31 --salida reportes.zip
+#   python reportes_lote.py diario --desde 2025-01-01 --hasta 2025-01-31 --kml --salida diarios/
+#
+# La salida es un ZIP (si el nombre termina en .zip) o un directorio, con
+# un manifiesto.json que lista cada archivo, sus parámetros y su SHA-256.
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import pandas as pd
+
+import almacen_columnar
+import datos
+import kml
+import kobo
+import pipeline
+import reporte_pdf
+
+
+ARCHIVO_MANIFIESTO = "manifiesto.json"
+
+# Columnas que se leen de la tabla para cada tipo de reporte
+COLUMNAS_MENSUAL = datos.CLAVES_CUBO + ["fecha_dt", "mm"]
+COLUMNAS_DIARIO = ["fecha_dt", "Pluviómetro", "Departamento", "Provincia", "lat", "lon", "mm"]
+
+# Tareas en vuelo por proceso (acota la memoria con lotes largos)
+TAREAS_POR_PROCESO = 2
+
+
+# ==============================================================
+# COPIA LOCAL DE LOS DATOS
+# ==============================================================
+
+def abrir_copia_local(dir_datos):
+    """
+    Ubicación y versión de la copia local. Sale con error si la app todavía
+    no generó la tabla (no se consulta a Kobo).
+    """
+    r = pipeline.rutas(dir_datos)
+    origen = almacen_columnar.origen(r["tabla"])
+    catalogo = kobo.leer_catalogo(r["catalogo"])
+
+    if origen is None or catalogo is None:
+        sys.exit(
+            f"No hay datos locales en {dir_datos!r}. Abra la aplicación una vez "
+            "(o copie su directorio .datos) antes de generar reportes por lotes."
+        )
+
+    return {"tabla": r["tabla"], "origen": origen, "estaciones": len(catalogo["df"])}
+
+
+def leer_por_mes(dir_tabla, desde, hasta, columnas):
+    """Filas de [desde, hasta] de a un mes por vez, tal como están en el almacén columnar."""
+    for ini in pd.date_range(desde.replace(day=1), hasta, freq="MS"):
+        parte = almacen_columnar.leer(
+            dir_tabla,
+            desde=max(ini, desde),
+            hasta=min(ini + pd.offsets.MonthEnd(0), hasta),
+            columnas=columnas,
+        )
+        if not parte.empty:
+            yield parte
+
+
+# ==============================================================
+# TAREAS
+# ==============================================================
+
+def _nombre_archivo(*partes):
+    texto = "_".join(str(p) for p in partes)
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", texto).strip("_").lower()
+
+
+def tareas_mensuales(copia, desde, hasta, nivel, provincias=None):
+    """
+    Un reporte mensual por provincia (todos los departamentos) y/o por
+    departamento, igual que "📑 Reportes". Cada tarea es
+    (archivo, parámetros, función, argumentos).
+    """
+    fecha_ini = desde.replace(day=1)
+    fecha_fin = hasta.replace(day=1) + pd.offsets.MonthEnd(1)
+
+    partes = [
+        datos.construir_cubo(parte)
+        for parte in leer_por_mes(copia["tabla"], fecha_ini, fecha_fin, COLUMNAS_MENSUAL)
+    ]
+    if not partes:
+        return
+    cubo = pd.concat(partes, ignore_index=True)
+
+    for provincia, cubo_prov in cubo.groupby("Provincia", observed=True, sort=True):
+        if provincias and provincia not in provincias:
+            continue
+
+        grupos = []
+        if nivel in ("provincia", "ambos"):
+            grupos.append(("Todos los departamentos", cubo_prov))
+        if nivel in ("departamento", "ambos"):
+            grupos.extend(cubo_prov.groupby("Departamento", observed=True, sort=True))
+
+        for departamento, parte in grupos:
+            yield (
+                f"mensual/{_nombre_archivo(provincia, departamento)}.pdf",
+                {"tipo": "pdf_mensual", "provincia": provincia, "departamento": departamento},
+                reporte_pdf.crear_pdf_mensual_region,
+                (
+                    parte.reset_index(drop=True),
+                    f"Provincia: {provincia} - Departamentos: {departamento}",
+                    fecha_ini.date(),
+                    fecha_fin.date(),
+                ),
+            )
+
+
+def tareas_diarias(copia, desde, hasta, con_kml=False):
+    """Un PDF diario (y opcionalmente un KML) por fecha con registros."""
+    for parte in leer_por_mes(copia["tabla"], desde, hasta, COLUMNAS_DIARIO):
+        for fecha, df_dia in parte.groupby("fecha_dt", sort=True):
+            df_dia = df_dia.reset_index(drop=True)
+            dia = fecha.date()
+
+            yield (
+                f"diario/lluvia_{dia}.pdf",
+                {"tipo": "pdf_diario", "fecha": str(dia)},
+                reporte_pdf.crear_pdf,
+                (df_dia, dia, copia["estaciones"]),
+            )
+            if con_kml:
+                yield (
+                    f"diario/lluvia_{dia}.kml",
+                    {"tipo": "kml_diario", "fecha": str(dia)},
+                    kml.generar_kml,
+                    (df_dia.dropna(subset=["lat", "lon"]),),
+                )
+
+
+def _ejecutar(funcion, args):
+    t0 = time.perf_counter()
+    data = funcion(*args)
+    return data, time.perf_counter() - t0
+
+
+def en_procesos(tareas, procesos):
+    """
+    Ejecuta las tareas en un pool de procesos y devuelve
+    (archivo, parámetros, bytes, segundos) a medida que terminan.
+
+    Se mantienen a lo sumo TAREAS_POR_PROCESO tareas por proceso en vuelo,
+    así las tareas se generan (y leen sus datos) a medida que hay lugar.
+    """
+    tareas = iter(tareas)
+    limite = procesos * TAREAS_POR_PROCESO
+
+    with ProcessPoolExecutor(max_workers=procesos) as ex:
+        pendientes = {}
+        while True:
+            for archivo, params, funcion, args in tareas:
+                pendientes[ex.submit(_ejecutar, funcion, args)] = (archivo, params)
+                if len(pendientes) >= limite:
+                    break
+
+            if not pendientes:
+                return
+
+            listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+            for fut in listos:
+                archivo, params = pendientes.pop(fut)
+                data, seg = fut.result()
+                yield archivo, params, data, seg
+
+
+# ==============================================================
+# SALIDA (ZIP O DIRECTORIO)
+# ==============================================================
+
+class Salida:
+    """Destino de los archivos generados: un ZIP o un directorio."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.zip = None
+        if ruta.lower().endswith(".zip"):
+            os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+            self.zip = zipfile.ZipFile(ruta, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            os.makedirs(ruta, exist_ok=True)
+
+    def escribir(self, archivo, data):
+        if self.zip is not None:
+            self.zip.writestr(archivo, data)
+            return
+        ruta = os.path.join(self.ruta, *archivo.split("/"))
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "wb") as f:
+            f.write(data)
+
+    def cerrar(self):
+        if self.zip is not None:
+            self.zip.close()
+
+
+def generar(tareas, salida, procesos, encabezado):
+    """Ejecuta las tareas, escribe los archivos y el manifiesto. Devuelve el manifiesto."""
+    t0 = time.perf_counter()
+    reportes = []
+
+    destino = Salida(salida)
+    try:
+        for archivo, params, data, seg in en_procesos(tareas, procesos):
+            destino.escribir(archivo, data)
+            reportes.append({
+                "archivo": archivo,
+                **params,
+                "bytes": len(data),
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "segundos": round(seg, 3),
+            })
+            print(f"  {archivo} ({len(data) / 1024:.0f} KB, {seg:.2f} s)")
+
+        manifiesto = {
+            **encabezado,
+            "generado": datetime.now().isoformat(timespec="seconds"),
+            "procesos": procesos,
+            "segundos": round(time.perf_counter() - t0, 3),
+            "reportes": sorted(reportes, key=lambda r: r["archivo"]),
+        }
+        destino.escribir(
+            ARCHIVO_MANIFIESTO,
+            json.dumps(manifiesto, ensure_ascii=False, indent=2).encode("utf-8")
+        )
+    finally:
+        destino.cerrar()
+
+    return manifiesto
+
+
+# ==============================================================
+# LÍNEA DE COMANDOS
+# ==============================================================
+
+def _fecha(texto):
+    return pd.Timestamp(texto).normalize()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Genera reportes PDF/KML de la red pluviométrica desde los datos locales."
+    )
+    parser.add_argument("tipo", choices=["mensual", "diario"])
+    parser.add_argument("--desde", type=_fecha, required=True, help="fecha inicial (AAAA-MM-DD)")
+    parser.add_argument("--hasta", type=_fecha, required=True, help="fecha final (AAAA-MM-DD)")
+    parser.add_argument("--salida", required=True, help="archivo .zip o directorio")
+    parser.add_argument("--datos", default=kobo.DIR_DATOS, help="directorio de datos locales")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--nivel", choices=["provincia", "departamento", "ambos"], default="ambos",
+        help="mensual: un reporte por provincia, por departamento o ambos"
+    )
+    parser.add_argument("--provincia", action="append", help="mensual: limitar a estas provincias")
+    parser.add_argument("--kml", action="store_true", help="diario: agregar el KML de cada día")
+    args = parser.parse_args(argv)
+
+    if args.desde > args.hasta:
+        parser.error("--desde debe ser anterior a --hasta")
+
+    copia = abrir_copia_local(args.datos)
+
+    if args.tipo == "mensual":
+        tareas = tareas_mensuales(copia, args.desde, args.hasta, args.nivel, args.provincia)
+    else:
+        tareas = tareas_diarias(copia, args.desde, args.hasta, args.kml)
+
+    manifiesto = generar(
+        tareas,
+        args.salida,
+        max(args.procesos, 1),
+        {
+            "tipo": args.tipo,
+            "desde": str(args.desde.date()),
+            "hasta": str(args.hasta.date()),
+            "origen_datos": copia["origen"],
+        },
+    )
+
+    print(
+        f"{len(manifiesto['reportes'])} archivos en {args.salida} "
+        f"({manifiesto['segundos']:.1f} s, {manifiesto['procesos']} procesos)"
+    )
+
+
+if __name__ == "__main__":
+    main()
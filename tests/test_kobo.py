@@ -0,0 +1,328 @@
+# ==============================================================
+# CLIENTE DE KOBO CONTRA UN SERVIDOR HTTP LOCAL
+# Paginación, reintentos ante 5xx, tiempos de espera y
+# sincronización incremental (altas, ediciones y bajas)
+#
+# Uso:
+#   python -m pytest tests
+# ==============================================================
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instantaneas  # noqa: E402
+import kobo  # noqa: E402
+
+
+# ==============================================================
+# SERVIDOR DE PRUEBA
+# ==============================================================
+
+class ServidorKobo:
+    """
+    Imita los dos endpoints de envíos de Kobo sobre `envios` (lista de dicts):
+
+    - /assets/<uid>/submissions/: lista sin total (como el formulario real)
+    - /api/v2/assets/<uid>/data/: dict con `count` y `results`
+
+    `fallas` respuestas 503 antes de contestar y `demora` segundos por pedido;
+    con `sin_v2` el endpoint v2 responde 404.
+    """
+
+    def __init__(self):
+        self.envios = []
+        self.pedidos = []
+        self.fallas = 0
+        self.demora = 0
+        self.sin_v2 = False
+        self._lock = threading.Lock()
+
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                partes = urlsplit(self.path)
+                params = dict(parse_qsl(partes.query))
+                with servidor._lock:
+                    servidor.pedidos.append((partes.path, params))
+                    fallar = servidor.fallas > 0
+                    if fallar:
+                        servidor.fallas -= 1
+                    envios = sorted(servidor.envios, key=lambda e: e["_id"])
+
+                if servidor.demora:
+                    time.sleep(servidor.demora)
+                if fallar:
+                    self._responder(503, {"detail": "no disponible"})
+                    return
+                if servidor.sin_v2 and "/api/v2/" in partes.path:
+                    self._responder(404, {"detail": "no encontrado"})
+                    return
+
+                payload = instantaneas.responder(envios, params)
+                if "/api/v2/" not in partes.path:
+                    payload = payload["results"]
+                self._responder(200, payload)
+
+            def _responder(self, estado, payload):
+                cuerpo = json.dumps(payload).encode("utf-8")
+                try:
+                    self.send_response(estado)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(cuerpo)))
+                    self.end_headers()
+                    self.wfile.write(cuerpo)
+                except (BrokenPipeError, ConnectionResetError):
+                    # El cliente ya cortó por tiempo de espera
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.http.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.http.server_port}/assets/aPrueba/submissions/?format=json"
+        threading.Thread(target=self.http.serve_forever, daemon=True).start()
+
+    def pedidos_de(self, fragmento):
+        with self._lock:
+            return [(ruta, p) for ruta, p in self.pedidos if fragmento in ruta]
+
+    def cerrar(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+
+def envio(i, mm=0.0, version=1):
+    return {
+        "_id": i,
+        "_uuid": f"env-{i}",
+        "meta/instanceID": f"uuid:env-{i}-v{version}",
+        "Fecha_del_dato": "2025-01-15",
+        "Pluviometros": "1000",
+        "Mil_metros_registrados": str(mm),
+    }
+
+
+@pytest.fixture
+def servidor():
+    s = ServidorKobo()
+    yield s
+    s.cerrar()
+
+
+@pytest.fixture(autouse=True)
+def cliente(monkeypatch):
+    """Sesión, circuito y modo de red propios de cada prueba, sin esperas entre reintentos."""
+    monkeypatch.setattr(kobo, "MODO_RED", "")
+    monkeypatch.setattr(kobo, "_sesion", kobo.crear_sesion(backoff=0))
+    monkeypatch.setattr(kobo, "circuito", kobo.Circuito())
+    monkeypatch.setattr(kobo, "_sin_conteo", set())
+
+
+# ==============================================================
+# PAGINACIÓN
+# ==============================================================
+
+def test_paginas_en_secuencia(servidor):
+    servidor.envios = [envio(i) for i in range(1, 26)]
+
+    paginas = list(kobo.iterar_paginas(servidor.url, {}, tam_pagina=10, concurrentes=1))
+
+    assert [len(p) for p in paginas] == [10, 10, 5]
+    assert [e["_id"] for p in paginas for e in p] == list(range(1, 26))
+    assert [p["start"] for _, p in servidor.pedidos_de("/submissions/")] == ["0", "10", "20"]
+
+
+def test_paginas_en_paralelo_con_total_del_endpoint_v2(servidor):
+    servidor.envios = [envio(i) for i in range(1, 46)]
+
+    paginas = list(kobo.iterar_paginas(servidor.url, {}, tam_pagina=10, concurrentes=3))
+
+    assert [e["_id"] for p in paginas for e in p] == list(range(1, 46))
+    conteo = servidor.pedidos_de("/api/v2/")
+    assert len(conteo) == 1 and conteo[0][1]["limit"] == "1"
+    assert sorted(int(p["start"]) for _, p in servidor.pedidos_de("/submissions/")) == [0, 10, 20, 30, 40]
+
+
+def test_sin_endpoint_v2_sigue_en_secuencia_sin_abrir_el_circuito(servidor, monkeypatch):
+    monkeypatch.setattr(kobo, "circuito", kobo.Circuito(fallas=1))
+    servidor.envios = [envio(i) for i in range(1, 26)]
+    servidor.sin_v2 = True
+
+    paginas = list(kobo.iterar_paginas(servidor.url, {}, tam_pagina=10, concurrentes=3))
+
+    assert [len(p) for p in paginas] == [10, 10, 5]
+    assert kobo.circuito.estado() == "cerrado"
+    assert servidor.url in kobo._sin_conteo
+
+
+def test_paginas_con_consulta(servidor):
+    servidor.envios = [envio(i) for i in range(1, 31)]
+    params = {"query": json.dumps({"_id": {"$gt": 12}})}
+
+    paginas = list(kobo.iterar_paginas(servidor.url, {}, params, tam_pagina=10, concurrentes=2))
+
+    assert [e["_id"] for p in paginas for e in p] == list(range(13, 31))
+
+
+# ==============================================================
+# REINTENTOS Y TIEMPOS DE ESPERA
+# ==============================================================
+
+def test_reintenta_ante_5xx(servidor):
+    servidor.envios = [envio(1)]
+    servidor.fallas = 2
+
+    assert kobo._get_json(servidor.url, {}) == [envio(1)]
+    assert len(servidor.pedidos) == 3
+    assert kobo.circuito.estado() == "cerrado"
+
+
+def test_5xx_persistente_abre_el_circuito(servidor):
+    servidor.fallas = 1000
+
+    for _ in range(kobo.FALLAS_CIRCUITO):
+        with pytest.raises(requests.RequestException):
+            kobo._get_json(servidor.url, {})
+
+    assert kobo.circuito.estado() == "abierto"
+    pedidos = len(servidor.pedidos)
+    with pytest.raises(kobo.KoboNoDisponible):
+        kobo._get_json(servidor.url, {})
+    assert len(servidor.pedidos) == pedidos
+
+
+def test_prueba_del_circuito_no_queda_pendiente(servidor, monkeypatch):
+    monkeypatch.setattr(kobo, "circuito", kobo.Circuito(fallas=1, espera=0.2))
+    servidor.envios = [envio(1)]
+    servidor.fallas = 1000
+    with pytest.raises(requests.RequestException):
+        kobo._get_json(servidor.url, {})
+    servidor.fallas = 0
+
+    # El pedido de prueba falla con un error que no es de red
+    time.sleep(0.25)
+    with monkeypatch.context() as m:
+        m.setattr(kobo, "_pedir", lambda *a: {}["sin_resultados"])
+        with pytest.raises(KeyError):
+            kobo._get_json(servidor.url, {})
+    assert kobo.circuito.estado() == "abierto"
+
+    # Vencida la espera vuelve a pasar un pedido de prueba y el circuito se cierra
+    time.sleep(0.25)
+    assert kobo._get_json(servidor.url, {}) == [envio(1)]
+    assert kobo.circuito.estado() == "cerrado"
+
+
+def test_tiempo_de_lectura_agotado(servidor, monkeypatch):
+    monkeypatch.setattr(kobo, "TIMEOUT", (1, 0.2))
+    servidor.demora = 2
+
+    # Cada intento corta a los 0,2 s; se reintenta y al final cuenta una falla
+    t0 = time.perf_counter()
+    with pytest.raises(requests.RequestException, match="Read timed out"):
+        kobo._get_json(servidor.url, {})
+    assert time.perf_counter() - t0 < servidor.demora
+    assert len(servidor.pedidos) == kobo.REINTENTOS + 1
+    assert kobo.circuito._fallas == 1
+
+
+def test_presupuesto_de_tiempo_agotado(servidor):
+    servidor.demora = 1
+
+    t0 = time.perf_counter()
+    with pytest.raises(kobo.KoboNoDisponible):
+        kobo.en_paralelo({"envios": lambda: kobo._get_json(servidor.url, {})}, limite=0.2)
+    assert time.perf_counter() - t0 < 1
+
+
+def test_tareas_abandonadas_no_tocan_el_circuito(servidor, monkeypatch):
+    monkeypatch.setattr(kobo, "circuito", kobo.Circuito(fallas=2))
+    servidor.envios = [envio(1)]
+    servidor.demora = 0.5
+    tareas = {
+        "a": lambda: kobo._get_json(servidor.url, {}),
+        "b": lambda: kobo._get_json(servidor.url, {}),
+    }
+
+    with pytest.raises(kobo.KoboNoDisponible):
+        kobo.en_paralelo(tareas, limite=0.1)
+
+    # Las respuestas tardías no cierran el circuito ni suman fallas
+    time.sleep(0.8)
+    assert kobo.circuito._fallas == 1
+    assert len(servidor.pedidos) == 2
+
+
+# ==============================================================
+# SINCRONIZACIÓN INCREMENTAL
+# ==============================================================
+
+def test_sincronizacion_incremental(servidor, tmp_path):
+    ruta = str(tmp_path / "precipitaciones.json.gz")
+    servidor.envios = [envio(i, mm=i) for i in range(1, 6)]
+
+    almacen = kobo.sincronizar(servidor.url, {}, ruta)
+    assert sorted(almacen.envios) == [1, 2, 3, 4, 5]
+    version = almacen.version
+
+    # Alta (6), edición (2) y baja (4)
+    servidor.envios = [e for e in servidor.envios if e["_id"] not in (2, 4)]
+    servidor.envios += [envio(2, mm=99, version=2), envio(6, mm=6)]
+    servidor.pedidos.clear()
+
+    almacen = kobo.sincronizar(servidor.url, {}, ruta)
+
+    assert sorted(almacen.envios) == [1, 2, 3, 5, 6]
+    assert almacen.envios[2]["Mil_metros_registrados"] == "99"
+    assert almacen.ultimo_id == 6
+    assert almacen.version != version
+
+    # Solo se pidieron los envíos nuevos y, completo, el editado
+    nuevos, indice, editados = servidor.pedidos_de("/submissions/")
+    assert json.loads(nuevos[1]["query"]) == {"_id": {"$gt": 5}}
+    assert json.loads(indice[1]["fields"]) == kobo.CAMPOS_INDICE
+    assert json.loads(editados[1]["query"]) == {"_id": {"$in": [2]}}
+
+    # Persistido: otro almacén sobre la misma ruta ve lo mismo
+    assert sorted(kobo.AlmacenEnvios(ruta).envios) == [1, 2, 3, 5, 6]
+
+
+def test_sincronizacion_sin_cambios_conserva_la_version(servidor, tmp_path):
+    ruta = str(tmp_path / "precipitaciones.json.gz")
+    servidor.envios = [envio(i) for i in range(1, 4)]
+
+    version = kobo.sincronizar(servidor.url, {}, ruta).version
+
+    assert kobo.sincronizar(servidor.url, {}, ruta).version == version
+
+
+def test_catalogo_se_reprocesa_al_cambiar_la_version(servidor, tmp_path):
+    ruta = str(tmp_path / "catalogo.pkl")
+    servidor.envios = [envio(i) for i in range(1, 4)]
+    llamadas = []
+
+    def preparar(df):
+        llamadas.append(len(df))
+        return df, list(df.columns)
+
+    kobo.sincronizar_catalogo(servidor.url, {}, ruta, preparar, max_edad=0, version=1)
+    kobo.sincronizar_catalogo(servidor.url, {}, ruta, preparar, max_edad=0, version=1)
+    assert llamadas == [3]
+
+    # Mismo contenido en Kobo, otra preparación: no se reutiliza la copia procesada
+    catalogo = kobo.sincronizar_catalogo(servidor.url, {}, ruta, preparar, max_edad=3600, version=2)
+    assert llamadas == [3, 3]
+    assert catalogo["version"] == 2
+